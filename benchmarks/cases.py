@@ -0,0 +1,211 @@
+"""
+Benchmark cases for the numeric hot paths.
+
+Each case is a function taking the scale dict and returning
+(run, n_items): run() is the timed call and n_items what throughput is
+counted in (pings, grid cells, ...). Temporary files a case needs while
+it is measured are registered on RESOURCES, which run.py closes after
+the case. The O(n * window) cases (Kalman, buffers, Okubo-Weiss, habitat
+grid) use `heavy_pings` and a regional `grid_box` at the large scale so
+they fit in memory on a workstation.
+Everything is synthetic and offline:
+tracks come from data/shark_tracks.py, the fleet from
+shark_network.generate_global_fleet, grids and granules are generated
+here.
+"""
+import contextlib
+import tempfile
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import xarray as xr
+
+GLOBAL_BOX = ((-80.0, 80.0), (-180.0, 180.0))
+ATLANTIC_BOX = ((0.0, 60.0), (-100.0, -20.0))
+
+SCALES = {
+    'small': {'pings': 1_000, 'heavy_pings': 1_000, 'sharks': 10, 'grid_deg': 0.25,
+              'grid_box': GLOBAL_BOX, 'fleet': 10_700},
+    'medium': {'pings': 100_000, 'heavy_pings': 100_000, 'sharks': 100, 'grid_deg': 1 / 12,
+               'grid_box': GLOBAL_BOX, 'fleet': 100_000},
+    # 1e7 pings and a 4 km grid; the heavy cases run on 1e6 pings and a regional box
+    'large': {'pings': 10_000_000, 'heavy_pings': 1_000_000, 'sharks': 1_000, 'grid_deg': 1 / 24,
+              'grid_box': ATLANTIC_BOX, 'fleet': 1_000_000},
+}
+
+CASES = {}
+RESOURCES = contextlib.ExitStack()
+
+
+def case(name):
+    def register(func):
+        CASES[name] = func
+        return func
+    return register
+
+
+# ------------------------------------------------------------------------------
+# Synthetic data
+# ------------------------------------------------------------------------------
+def make_tracks(scale, heavy=False):
+    from data.shark_tracks import generate_mock_shark_data
+    pings = scale['heavy_pings'] if heavy else scale['pings']
+    df = generate_mock_shark_data(scale['sharks'], max(pings // scale['sharks'], 2), seed=7)
+    return df.rename(columns={'timestamp': 'time'})
+
+
+def make_axes(scale, box=None):
+    (lat_range, lon_range) = box or scale['grid_box']
+    step = scale['grid_deg']
+    lat = np.arange(lat_range[1] - step / 2, lat_range[0], -step)  # descending, like L3m files
+    lon = np.arange(lon_range[0] + step / 2, lon_range[1], step)
+    return lat, lon
+
+
+def make_field(lat, lon, seed=0, nan_fraction=0.1, dtype=np.float32):
+    """Smooth field with fronts plus noise and a fraction of NaN (land / cloud)."""
+    rng = np.random.default_rng(seed)
+    field = (np.sin(np.radians(lat) * 6)[:, None] * np.cos(np.radians(lon) * 4)[None, :]
+             + 0.1 * rng.standard_normal((lat.size, lon.size))).astype(dtype)
+    field[rng.random(field.shape) < nan_fraction] = np.nan
+    return field
+
+
+def make_granule(directory, lat, lon):
+    """Monthly L3m-style chlorophyll granule covering October 2023."""
+    path = Path(directory) / "AQUA_MODIS.20231001_20231031.L3m.MO.CHL.chlor_a.4km.nc"
+    chl = np.abs(make_field(lat, lon, seed=3)) + 0.05
+    xr.Dataset({'chlor_a': (('lat', 'lon'), chl)}, coords={'lat': lat, 'lon': lon}).to_netcdf(path)
+    return path
+
+
+def make_habitat_model():
+    from sklearn.ensemble import RandomForestClassifier
+    rng = np.random.default_rng(11)
+    X = np.column_stack((rng.uniform(0, 30, 2000), rng.uniform(-6000, 0, 2000), rng.lognormal(-1, 1, 2000),
+                         rng.uniform(0, 0.5, 2000)))
+    X = np.column_stack((X, X[:, 3]))
+    y = ((X[:, 0] > 18) & (X[:, 1] > -1000)).astype(int)
+    return RandomForestClassifier(n_estimators=50, max_depth=12, random_state=0).fit(X, y)
+
+
+# ------------------------------------------------------------------------------
+# Cases
+# ------------------------------------------------------------------------------
+@case("haversine_km")
+def bench_haversine(scale):
+    from src.spatial_index import haversine_km
+    df = make_tracks(scale)
+    lat, lon = df['lat'].to_numpy(), df['lon'].to_numpy()
+    return (lambda: haversine_km(lat[:-1], lon[:-1], lat[1:], lon[1:])), len(df) - 1
+
+
+@case("movement_metrics")
+def bench_movement(scale):
+    from src.process_ocean import calculate_movement_metrics
+    df = make_tracks(scale)
+    return (lambda: calculate_movement_metrics(df)), len(df)
+
+
+@case("kalman_smoothing")
+def bench_kalman(scale):
+    from src.kalman import smooth_tracks
+    from src.movement import to_epoch_seconds
+    df = make_tracks(scale, heavy=True)
+    lat, lon = df['lat'].to_numpy(), df['lon'].to_numpy()
+    time_s, ids = to_epoch_seconds(df['time']), df['shark_id'].to_numpy()
+    return (lambda: smooth_tracks(lat, lon, time_s, track_ids=ids, smooth=True)), len(df)
+
+
+@case("sample_chlorophyll")
+def bench_sample_chlorophyll(scale):
+    from src.granule_sampler import GranuleTimeIndex, sample_chlorophyll_matched
+    df = make_tracks(scale)
+    tmp = RESOURCES.enter_context(tempfile.TemporaryDirectory(prefix="bench_granules_"))
+    lat, lon = make_axes(scale, ATLANTIC_BOX)
+    granules = GranuleTimeIndex([make_granule(tmp, lat, lon)])
+    return (lambda: sample_chlorophyll_matched(df, granules)), len(df)
+
+
+@case("buffer_stats")
+def bench_buffer_stats(scale):
+    from src.buffer_stats import BufferStats
+    df = make_tracks(scale, heavy=True)
+    lat_axis, lon_axis = make_axes(scale)
+    field = make_field(lat_axis, lon_axis)
+    engine = BufferStats(lat_axis, lon_axis)
+    lat, lon = df['lat'].to_numpy(), df['lon'].to_numpy()
+    return (lambda: engine.compute(field, lat, lon, name='chl')), len(df)
+
+
+@case("okubo_weiss_build")
+def bench_okubo_weiss_build(scale):
+    from src.okubo_weiss import OkuboWeissPyramid
+    lat, lon = make_axes(scale)
+    ssh = make_field(lat, lon, seed=5, nan_fraction=0.0, dtype=np.float64) * 0.5
+    return (lambda: OkuboWeissPyramid.build(ssh, lat, lon)), ssh.size
+
+
+@case("okubo_weiss_lookup")
+def bench_okubo_weiss_lookup(scale):
+    from src.okubo_weiss import OkuboWeissPyramid
+    lat_axis, lon_axis = make_axes(scale)
+    ssh = make_field(lat_axis, lon_axis, seed=5, nan_fraction=0.0, dtype=np.float64) * 0.5
+    pyramid = OkuboWeissPyramid.build(ssh, lat_axis, lon_axis)
+    df = make_tracks(scale)
+    lat, lon = df['lat'].to_numpy(), df['lon'].to_numpy()
+    return (lambda: pyramid.lookup(lat, lon)), len(df)
+
+
+@case("habitat_predict_grid")
+def bench_habitat(scale):
+    from src.habitat import HabitatInference
+    lat, lon = make_axes(scale)
+    sst = np.nan_to_num(make_field(lat, lon, seed=1)) * 10 + 18
+    depth = np.nan_to_num(make_field(lat, lon, seed=2)) * 3000 - 3000
+    chl = np.abs(np.nan_to_num(make_field(lat, lon, seed=3)))
+    model = make_habitat_model()
+
+    def run():
+        # A fresh engine each time so the pass is cold (no map / tile hits)
+        engine = HabitatInference(model)
+        try:
+            return engine.predict_grid(sst, depth, chl)
+        finally:
+            engine.close()
+    return run, sst.size
+
+
+@case("habitat_predict_compiled")
+def bench_habitat_compiled(scale):
+    from src.habitat import HabitatInference
+    from src.tree_compile import compile_model
+    lat, lon = make_axes(scale)
+    sst = np.nan_to_num(make_field(lat, lon, seed=1)) * 10 + 18
+    depth = np.nan_to_num(make_field(lat, lon, seed=2)) * 3000 - 3000
+    chl = np.abs(np.nan_to_num(make_field(lat, lon, seed=3)))
+    model = compile_model(make_habitat_model())
+
+    def run():
+        engine = HabitatInference(model)
+        try:
+            return engine.predict_grid(sst, depth, chl)
+        finally:
+            engine.close()
+    return run, sst.size
+
+
+@case("fleet_generate")
+def bench_fleet(scale):
+    from shark_network import generate_global_fleet
+    now = pd.Timestamp("2024-01-01")
+    return (lambda: generate_global_fleet(scale['fleet'], now=now)), scale['fleet']
+
+
+@case("fleet_lod_build")
+def bench_fleet_lod(scale):
+    from shark_network import generate_global_fleet
+    from src.fleet_lod import FleetLOD
+    fleet = generate_global_fleet(scale['fleet'], now=pd.Timestamp("2024-01-01"))
+    return (lambda: FleetLOD(fleet)), len(fleet)
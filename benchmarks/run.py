@@ -0,0 +1,141 @@
+"""
+Runs the benchmark cases and compares them with a stored baseline.
+
+    python benchmarks/run.py                       # small scale, compare with baseline
+    python benchmarks/run.py --scale medium -k kalman
+    python benchmarks/run.py --save                # record the current numbers as the baseline
+    python benchmarks/run.py --check               # exit 1 on a regression or a missing baseline (CI / make bench)
+
+For every case it records the best wall time over --repeat samples, the
+throughput (items per second) and the tracemalloc peak of one run. A case
+regresses when it is slower or uses more peak memory than the baseline by
+more than --tolerance.
+"""
+import argparse
+import contextlib
+import gc
+import io
+import json
+import platform
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from benchmarks.cases import CASES, RESOURCES, SCALES  # noqa: E402
+
+BASELINE = Path(__file__).resolve().parent / "baseline.json"
+
+
+def measure(run, repeat, min_sample=0.1):
+    """
+    (best seconds per call, peak traced MB) of a benchmark callable. Like
+    asv, fast calls are looped so each timed sample lasts at least
+    min_sample seconds, which keeps millisecond cases out of timer noise.
+    """
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        run()  # warm-up: imports, lazy caches, page faults
+        number = max(1, int(min_sample / max(time.perf_counter() - start, 1e-9)))
+        best = float("inf")
+        for _ in range(repeat):
+            gc.collect()
+            start = time.perf_counter()
+            for _ in range(number):
+                run()
+            best = min(best, (time.perf_counter() - start) / number)
+
+        gc.collect()
+        tracemalloc.start()
+        try:
+            run()
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+    return best, peak / 1e6
+
+
+def run_cases(scale_name, pattern=None, repeat=5):
+    scale = SCALES[scale_name]
+    results = {}
+    for name, make in CASES.items():
+        if pattern and pattern not in name:
+            continue
+        with RESOURCES:  # temporary files of the case are removed once it is measured
+            with contextlib.redirect_stdout(io.StringIO()):
+                run, n_items = make(scale)
+            seconds, peak_mb = measure(run, repeat)
+        results[name] = {'seconds': seconds, 'items': n_items,
+                         'items_per_s': n_items / seconds if seconds > 0 else float("inf"),
+                         'peak_mb': peak_mb}
+        print(f"  {name:<24} {seconds * 1e3:10.2f} ms  {results[name]['items_per_s']:14,.0f} items/s"
+              f"  {peak_mb:9.1f} MB peak")
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """Prints the ratio to the baseline per case. Returns the names that regressed or have no baseline."""
+    regressed = []
+    for name, r in results.items():
+        base = baseline.get(name)
+        if base is None:
+            print(f"  {name:<24} (no baseline)")
+            regressed.append(name)
+            continue
+        t_ratio = r['seconds'] / base['seconds'] if base['seconds'] else 1.0
+        m_ratio = r['peak_mb'] / base['peak_mb'] if base['peak_mb'] else 1.0
+        flag = ""
+        if t_ratio > 1 + tolerance or m_ratio > 1 + tolerance:
+            flag = "  ⚠️ REGRESSION"
+            regressed.append(name)
+        elif t_ratio < 1 - tolerance:
+            flag = "  ✅ faster"
+        print(f"  {name:<24} time x{t_ratio:5.2f}   memory x{m_ratio:5.2f}{flag}")
+    return regressed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", choices=sorted(SCALES), default="small")
+    parser.add_argument("-k", dest="pattern", help="Only run cases whose name contains this")
+    parser.add_argument("--repeat", type=int, default=5, help="Timed samples per case (the best is kept)")
+    parser.add_argument("--baseline", type=Path, default=BASELINE)
+    parser.add_argument("--save", action="store_true", help="Store the results as the baseline for this scale")
+    parser.add_argument("--check", action="store_true", help="Exit with status 1 if any case regressed")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed slowdown / memory growth (0.25 = 25%%)")
+    parser.add_argument("--output", type=Path, help="Also write the results as JSON here")
+    args = parser.parse_args()
+
+    print(f"🏁 Benchmarks ({args.scale}: {SCALES[args.scale]})")
+    results = run_cases(args.scale, args.pattern, args.repeat)
+
+    stored = json.loads(args.baseline.read_text()) if args.baseline.exists() else {}
+    if args.output:
+        args.output.write_text(json.dumps({'scale': args.scale, 'results': results}, indent=2))
+
+    if args.save:
+        entry = stored.setdefault(args.scale, {'machine': platform.platform(), 'python': platform.python_version(),
+                                                'results': {}})
+        entry['results'].update(results)
+        args.baseline.write_text(json.dumps(stored, indent=2, sort_keys=True))
+        print(f"💾 Baseline saved to {args.baseline}")
+        return 0
+
+    baseline = stored.get(args.scale, {}).get('results', {})
+    if not baseline:
+        print(f"{'❌' if args.check else 'ℹ️'} No {args.scale} baseline in {args.baseline}; run with --save "
+              f"(make bench-baseline) to record one.")
+        return 1 if args.check else 0
+    print(f"\n📊 Compared with baseline ({stored[args.scale].get('machine', '?')})")
+    regressed = compare(results, baseline, args.tolerance)
+    if regressed and args.check:
+        print(f"❌ {len(regressed)} regression(s) or case(s) without a baseline: {', '.join(regressed)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
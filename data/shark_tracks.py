@@ -1,43 +1,44 @@
 import pandas as pd
 import numpy as np
 import os
-from datetime import datetime, timedelta
+from datetime import datetime
 
-def generate_mock_shark_data(num_sharks=3, points_per_shark=50):
+def generate_mock_shark_data(num_sharks=3, points_per_shark=50, seed=None):
     """
     Generates random walk data to simulate sharks swimming 
     in the Gulf Stream (North Atlantic).
+
+    Built as whole columns (a cumulative sum per shark), so millions of
+    pings take a second or two. Pass seed for a reproducible table.
     """
-    data = []
-    
+    rng = np.random.default_rng(seed) if seed is not None else np.random
+    n = num_sharks * points_per_shark
+
     # Starting near Florida/Bahamas
     start_lat = 26.0
     start_lon = -79.0
-    
-    for shark_id in range(1, num_sharks + 1):
-        current_lat = start_lat + np.random.uniform(-1, 1)
-        current_lon = start_lon + np.random.uniform(-1, 1)
-        current_time = datetime(2023, 10, 1) # Starting Oct 1, 2023
-        
-        for _ in range(points_per_shark):
-            # Simulate movement: Sharks move ~0.1 degrees per time step
-            # Bias them slightly North-East (following Gulf Stream)
-            delta_lat = np.random.normal(0.05, 0.02) 
-            delta_lon = np.random.normal(0.05, 0.02)
-            
-            current_lat += delta_lat
-            current_lon += delta_lon
-            current_time += timedelta(hours=6) # 4 points per day
-            
-            data.append({
-                "shark_id": f"Shark_{shark_id}",
-                "timestamp": current_time,
-                "lat": round(current_lat, 4),
-                "lon": round(current_lon, 4),
-                "speed_knots": round(np.random.uniform(1.5, 4.0), 2)
-            })
+    first_lat = start_lat + rng.uniform(-1, 1, num_sharks)
+    first_lon = start_lon + rng.uniform(-1, 1, num_sharks)
+
+    # Simulate movement: Sharks move ~0.1 degrees per time step
+    # Bias them slightly North-East (following Gulf Stream)
+    delta_lat = rng.normal(0.05, 0.02, (num_sharks, points_per_shark))
+    delta_lon = rng.normal(0.05, 0.02, (num_sharks, points_per_shark))
+    lat = first_lat[:, None] + np.cumsum(delta_lat, axis=1)
+    lon = first_lon[:, None] + np.cumsum(delta_lon, axis=1)
+
+    # Starting Oct 1, 2023, 4 points per day
+    steps = np.arange(1, points_per_shark + 1) * np.timedelta64(6, 'h')
+    times = np.datetime64(datetime(2023, 10, 1)) + steps
 
-    df = pd.DataFrame(data)
+    df = pd.DataFrame({
+        "shark_id": pd.Categorical.from_codes(np.repeat(np.arange(num_sharks), points_per_shark),
+                                              [f"Shark_{i}" for i in range(1, num_sharks + 1)]),
+        "timestamp": np.tile(times, num_sharks),
+        "lat": np.round(lat.ravel(), 4),
+        "lon": np.round(lon.ravel(), 4),
+        "speed_knots": np.round(rng.uniform(1.5, 4.0, n), 2),
+    })
     return df
 
 if __name__ == "__main__":
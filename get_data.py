@@ -2,6 +2,8 @@ import earthaccess
 import os
 from dotenv import load_dotenv
 
+from src.download_manager import DownloadManager, EarthdataTransport
+
 # 1. Login
 load_dotenv()
 if not os.getenv("EARTHDATA_TOKEN"):
@@ -16,18 +18,19 @@ dataset_id = "MODISA_L3m_CHL"
 
 print(f"\n⬇️ Searching for files in dataset: {dataset_id}...")
 
-# 3. Find and Download ONE file
-files = earthaccess.search_data(
-    short_name=dataset_id,
-    temporal=("2023-10-01", "2023-10-31"),
-    count=1
-)
+# 3. Find and Download ONE file (skipped if already downloaded, resumed if interrupted)
+manager = DownloadManager("downloads/chlorophyll", transport=EarthdataTransport())
+results = manager.download([{
+    'short_name': dataset_id,
+    'temporal': ("2023-10-01", "2023-10-31"),
+    'count': 1
+}])
+manager.close()
 
-if files:
-    print(f"✅ Found file: {files[0]['meta']['concept-id']}")
-    os.makedirs("downloads/chlorophyll", exist_ok=True)
-    earthaccess.download(files, "downloads/chlorophyll")
+if results and all(r['status'] != 'failed' for r in results):
     print("\n🎉 SUCCESS! Data saved to 'downloads/chlorophyll'")
     print("👉 NOW you can run your notebook.")
+elif results:
+    print("❌ Download failed. Re-run to resume.")
 else:
-    print("❌ No files found. The dataset ID might have changed or the date is out of range.")
\ No newline at end of file
+    print("❌ No files found. The dataset ID might have changed or the date is out of range.")
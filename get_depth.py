@@ -1,41 +1,36 @@
 import os
-import requests
 
-# URL for ETOPO1 (Ice Surface) - 0.5 degree resolution (Small & Fast)
-# This is a standard low-res version perfect for this project
+from src.bathymetry import ingest_relief, stream_gunzip
+
+# URL for ETOPO1 (Bedrock, grid registered) - 1 arc-minute global relief
 url = "https://www.ngdc.noaa.gov/mgg/global/relief/ETOPO1/data/bedrock/grid_registered/netcdf/ETOPO1_Bed_g_gmt4.grd.gz"
 
-# NOTE: This file is GZIPPED (.gz), so we need to unzip it after downloading.
-import gzip
-import shutil
+# Regions kept at full resolution, as (lat_min, lat_max, lon_min, lon_max)
+REGIONS = {
+    "north_atlantic": (20.0, 50.0, -90.0, -55.0),
+    "great_barrier_reef": (-30.0, -8.0, 140.0, 160.0),
+    "south_africa": (-42.0, -28.0, 10.0, 32.0),
+    "california": (25.0, 42.0, -130.0, -115.0),
+}
 
 save_dir = "downloads/bathymetry"
 os.makedirs(save_dir, exist_ok=True)
-gz_filename = os.path.join(save_dir, "etopo1.nc.gz")
 final_filename = os.path.join(save_dir, "global_depth.nc")
 
-print("⬇️ Downloading Bathymetry (Depth) Data from NOAA...")
-
 try:
-    # 1. Download
-    response = requests.get(url, stream=True)
-    if response.status_code == 200:
-        with open(gz_filename, 'wb') as f:
-            for chunk in response.iter_content(chunk_size=8192):
-                f.write(chunk)
-        print("✅ Download complete. Unzipping...")
-
-        # 2. Unzip
-        with gzip.open(gz_filename, 'rb') as f_in:
-            with open(final_filename, 'wb') as f_out:
-                shutil.copyfileobj(f_in, f_out)
-        
-        # Cleanup
-        os.remove(gz_filename)
-        print(f"🎉 Success! Depth map saved to: {final_filename}")
-        
+    # 1. Download, decompressing on the fly (no .gz copy on disk)
+    if os.path.exists(final_filename):
+        print(f"✅ Using existing {final_filename}")
     else:
-        print(f"❌ Server Error: {response.status_code}")
+        print("⬇️ Downloading Bathymetry (Depth) Data from NOAA...")
+        size = stream_gunzip(url, final_filename)
+        print(f"✅ Download complete ({size / 1e6:.0f} MB unpacked).")
+
+    # 2. Regrid onto the model raster and crop the regions, in chunks
+    print("🗺️ Building depth layers...")
+    for path in ingest_relief(final_filename, "models", REGIONS):
+        print(f"   saved {path}")
+    print(f"🎉 Success! Depth map saved to: {final_filename}")
 
 except Exception as e:
-    print(f"❌ Download failed: {e}")
\ No newline at end of file
+    print(f"❌ Download failed: {e}")
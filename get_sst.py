@@ -1,7 +1,8 @@
 import earthaccess
-import os
 from dotenv import load_dotenv
 
+from src.download_manager import DownloadManager, EarthdataTransport
+
 load_dotenv()
 auth = earthaccess.login(strategy="environment")
 
@@ -11,16 +12,17 @@ dataset_id = "MODISA_L3m_SST"
 
 print(f"\n⬇️ Searching for SST (Temperature) data: {dataset_id}...")
 
-files = earthaccess.search_data(
-    short_name=dataset_id,
-    temporal=("2023-10-01", "2023-10-31"),
-    count=1
-)
+manager = DownloadManager("downloads/sst", transport=EarthdataTransport())
+results = manager.download([{
+    'short_name': dataset_id,
+    'temporal': ("2023-10-01", "2023-10-31"),
+    'count': 1
+}])
+manager.close()
 
-if files:
-    print(f"✅ Found file: {files[0]['meta']['concept-id']}")
-    os.makedirs("downloads/sst", exist_ok=True)
-    earthaccess.download(files, "downloads/sst")
+if results and all(r['status'] != 'failed' for r in results):
     print("\n🎉 SUCCESS! Data saved to 'downloads/sst'")
+elif results:
+    print("❌ Download failed. Re-run to resume.")
 else:
-    print("❌ No files found. Check your date range or internet.")
\ No newline at end of file
+    print("❌ No files found. Check your date range or internet.")
@@ -1,53 +1,113 @@
 from pathlib import Path
-from src import auth, fetch_data, process_ocean
+import pandas as pd
+
+from src import auth, fetch_data, granule_sampler, process_ocean, storage
+from src.buffer_stats import buffer_features
+from src.grid_store import GridStore
+from src.pipeline import Pipeline, Stage
 
 # Define paths
 BASE_DIR = Path(__file__).parent
 project_root = BASE_DIR  # For compatibility with notebook
 DATA_RAW = BASE_DIR / "data" / "raw"
+SHARK_TRACKS_FILE = BASE_DIR / "data" / "shark_tracks.csv"
+OUTPUT_FILE = BASE_DIR / "data" / "processed" / "shark_analysis_results.csv"
+# Partitioned Parquet stores; the CSVs remain as import / export formats
+SHARK_TRACKS_STORE = storage.parquet_path(SHARK_TRACKS_FILE)
+OUTPUT_STORE = storage.parquet_path(OUTPUT_FILE)
+PIPELINE_CACHE = BASE_DIR / "data" / "cache" / "pipeline"
+MODELS_DIR = BASE_DIR / "models"
+BUFFER_RADII_KM = (1, 5, 25)
+CHL_DATE_TOLERANCE = pd.Timedelta(days=1)
+
+
+def tracks_source():
+    """The Parquet track store if it has been built, otherwise the CSV."""
+    return SHARK_TRACKS_STORE if SHARK_TRACKS_STORE.is_dir() else SHARK_TRACKS_FILE
+
+
+def load_tracks():
+    """Loads REAL shark tracking data (Parquet store or CSV) with storage dtypes."""
+    shark_df = storage.load_tracks(tracks_source())
+    shark_df = shark_df.rename(columns={'timestamp': 'time', 'lon': 'lon', 'lat': 'lat'})
+    print(f"\n📊 Loaded {len(shark_df)} shark tracking records")
+    print(f"🦈 Sharks tracked: {shark_df['shark_id'].unique()}")
+    return shark_df
+
+
+def sample_chlorophyll(shark_df, granules, tolerance):
+    """Samples chlorophyll at real shark locations from the time-matched granule (None without granules)."""
+    if not len(granules):
+        return None
+    shark_df = granule_sampler.sample_chlorophyll_matched(shark_df, granules, tolerance=tolerance)
+    shark_df['chlorophyll'] = shark_df['chl_nearest']
+    return shark_df
+
+
+def movement_metrics(shark_df):
+    return None if shark_df is None else process_ocean.calculate_movement_metrics(shark_df)
+
+
+def chlorophyll_buffers(shark_df, radii_km):
+    """Per-ping chlorophyll buffer stats from the model grid, when it is available."""
+    if shark_df is None:
+        return None
+    grids = GridStore(MODELS_DIR)
+    if not grids.has("map_chlor") or grids.lat_grid is None:
+        print("⚠️ models/map_chlor.npy not found. Skipping buffer features.")
+        return shark_df
+    return buffer_features(shark_df, grids.layer("map_chlor"), grids.lat_grid, grids.lon_grid,
+                           name="chl", radii_km=radii_km)
 
-def main():
+
+def granule_files():
+    return sorted(DATA_RAW.rglob("*.nc"))
+
+
+def index_granules():
+    return granule_sampler.GranuleTimeIndex(granule_files())
+
+
+def build_pipeline():
+    """
+    The pipeline as a stage graph. Loading the tracks and indexing the
+    granules are independent and run in parallel; every data stage is
+    cached on the hash of its input files and parameters, so only the
+    stages downstream of a changed file rerun.
+    """
+    return Pipeline([
+        Stage("auth", auth.setup_earthdata_login, cache=False),
+        Stage("fetch", fetch_data.download_sample_data, after=["auth"], params={'output_dir': DATA_RAW}, cache=False),
+        Stage("tracks", load_tracks, files=lambda: storage.store_files(tracks_source())),
+        # Index every downloaded granule (PACE BGC / MODIS CHL) by time coverage
+        Stage("granules", index_granules, after=["fetch"], files=granule_files),
+        Stage("chlorophyll", sample_chlorophyll, deps=["tracks", "granules"],
+              params={'tolerance': CHL_DATE_TOLERANCE}),
+        Stage("movement", movement_metrics, deps=["chlorophyll"]),
+        Stage("buffers", chlorophyll_buffers, deps=["movement"],
+              files=[MODELS_DIR / f"{name}.npy" for name in ("map_chlor", "lat_grid", "lon_grid")],
+              params={'radii_km': BUFFER_RADII_KM}),
+    ], cache_dir=PIPELINE_CACHE)
+
+
+def main(force=()):
     print("--- STARTING SHARK TRACKING PIPELINE ---")
-    
-    # 1. Authenticate
-    auth.setup_earthdata_login()
-
-    # 2. Fetch Data
-    fetch_data.download_sample_data(DATA_RAW)
-
-    # 3. Process: Load REAL shark tracking data
-    import pandas as pd
-    
-    # Load real shark tracking data from CSV
-    shark_tracks_file = BASE_DIR / "data" / "shark_tracks.csv"
-    if shark_tracks_file.exists():
-        shark_df = pd.read_csv(shark_tracks_file)
-        shark_df['timestamp'] = pd.to_datetime(shark_df['timestamp'])
-        shark_df = shark_df.rename(columns={'timestamp': 'time', 'lon': 'lon', 'lat': 'lat'})
-        print(f"\n📊 Loaded {len(shark_df)} shark tracking records")
-        print(f"🦈 Sharks tracked: {shark_df['shark_id'].unique()}")
-    else:
-        print(f"❌ Real shark data file not found at {shark_tracks_file}")
+
+    if not tracks_source().exists():
+        print(f"❌ Real shark data file not found at {SHARK_TRACKS_FILE}")
         return
-    
-    # Find BGC file for chlorophyll data
-    bgc_files = list(DATA_RAW.glob("*BGC*.nc"))
-    if bgc_files:
-        # Sample chlorophyll at real shark locations
-        shark_df = process_ocean.sample_chlorophyll(shark_df, bgc_files[0])
-        shark_df = process_ocean.calculate_movement_metrics(shark_df)
-        
+
+    shark_df = build_pipeline().run(force=force)["buffers"]
+    if shark_df is not None:
         print("\n✅ Pipeline complete!")
         print("\n--- Shark Foraging Analysis Summary ---")
         print(shark_df[['time', 'shark_id', 'lat', 'lon', 'speed_ms', 'chlorophyll']].head(10))
-        
-        # Save results
-        output_file = BASE_DIR / "data" / "processed" / "shark_analysis_results.csv"
-        output_file.parent.mkdir(parents=True, exist_ok=True)
-        shark_df.to_csv(output_file, index=False)
-        print(f"\n💾 Results saved to {output_file}")
+
+        # Save results (Parquet store, plus a CSV export)
+        storage.write_tracks(shark_df, OUTPUT_STORE, export_csv=OUTPUT_FILE, overwrite=True)
+        print(f"\n💾 Results saved to {OUTPUT_STORE} and {OUTPUT_FILE}")
     else:
-        print("⚠️ No BGC data found. Skipping chlorophyll sampling.")
+        print("⚠️ No satellite granules found. Skipping chlorophyll sampling.")
 
     print("--- PIPELINE FINISHED ---")
 
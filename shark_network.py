@@ -1,168 +1,196 @@
 import requests
+import numpy as np
 import pandas as pd
 import datetime
 import streamlit as st
-import random
 import time
 
+from src.fleet_snapshot import FLEET_COLUMNS, FleetService
+from src.path_fetcher import PathFetcher
+from src.rng import counter_bits, counter_uniform
+
 # THE OFFICIAL ENDPOINT
 OCEARCH_URL = "https://www.ocearch.org/tracker/ajax/filter-sharks"
+# One "Download Path History" click blocks the Streamlit rerun: one retry on a 2 s timeout
+# (about 5 s worst case) instead of the background policy used by fetch_shark_paths
+INTERACTIVE_RETRIES = 1
+INTERACTIVE_TIMEOUT = 2
 
 # --- GLOBAL FLEET GENERATOR (The "10,000 Shark" Engine) ---
-def generate_global_fleet():
+# Real-world shark hotspots with massive population counts
+FLEET_HOTSPOTS = [
+    # THE BIG 3 (High Density)
+    {"name": "North Atlantic", "lat": 35.0, "lon": -75.0, "spread": 12.0, "species": ["White Shark", "Tiger Shark"], "count": 2000},
+    {"name": "Australia (Great Barrier)", "lat": -18.0, "lon": 147.0, "spread": 10.0, "species": ["Tiger Shark", "Bull Shark", "Hammerhead"], "count": 2000},
+    {"name": "South Africa (Cape)", "lat": -34.5, "lon": 19.0, "spread": 6.0, "species": ["White Shark", "Bronze Whaler"], "count": 1500},
+
+    # PACIFIC RIM
+    {"name": "California (Red Triangle)", "lat": 34.0, "lon": -120.0, "spread": 7.0, "species": ["White Shark", "Mako"], "count": 1000},
+    {"name": "Hawaii", "lat": 21.0, "lon": -157.0, "spread": 5.0, "species": ["Tiger Shark", "Galapagos Shark"], "count": 800},
+    {"name": "Japan / Kuroshio Current", "lat": 35.0, "lon": 140.0, "spread": 9.0, "species": ["Salmon Shark", "Mako"], "count": 800},
+    {"name": "New Zealand", "lat": -40.0, "lon": 174.0, "spread": 8.0, "species": ["White Shark", "Blue Shark"], "count": 500},
+
+    # ATLANTIC & INDIAN
+    {"name": "Brazil / South Atlantic", "lat": -20.0, "lon": -35.0, "spread": 12.0, "species": ["Tiger Shark", "Blue Shark"], "count": 800},
+    {"name": "Mediterranean", "lat": 38.0, "lon": 15.0, "spread": 10.0, "species": ["Blue Shark", "White Shark"], "count": 500},
+    {"name": "Indian Ocean (Deep)", "lat": -10.0, "lon": 75.0, "spread": 20.0, "species": ["Oceanic Whitetip"], "count": 800}
+]
+
+SHARK_NAMES = ["Luna", "Echo", "Turbo", "Jaws", "Shadow", "Hunter", "Storm", "Reef", "Deep Blue", "Folk", "Alice", "Neo", "Finn", "Splash", "Rocky", "Titan", "Ghost", "Viper", "Maverick"]
+
+SIMULATED_ID_START = 10000
+
+def generate_global_fleet(n_tags=None, seed=42, now=None):
     """
-    Generates 10,700 realistic sharks distributed across major ocean hotspots
-    to simulate a massive global network.
+    Generates realistic sharks distributed across major ocean hotspots
+    to simulate a massive global network (10,700 by default; n_tags scales
+    the hotspot populations proportionally).
+
+    The fleet is built directly as columns from one seeded Generator, so it
+    is deterministic for a given seed and a million tags take well under a
+    second. species/gender/name are categoricals, length (ft) and weight
+    (lbs) are ints and last_seen is datetime64.
     """
-    fleet = []
-    
-    # Define real-world shark hotspots with massive population counts
-    hotspots = [
-        # THE BIG 3 (High Density)
-        {"name": "North Atlantic", "lat": 35.0, "lon": -75.0, "spread": 12.0, "species": ["White Shark", "Tiger Shark"], "count": 2000},
-        {"name": "Australia (Great Barrier)", "lat": -18.0, "lon": 147.0, "spread": 10.0, "species": ["Tiger Shark", "Bull Shark", "Hammerhead"], "count": 2000},
-        {"name": "South Africa (Cape)", "lat": -34.5, "lon": 19.0, "spread": 6.0, "species": ["White Shark", "Bronze Whaler"], "count": 1500},
-        
-        # PACIFIC RIM
-        {"name": "California (Red Triangle)", "lat": 34.0, "lon": -120.0, "spread": 7.0, "species": ["White Shark", "Mako"], "count": 1000},
-        {"name": "Hawaii", "lat": 21.0, "lon": -157.0, "spread": 5.0, "species": ["Tiger Shark", "Galapagos Shark"], "count": 800},
-        {"name": "Japan / Kuroshio Current", "lat": 35.0, "lon": 140.0, "spread": 9.0, "species": ["Salmon Shark", "Mako"], "count": 800},
-        {"name": "New Zealand", "lat": -40.0, "lon": 174.0, "spread": 8.0, "species": ["White Shark", "Blue Shark"], "count": 500},
-        
-        # ATLANTIC & INDIAN
-        {"name": "Brazil / South Atlantic", "lat": -20.0, "lon": -35.0, "spread": 12.0, "species": ["Tiger Shark", "Blue Shark"], "count": 800},
-        {"name": "Mediterranean", "lat": 38.0, "lon": 15.0, "spread": 10.0, "species": ["Blue Shark", "White Shark"], "count": 500},
-        {"name": "Indian Ocean (Deep)", "lat": -10.0, "lon": 75.0, "spread": 20.0, "species": ["Oceanic Whitetip"], "count": 800}
-    ]
-    
-    shark_names = ["Luna", "Echo", "Turbo", "Jaws", "Shadow", "Hunter", "Storm", "Reef", "Deep Blue", "Folk", "Alice", "Neo", "Finn", "Splash", "Rocky", "Titan", "Ghost", "Viper", "Maverick"]
-    
-    print("⚡ Generating MASSIVE Fleet (10,000+ Tags)...")
-    
-    id_counter = 10000
-    
-    for zone in hotspots:
-        for _ in range(zone["count"]):
-            # Randomize position within the zone (Gaussian distribution for realism)
-            lat = zone["lat"] + random.gauss(0, zone["spread"] / 2)
-            lon = zone["lon"] + random.gauss(0, zone["spread"] / 2)
-            
-            # Realistic Metadata
-            species = random.choice(zone["species"])
-            name = f"{random.choice(shark_names)}-{random.randint(100,999)}"
-            gender = random.choice(["Male", "Female"])
-            length = f"{random.randint(8, 18)} ft"
-            weight = f"{random.randint(500, 4000)} lbs"
-            
-            # Add to fleet
-            fleet.append({
-                "id": id_counter,
-                "name": name,
-                "species": species,
-                "gender": gender,
-                "length": length,
-                "weight": weight,
-                # Random "Last Seen" time within the last 72 hours
-                "last_seen": datetime.datetime.now() - datetime.timedelta(hours=random.randint(0, 72)),
-                "lat": lat,
-                "lon": lon,
-                "image_url": None 
-            })
-            id_counter += 1
-            
-    return fleet
-
-@st.cache_data(ttl=600)
-def fetch_live_sharks():
+    rng = np.random.default_rng(seed)
+    now = np.datetime64(now or datetime.datetime.now(), 's')
+
+    counts = np.array([zone["count"] for zone in FLEET_HOTSPOTS])
+    if n_tags is not None:
+        # Largest-remainder split so the counts add up to exactly n_tags
+        exact = counts / counts.sum() * n_tags
+        counts = np.floor(exact).astype(np.int64)
+        counts[np.argsort(counts - exact)[:n_tags - counts.sum()]] += 1
+    n = int(counts.sum())
+    print(f"⚡ Generating MASSIVE Fleet ({n:,} Tags)...")
+
+    zone = np.repeat(np.arange(len(FLEET_HOTSPOTS)), counts)
+    zone_lat = np.array([z["lat"] for z in FLEET_HOTSPOTS])
+    zone_lon = np.array([z["lon"] for z in FLEET_HOTSPOTS])
+    zone_sigma = np.array([z["spread"] / 2 for z in FLEET_HOTSPOTS])
+
+    # Randomize position within the zone (Gaussian distribution for realism)
+    lat = zone_lat[zone] + rng.normal(0, 1, n) * zone_sigma[zone]
+    lon = zone_lon[zone] + rng.normal(0, 1, n) * zone_sigma[zone]
+
+    # Species: pick uniformly from each zone's list via a flat species table
+    species_names = sorted({sp for z in FLEET_HOTSPOTS for sp in z["species"]})
+    zone_species = [[species_names.index(sp) for sp in z["species"]] for z in FLEET_HOTSPOTS]
+    n_species = np.array([len(codes) for codes in zone_species])
+    offsets = np.concatenate(([0], np.cumsum(n_species)[:-1]))
+    flat_codes = np.concatenate(zone_species)
+    species = flat_codes[offsets[zone] + (rng.random(n) * n_species[zone]).astype(np.int64)]
+
+    # Realistic Metadata
+    # Names like "Luna-123": draw a code into the full (name x 100..999) table
+    name_table = [f"{base}-{num}" for base in SHARK_NAMES for num in range(100, 1000)]
+    names = pd.Categorical.from_codes(rng.integers(0, len(name_table), n), name_table)
+
+    return pd.DataFrame({
+        "id": np.arange(SIMULATED_ID_START, SIMULATED_ID_START + n),
+        "name": names,
+        "species": pd.Categorical.from_codes(species, species_names),
+        "gender": pd.Categorical.from_codes(rng.integers(0, 2, n), ["Male", "Female"]),
+        "length": rng.integers(8, 19, n).astype(np.int16),
+        "weight": rng.integers(500, 4001, n).astype(np.int16),
+        # Random "Last Seen" time within the last 72 hours
+        "last_seen": now - rng.integers(0, 73, n).astype("timedelta64[h]"),
+        "lat": lat,
+        "lon": lon,
+        "image_url": None,
+    })
+
+def generate_fleet_paths(shark_ids, n_days=45, seed=42, now=None):
     """
-    Attempts live connection. If blocked, returns the MASSIVE simulated fleet.
+    Random-walk path histories for simulated tags, generated for all IDs in
+    one batched pass. Each tag's walk depends only on (seed, id), so a path
+    is the same whether it is generated alone or with the whole fleet.
+    Returns a long DataFrame: shark_id, datetime, lat, lon, active.
+    """
+    ids = np.asarray(list(shark_ids), dtype=np.int64)
+    now = np.datetime64(now or datetime.datetime.now(), 's')
+    keys = counter_bits(ids, seed)[:, None]
+
+    # Counters 0..1 pick the start; 2.. are per-day steps for lat and lon
+    day = np.arange(n_days)
+    start_lat = -40 + 80 * counter_uniform(keys[:, 0], 0)
+    start_lon = -180 + 360 * counter_uniform(keys[:, 0], 1)
+    step_lat = counter_uniform(keys, 2 + 2 * day) * 2.0 - 1.0
+    step_lon = counter_uniform(keys, 3 + 2 * day) * 2.0 - 1.0
+
+    return pd.DataFrame({
+        "shark_id": np.repeat(ids, n_days),
+        "datetime": np.tile(now - day.astype("timedelta64[D]"), ids.size),
+        "lat": (start_lat[:, None] + np.cumsum(step_lat, axis=1)).ravel(),
+        "lon": (start_lon[:, None] + np.cumsum(step_lon, axis=1)).ravel(),
+        "active": True,
+    })
+
+def download_fleet(timeout=10):
+    """
+    One download of the live OCEARCH fleet as a columnar table (raises if
+    the feed is blocked or unreachable).
     """
     headers = {
         "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/122.0.0.0 Safari/537.36",
         "Referer": "https://www.ocearch.org/tracker/",
         "Accept": "application/json"
     }
-    
-    shark_list = []
-
-    try:
-        # Try Live Connection (Short timeout so we fail fast to backup)
-        response = requests.get(OCEARCH_URL, headers=headers, timeout=2)
-        
-        if response.status_code != 200:
-            raise ValueError("Blocked")
-
-        data = response.json()
-        
-        # If we get here, we have LIVE data!
-        for shark_id, info in data.items():
-            latest = info.get('latest_activity')
-            if latest:
-                shark_list.append({
-                    "id": info.get('id'),
-                    "name": info.get('name', 'Unknown'),
-                    "species": info.get('species', 'Unknown'),
-                    "gender": info.get('gender', 'Unknown'),
-                    "length": info.get('length', 'Unknown'),
-                    "weight": info.get('weight', 'Unknown'),
-                    "last_seen": datetime.datetime.fromtimestamp(int(latest)),
-                    "lat": float(info.get('geo', {}).get('lat', 0)),
-                    "lon": float(info.get('geo', {}).get('long', 0)),
-                    "image_url": info.get('profile_image', None)
-                })
-
-    except Exception:
-        # FAILOVER TO 10,000+ SIMULATED SHARKS
-        shark_list = generate_global_fleet()
-
-    # Convert to DataFrame
-    df = pd.DataFrame(shark_list)
-    if not df.empty:
-        df = df.sort_values(by='last_seen', ascending=False)
-        
-    return df
+    response = requests.get(OCEARCH_URL, headers=headers, timeout=timeout)
+    if response.status_code != 200:
+        raise ValueError(f"Blocked (HTTP {response.status_code})")
+
+    rows = [info for info in response.json().values() if info.get('latest_activity')]
+    return pd.DataFrame({
+        "id": [info.get('id') for info in rows],
+        "name": [info.get('name', 'Unknown') for info in rows],
+        "species": [info.get('species', 'Unknown') for info in rows],
+        "gender": [info.get('gender', 'Unknown') for info in rows],
+        # Free text upstream ("12 ft."), kept as strings so the table stays columnar
+        "length": [str(info.get('length', 'Unknown')) for info in rows],
+        "weight": [str(info.get('weight', 'Unknown')) for info in rows],
+        "last_seen": pd.to_datetime([datetime.datetime.fromtimestamp(int(info['latest_activity'])) for info in rows]),
+        "lat": [float(info.get('geo', {}).get('lat', 0)) for info in rows],
+        "lon": [float(info.get('geo', {}).get('long', 0)) for info in rows],
+        "image_url": [info.get('profile_image', None) for info in rows],
+    }, columns=FLEET_COLUMNS)
+
+@st.cache_resource
+def get_fleet_service():
+    """
+    The fleet snapshot service shared by every session. Its background
+    thread refreshes the live feed every 10 minutes; until the first
+    download lands, sessions get the last live table cached on disk or the
+    MASSIVE simulated fleet.
+    """
+    return FleetService(download_fleet, fallback=generate_global_fleet, ttl=600, retry=60,
+                        cache_path="data/cache/fleet/live.parquet")
+
+def fetch_live_sharks():
+    """
+    Latest fleet table (live, or the simulated fleet while the feed is
+    blocked). Never waits on the network.
+    """
+    return get_fleet_service().snapshot().df
 
 def fetch_shark_path(shark_id):
     """
     Fetches path history. Generates a realistic fake path if ID is simulated.
     """
     # If ID is > 10000, it's one of our simulated sharks
-    if int(shark_id) >= 10000:
-        path_data = []
-        # Find the shark in our current cache to get its start position (approx)
-        # We'll just generate a random walk
-        
-        curr_lat = random.uniform(-40, 40)
-        curr_lon = random.uniform(-180, 180)
-        
-        for i in range(45): # 45 Days of history
-            curr_lat += random.uniform(-1.0, 1.0)
-            curr_lon += random.uniform(-1.0, 1.0)
-            path_data.append({
-                "datetime": datetime.datetime.now() - datetime.timedelta(days=i),
-                "lat": curr_lat,
-                "lon": curr_lon,
-                "active": True
-            })
-        return pd.DataFrame(path_data)
-
-    # Real API Attempt for real IDs
-    HISTORY_URL = f"https://www.ocearch.org/tracker/detail/{shark_id}/json"
-    headers = {"User-Agent": "Mozilla/5.0"}
-
-    try:
-        response = requests.get(HISTORY_URL, headers=headers, timeout=5)
-        if response.status_code == 200:
-            data = response.json()
-            pings = data.get('pings', [])
-            path_data = []
-            for p in pings:
-                path_data.append({
-                    "datetime": datetime.datetime.fromtimestamp(int(p['tz'])),
-                    "lat": float(p['latitude']),
-                    "lon": float(p['longitude']),
-                    "active": p['active'] == "1"
-                })
-            return pd.DataFrame(path_data)
-    except:
-        return pd.DataFrame()
\ No newline at end of file
+    if int(shark_id) >= SIMULATED_ID_START:
+        return generate_fleet_paths([int(shark_id)]).drop(columns="shark_id")
+
+    # Real API: incremental refresh through the on-disk path cache, on a budget the rerun can wait for
+    return get_path_fetcher().fetch(int(shark_id), retries=INTERACTIVE_RETRIES, timeout=INTERACTIVE_TIMEOUT)
+
+def fetch_shark_paths(shark_ids):
+    """
+    Bulk version of fetch_shark_path for real tag IDs: histories are pulled
+    concurrently and merged into the on-disk cache. Returns {id: DataFrame}.
+    """
+    return get_path_fetcher().fetch_many(int(i) for i in shark_ids)
+
+@st.cache_resource
+def get_path_fetcher():
+    """One pooled fetcher (and SQLite cache) shared by every session."""
+    return PathFetcher()
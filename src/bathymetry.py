@@ -0,0 +1,188 @@
+import os
+import zlib
+from pathlib import Path
+
+import numpy as np
+import requests
+import xarray as xr
+from numpy.lib.format import open_memmap
+
+from src.grid_store import GridStore, _axis_slice
+from src.spatial_index import axis_position
+
+STREAM_BYTES = 1 << 22  # 4 MB network reads / decompression blocks
+CHUNK_ROWS = 512        # source rows per regridding block
+
+
+def stream_gunzip(url, final_path, session=None, timeout=60):
+    """
+    Downloads a .gz file and decompresses it on the fly into final_path.
+
+    No compressed copy touches the disk: network blocks go straight through
+    a zlib decoder (multi-member aware) into final_path.part, which is
+    renamed into place once the stream ends. Returns the decompressed size.
+    """
+    final_path = Path(final_path)
+    final_path.parent.mkdir(parents=True, exist_ok=True)
+    part = final_path.with_name(final_path.name + ".part")
+    session = session or requests.Session()
+
+    written = 0
+    decoder = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    with session.get(url, stream=True, timeout=timeout) as response:
+        response.raise_for_status()
+        with open(part, 'wb', buffering=STREAM_BYTES) as out:
+            for block in response.iter_content(STREAM_BYTES):
+                while block:
+                    data = decoder.decompress(block)
+                    out.write(data)
+                    written += len(data)
+                    if not decoder.eof:
+                        break
+                    # Concatenated gzip members: restart on the leftover bytes
+                    block = decoder.unused_data
+                    decoder = zlib.decompressobj(16 + zlib.MAX_WBITS)
+            data = decoder.flush()
+            out.write(data)
+            written += len(data)
+    os.replace(part, final_path)
+    return written
+
+
+def _coord(ds, names):
+    for name in names:
+        if name in ds.variables:
+            return name
+    raise ValueError(f"None of {names} found in {list(ds.variables)}")
+
+
+def open_relief(path):
+    """
+    Opens an ETOPO-style relief grid lazily. Returns (z, lat, lon): z is the
+    lazily indexed (lat, lon) elevation variable in metres (negative below
+    sea level); lat/lon are 1-D axes in memory.
+    """
+    ds = xr.open_dataset(path, mask_and_scale=True)
+    lat_name = _coord(ds, ('lat', 'latitude', 'y'))
+    lon_name = _coord(ds, ('lon', 'longitude', 'x'))
+    z_name = _coord(ds, ('z', 'elevation', 'Band1'))
+    z = ds[z_name].transpose(ds[lat_name].dims[0], ds[lon_name].dims[0]).variable
+    return z, ds[lat_name].values.astype(np.float64), ds[lon_name].values.astype(np.float64)
+
+
+def _bin_index(axis, x):
+    """Index of the target cell whose extent (half-way to its neighbours) contains x, -1 outside."""
+    axis = np.asarray(axis, dtype=np.float64)
+    descending = axis.size > 1 and axis[0] > axis[-1]
+    asc = axis[::-1] if descending else axis
+    step = np.diff(asc)
+    half = (step[0] if step.size else 1.0) / 2.0, (step[-1] if step.size else 1.0) / 2.0
+    edges = np.concatenate(([asc[0] - half[0]], (asc[:-1] + asc[1:]) / 2.0, [asc[-1] + half[1]]))
+    idx = np.searchsorted(edges, x, side='right') - 1
+    idx = np.where((idx >= 0) & (idx < asc.size), idx, -1)
+    if descending:
+        idx = np.where(idx >= 0, asc.size - 1 - idx, -1)
+    return idx
+
+
+def _lon_bins(src_lon, dst_lon):
+    """Target column of every source longitude, trying the +-360 wraps of each."""
+    cols = np.full(src_lon.shape, -1, dtype=np.int64)
+    for shift in (0.0, 360.0, -360.0):
+        missing = cols < 0
+        cols[missing] = _bin_index(dst_lon, src_lon[missing] + shift)
+    return cols
+
+
+def regrid_block_mean(z, src_lat, src_lon, dst_lat, dst_lon, out, chunk_rows=CHUNK_ROWS):
+    """
+    Regrids a (lat, lon) source onto the dst axes, writing into `out`
+    (e.g. a memmap) one band of target rows at a time.
+
+    Target cells covering several source cells get their mean (block
+    averaging, so a coarse raster does not alias narrow ridges and
+    trenches); target cells finer than the source get the nearest source
+    value. At most chunk_rows source rows and one band of output are in
+    memory at a time.
+    """
+    n_rows, n_cols = len(dst_lat), len(dst_lon)
+    row_of = _bin_index(dst_lat, src_lat)
+    col_of = _lon_bins(src_lon, dst_lon)
+    col_ok = col_of >= 0
+    # Nearest source row / column of every target cell, for cells no source cell falls into
+    near_row = np.rint(axis_position(src_lat, dst_lat))
+    near_col = np.rint(axis_position(src_lon, ((np.asarray(dst_lon) - src_lon.min()) % 360.0) + src_lon.min()))
+    col_hit = np.isfinite(near_col)
+
+    band = max(1, chunk_rows * n_rows // max(src_lat.size, 1))
+    for t0 in range(0, n_rows, band):
+        t1 = min(t0 + band, n_rows)
+        total = np.zeros((t1 - t0) * n_cols)
+        count = np.zeros((t1 - t0) * n_cols)
+        src_rows = np.flatnonzero((row_of >= t0) & (row_of < t1))
+        for s0 in range(0, src_rows.size, chunk_rows):
+            rows = src_rows[s0:s0 + chunk_rows]
+            # Source rows of a band are contiguous (monotonic axes), so read a slice
+            block = np.asarray(z[rows[0]:rows[-1] + 1], dtype=np.float64)[:, col_ok]
+            key = (row_of[rows] - t0)[:, None] * n_cols + col_of[col_ok][None, :]
+            valid = np.isfinite(block)
+            total += np.bincount(key[valid], weights=block[valid], minlength=total.size)
+            count += np.bincount(key[valid], minlength=count.size)
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = (total / count).reshape(t1 - t0, n_cols)
+        count = count.reshape(t1 - t0, n_cols)
+        for i in np.flatnonzero((count == 0).any(axis=1)):
+            if not np.isfinite(near_row[t0 + i]):
+                continue
+            line = np.asarray(z[int(near_row[t0 + i])], dtype=np.float64)
+            fill = np.full(n_cols, np.nan)
+            fill[col_hit] = line[near_col[col_hit].astype(np.int64)]
+            mean[i] = np.where(count[i] > 0, mean[i], fill)
+        out[t0:t1] = mean
+    return out
+
+
+def crop(z, src_lat, src_lon, bbox):
+    """Native-resolution crop for bbox = (lat_min, lat_max, lon_min, lon_max): (values, lat, lon)."""
+    lat_min, lat_max, lon_min, lon_max = bbox
+    rows = _axis_slice(src_lat, lat_min, lat_max)
+    cols = _axis_slice(src_lon, lon_min, lon_max)
+    return np.asarray(z[rows, cols], dtype=np.float32), src_lat[rows], src_lon[cols]
+
+
+def ingest_relief(relief_path, models_dir="models", regions=None, chunk_rows=CHUNK_ROWS):
+    """
+    Builds the app's depth layers from a relief grid:
+
+    - models/map_depth.npy: the relief regridded onto models/lat_grid.npy /
+      lon_grid.npy as float32, written block by block through a memmap so
+      GridStore can memory-map it (only if the grid axes exist).
+    - models/depth/<region>.npz: compressed native-resolution crops for
+      each named bbox in `regions`, with their lat/lon axes.
+
+    .npy stays uncompressed on purpose: mmap needs raw pages, so the
+    compressed form is kept to the small regional crops.
+    """
+    models_dir = Path(models_dir)
+    z, src_lat, src_lon = open_relief(relief_path)
+    written = []
+
+    store = GridStore(models_dir)
+    if store.lat_axis is not None and store.lon_axis is not None:
+        target = models_dir / "map_depth.npy"
+        part = target.with_name("map_depth.part.npy")
+        out = open_memmap(part, mode='w+', dtype=np.float32, shape=(store.lat_axis.size, store.lon_axis.size))
+        regrid_block_mean(z, src_lat, src_lon, store.lat_axis, store.lon_axis, out, chunk_rows=chunk_rows)
+        out.flush()
+        del out
+        os.replace(part, target)
+        written.append(target)
+
+    for name, bbox in (regions or {}).items():
+        values, lat, lon = crop(z, src_lat, src_lon, bbox)
+        path = models_dir / "depth" / f"{name}.npz"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        np.savez_compressed(path, depth=values, lat=lat, lon=lon)
+        written.append(path)
+    return written
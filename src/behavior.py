@@ -0,0 +1,138 @@
+import numpy as np
+import pandas as pd
+
+from src.movement import chronological_metrics, to_epoch_seconds
+
+MS_TO_KNOTS = 1.943844
+THREAT_LEVELS = ("NONE", "LOW", "MEDIUM", "HIGH", "CRITICAL")
+
+# Behaviours in rule precedence order: the first rule that matches a ping wins.
+# 'confidence' is the (low, high) range a classification is reported with.
+BEHAVIORS = (
+    {'name': "🚀 High-Velocity Pursuit",
+     'details': "Extreme acceleration detected. Subject is engaging fast pelagic prey.",
+     'action': "⚠️ ADRENALINE SPIKE: Tail-beat frequency > 4Hz. Attack vector locked.",
+     'threat': "CRITICAL", 'confidence': (94, 99),
+     'factors': ("Velocity > 15 kts", "Rapid Turn Radius", "Burst Energy Signature")},
+    {'name': "☀️ Solar Basking",
+     'details': "Holding surface position to regulate body temperature via solar radiation.",
+     'action': "✅ THERMAL RECHARGE: Metabolic rate slowed. Surface breach detected.",
+     'threat': "LOW", 'confidence': (88, 95),
+     'factors': ("Depth < 20ft", "Low Movement", "UV Exposure High")},
+    {'name': "🌑 Deep Scattering Layer Tracking",
+     'details': "Entered Midnight Zone. Hunting bio-luminescent squid biomass.",
+     'action': "👁️ PUPIL DILATION: Low-light hunting mode engaged. Vertical dive profile active.",
+     'threat': "MEDIUM", 'confidence': (75, 88),
+     'factors': ("Depth > 1000ft", "Bio-luminescence range", "Vertical Vector")},
+    {'name': "🌡️ Thermocline Patrol",
+     'details': "Patrolling the temperature break for stunned prey fish.",
+     'action': "📉 SENSOR ALERT: Rapid temp drop (-5°C). Hunting pattern established.",
+     'threat': "MEDIUM", 'confidence': (80, 90),
+     'factors': ("Temp Gradient Delta", "Mid-water Column", "Steady Velocity")},
+    {'name': "🌙 Nocturnal Surface Foraging",
+     'details': "Using darkness to hunt surface dwellers with limited visibility.",
+     'action': "🕵️ STEALTH MODE: Lateral line sensitivity maxed. Erratic search pattern.",
+     'threat': "HIGH", 'confidence': (70, 85),
+     'factors': ("Low Light", "Surface Proximity", "Erratic Path")},
+    {'name': "🌊 Trans-Oceanic Migration",
+     'details': "Consistent heading suggests long-distance transit between habitats.",
+     'action': "🧭 NAVIGATION LOCK: Magnetic heading maintained. Ignoring local stimuli.",
+     'threat': "LOW", 'confidence': (65, 80),
+     'factors': ("Sustained Velocity", "Linear Trajectory", "Ignoring Stimuli")},
+    {'name': "💤 Energy Conservation",
+     'details': "Minimal activity. Drifting to conserve caloric burn.",
+     'action': "🔋 LOW POWER: Heart rate nominal. Gliding pattern detected.",
+     'threat': "NONE", 'confidence': (50, 70),
+     'factors': ("Zero Velocity", "Neutral Buoyancy", "Heart Rate Low")},
+)
+
+# Code tables: behaviour code -> name / threat code / factor bitmask / confidence range
+BEHAVIOR_NAMES = np.array([b['name'] for b in BEHAVIORS], dtype=object)
+FACTORS = tuple(f for b in BEHAVIORS for f in b['factors'])
+BEHAVIOR_THREAT = np.array([THREAT_LEVELS.index(b['threat']) for b in BEHAVIORS], dtype=np.int8)
+BEHAVIOR_FACTORS = np.array([sum(1 << FACTORS.index(f) for f in b['factors']) for b in BEHAVIORS], dtype=np.uint32)
+BEHAVIOR_CONFIDENCE = np.array([b['confidence'] for b in BEHAVIORS], dtype=np.int16)
+
+
+def local_hour(times, lon):
+    """
+    Local solar hour (0-24) of each ping: UTC time of day plus lon / 15.
+    times may be datetime64 values or epoch seconds; NaT / NaN gives NaN.
+    """
+    lon = np.asarray(lon, dtype=np.float64)
+    times = np.asarray(times)
+    seconds = times.astype(np.float64) if times.dtype.kind in 'fiu' else to_epoch_seconds(times)
+    utc_hours = (seconds % 86400.0) / 3600.0
+    return (utc_hours + lon / 15.0) % 24.0
+
+
+def classify(speed_kts, depth, hour):
+    """
+    Behaviour, threat and factor codes for every ping in one pass.
+
+    speed_kts, depth (ft) and hour (local 0-24) are equal-length arrays;
+    missing speed / depth count as 0 and a missing hour as midday. Returns
+    a dict of 'behavior' (index into BEHAVIORS), 'threat' (index into
+    THREAT_LEVELS) and 'factors' (bitmask over FACTORS).
+    """
+    speed = np.nan_to_num(np.asarray(speed_kts, dtype=np.float64))
+    depth = np.nan_to_num(np.asarray(depth, dtype=np.float64))
+    hour = np.floor(np.nan_to_num(np.asarray(hour, dtype=np.float64), nan=12.0))
+    is_night = (hour < 6) | (hour > 18)
+
+    conditions = [
+        speed > 15,
+        (depth < 20) & (speed < 3) & ~is_night,
+        depth > 1000,
+        (depth > 200) & (depth < 600) & (speed > 3),
+        is_night & (depth < 100),
+        speed > 5,
+    ]
+    code = np.select(conditions, np.arange(len(conditions)), default=len(BEHAVIORS) - 1).astype(np.int8)
+    return {'behavior': code, 'threat': BEHAVIOR_THREAT[code], 'factors': BEHAVIOR_FACTORS[code]}
+
+
+def confidence(codes, rng=None):
+    """Reported confidence (%) per ping: drawn from each behaviour's range, or its midpoint without an rng."""
+    low, high = BEHAVIOR_CONFIDENCE[codes, 0], BEHAVIOR_CONFIDENCE[codes, 1]
+    if rng is None:
+        return ((low + high) // 2).astype(np.int16)
+    return rng.integers(low, high + 1).astype(np.int16)
+
+
+def factor_names(mask):
+    """Factor labels of one ping's bitmask."""
+    mask = int(mask)
+    return [f for i, f in enumerate(FACTORS) if mask >> i & 1]
+
+
+def classify_tracks(df, depth=None, speed_kts=None, rng=None):
+    """
+    Behaviour timeline for a track table (lat, lon, a time column and
+    optionally shark_id / depth). Speeds come from consecutive pings of
+    the same track in time order (rows may be newest-first) unless
+    speed_kts is given; depth is the 'depth' column unless passed in. Returns a DataFrame aligned with df: speed_kts,
+    local_hour, behavior / threat / factors codes, confidence and the
+    behaviour name as a categorical.
+    """
+    time_col = next((c for c in ('time', 'timestamp', 'datetime') if c in df.columns), None)
+    time_s = to_epoch_seconds(df[time_col]) if time_col else np.full(len(df), np.nan)
+    lat, lon = df['lat'].to_numpy(np.float64), df['lon'].to_numpy(np.float64)
+
+    if speed_kts is None:
+        # Integer track codes: grouping by object-dtype ids would sort strings
+        ids = pd.factorize(df['shark_id'])[0] if 'shark_id' in df.columns else None
+        speed_ms = chronological_metrics(lat, lon, time_s, track_ids=ids)['speed_ms']
+        speed_kts = speed_ms * MS_TO_KNOTS
+    if depth is None:
+        depth = df['depth'].to_numpy(np.float64) if 'depth' in df.columns else np.zeros(len(df))
+
+    hour = local_hour(time_s, lon)
+    codes = classify(speed_kts, depth, hour)
+    return pd.DataFrame({
+        'speed_kts': np.asarray(speed_kts, dtype=np.float32),
+        'local_hour': hour.astype(np.float32),
+        **codes,
+        'confidence': confidence(codes['behavior'], rng),
+        'behavior_name': pd.Categorical.from_codes(codes['behavior'], BEHAVIOR_NAMES.tolist()),
+    }, index=df.index)
@@ -0,0 +1,174 @@
+import numpy as np
+import pandas as pd
+
+from src.spatial_index import EARTH_RADIUS_KM, haversine_km
+
+KM_PER_DEG = np.pi * EARTH_RADIUS_KM / 180.0
+DEFAULT_RADII_KM = (1.0, 5.0, 25.0)
+DEFAULT_PERCENTILES = (10, 50, 90)
+
+
+def _grid_axis(grid, dim):
+    grid = np.asarray(grid)
+    if grid.ndim == 1:
+        return grid.astype(np.float64)
+    return np.asarray(grid[:, 0] if dim == 0 else grid[0, :], dtype=np.float64)
+
+
+class BufferStats:
+    """
+    Circular-buffer statistics of a field on a regular lat/lon grid, for
+    many points and several radii at once.
+
+    Instead of measuring the distance from a point to every grid cell, each
+    point only looks at the row/column window spanned by the bounding box of
+    its largest radius (columns widen with 1/cos(lat); global grids wrap at
+    the antimeridian). Points are processed in batches of similar latitude
+    so every batch gathers one fixed-size window, and all radii are masked
+    out of that same window. Cells count when their centre is within the
+    radius, as before.
+    """
+    def __init__(self, lat_grid, lon_grid, radii_km=DEFAULT_RADII_KM, percentiles=DEFAULT_PERCENTILES,
+                 max_batch_cells=4_000_000):
+        lat_axis = _grid_axis(lat_grid, 0)
+        lon_axis = _grid_axis(lon_grid, 1)
+        self._flip_lat = lat_axis.size > 1 and lat_axis[0] > lat_axis[-1]
+        self.lat_axis = lat_axis[::-1] if self._flip_lat else lat_axis
+        self.lon_axis = lon_axis
+        if lon_axis.size > 1 and lon_axis[0] > lon_axis[-1]:
+            raise ValueError("Longitude axis must be ascending")
+        self.radii_km = tuple(float(r) for r in radii_km)
+        self.percentiles = tuple(percentiles)
+        self.max_batch_cells = max_batch_cells
+
+        self.dlat = (self.lat_axis[-1] - self.lat_axis[0]) / max(self.lat_axis.size - 1, 1)
+        self.dlon = (lon_axis[-1] - lon_axis[0]) / max(lon_axis.size - 1, 1)
+        self.global_lon = lon_axis.size * self.dlon >= 359.9
+
+    def _columns(self, names):
+        cols = []
+        for r in self.radii_km:
+            tag = f"{r:g}km"
+            cols += [f"{names}_mean_{tag}", f"{names}_max_{tag}", f"{names}_count_{tag}"]
+            cols += [f"{names}_p{p:g}_{tag}" for p in self.percentiles]
+        return cols
+
+    def compute(self, field, lat, lon, name="value"):
+        """
+        Buffer stats of `field` (n_lat, n_lon) around every (lat, lon).
+
+        Returns a dict of 1-D arrays named <name>_<stat>_<radius>km for
+        stat in mean, max, count and p<percentile>. Counts are finite cells
+        inside the radius; the other stats are NaN where the count is 0.
+        """
+        field = np.asarray(field)
+        if self._flip_lat:
+            field = field[::-1]
+        lat = np.atleast_1d(np.asarray(lat, dtype=np.float64))
+        lon = np.atleast_1d(np.asarray(lon, dtype=np.float64))
+        out = {c: np.full(lat.size, np.nan) for c in self._columns(name)}
+        for r in self.radii_km:
+            out[f"{name}_count_{r:g}km"] = np.zeros(lat.size, dtype=np.int64)
+
+        ok = np.flatnonzero(np.isfinite(lat) & np.isfinite(lon))
+        if not ok.size:
+            return out
+
+        # Window half-sizes for the largest radius; columns widen with latitude
+        r_deg = max(self.radii_km) / KM_PER_DEG
+        half_rows = int(np.ceil(r_deg / abs(self.dlat))) if self.dlat else 0
+        half_cols = self._half_cols(np.abs(lat[ok]), r_deg)
+
+        # Points sharing a window width are gathered together, in bounded batches
+        for width in np.unique(half_cols):
+            group = ok[half_cols == width]
+            window = (2 * half_rows + 1) * (2 * int(width) + 1)
+            step = max(1, self.max_batch_cells // window)
+            for b in range(0, group.size, step):
+                rows = group[b:b + step]
+                self._batch(field, lat[rows], lon[rows], rows, half_rows, int(width), name, out)
+        return out
+
+    def _half_cols(self, abs_lat, r_deg):
+        """Column half-width of the bounding box of a radius (all columns once it reaches a pole)."""
+        abs_lat = np.atleast_1d(abs_lat)
+        full = self.lon_axis.size // 2  # window covers every column
+        if not self.dlon:
+            return np.zeros(abs_lat.size, np.int64)
+        edge = abs_lat + r_deg
+        cos_lat = np.cos(np.radians(np.minimum(edge, 90.0)))
+        with np.errstate(divide='ignore'):
+            cols = np.where(edge >= 90.0, full, np.ceil(r_deg / np.maximum(cos_lat, 1e-12) / abs(self.dlon)))
+        return np.minimum(cols, full).astype(np.int64)
+
+    def _batch(self, field, lat, lon, rows_out, half_rows, half_cols, name, out):
+        n_lat, n_lon = field.shape
+        if self.global_lon:
+            lon = ((lon - self.lon_axis[0]) % 360.0) + self.lon_axis[0]
+        ci = np.rint((lat - self.lat_axis[0]) / self.dlat).astype(np.int64) if self.dlat else np.zeros(lat.size, np.int64)
+        cj = np.rint((lon - self.lon_axis[0]) / self.dlon).astype(np.int64) if self.dlon else np.zeros(lon.size, np.int64)
+
+        di = np.arange(-half_rows, half_rows + 1)
+        dj = np.arange(-half_cols, half_cols + 1)
+        ii = (ci[:, None] + di[None, :])[:, :, None]               # (n, H, 1)
+        jj = (cj[:, None] + dj[None, :])[:, None, :]               # (n, 1, W)
+        inside = (ii >= 0) & (ii < n_lat)
+        # Near a pole the window is the whole ring of longitudes, each column once
+        ring = self.global_lon and 2 * half_cols + 1 >= n_lon
+        if ring:
+            jj = np.broadcast_to(np.arange(n_lon)[None, None, :], (lat.size, 1, n_lon))
+        elif self.global_lon:
+            jj = jj % n_lon
+        else:
+            inside = inside & (jj >= 0) & (jj < n_lon)
+        ii_c = np.clip(ii, 0, n_lat - 1)
+        jj_c = np.clip(jj, 0, n_lon - 1)
+        ii_b, jj_b = np.broadcast_arrays(ii_c, jj_c)
+
+        values = np.asarray(field[ii_b, jj_b], dtype=np.float64)  # (n, H, W)
+        dist = haversine_km(lat[:, None, None], lon[:, None, None],
+                            self.lat_axis[ii_c], self.lon_axis[jj_c])
+        valid = inside & np.isfinite(values)
+        n = lat.size
+        top = np.abs(lat).max()
+
+        for r in self.radii_km:
+            tag = f"{r:g}km"
+            # Smaller radii only need the centre of the window
+            r_deg = r / KM_PER_DEG
+            hr = min(half_rows, int(np.ceil(r_deg / abs(self.dlat))) if self.dlat else 0)
+            hc = min(half_cols, int(self._half_cols(top, r_deg)[0]))
+            cols = slice(None) if ring else slice(half_cols - hc, half_cols + hc + 1)
+            sub = (slice(None), slice(half_rows - hr, half_rows + hr + 1), cols)
+            sub_values = values[sub].reshape(n, -1)
+            mask = (valid[sub] & (dist[sub] <= r)).reshape(n, -1)
+            count = mask.sum(axis=1)
+            has = count > 0
+            out[f"{name}_count_{tag}"][rows_out] = count
+            with np.errstate(invalid='ignore', divide='ignore'):
+                out[f"{name}_mean_{tag}"][rows_out] = np.where(has, np.where(mask, sub_values, 0.0).sum(axis=1) / count, np.nan)
+            out[f"{name}_max_{tag}"][rows_out] = np.where(has, np.where(mask, sub_values, -np.inf).max(axis=1), np.nan)
+            if self.percentiles and has.any():
+                # Linear-interpolated percentiles: sort with masked cells last,
+                # then read the ranks each row's own count implies
+                ordered = np.sort(np.where(mask, sub_values, np.inf), axis=1)
+                last = np.maximum(count - 1, 0)
+                idx = np.arange(n)
+                for p in self.percentiles:
+                    pos = last * (p / 100.0)
+                    lo = np.floor(pos).astype(np.int64)
+                    hi = np.minimum(lo + 1, last)
+                    frac = pos - lo
+                    with np.errstate(invalid='ignore'):
+                        v = ordered[idx, lo] * (1 - frac) + ordered[idx, hi] * frac
+                    out[f"{name}_p{p:g}_{tag}"][rows_out] = np.where(has, v, np.nan)
+
+
+def buffer_features(df, field, lat_grid, lon_grid, name="chl", radii_km=DEFAULT_RADII_KM,
+                    percentiles=DEFAULT_PERCENTILES):
+    """Adds per-ping buffer stats of a grid field to a track / fleet table (float32 columns)."""
+    engine = BufferStats(lat_grid, lon_grid, radii_km=radii_km, percentiles=percentiles)
+    stats = engine.compute(field, df['lat'].to_numpy(), df['lon'].to_numpy(), name=name)
+    features = pd.DataFrame({k: (v if v.dtype.kind == 'i' else v.astype(np.float32)) for k, v in stats.items()},
+                            index=df.index)
+    return pd.concat([df.drop(columns=features.columns, errors='ignore'), features], axis=1)
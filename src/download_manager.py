@@ -0,0 +1,357 @@
+import hashlib
+import os
+import random
+import sqlite3
+import threading
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import pandas as pd
+import requests
+
+from src.granule_sampler import granule_time_range
+
+CHUNK_BYTES = 1 << 20
+
+
+def _normalise(algorithm):
+    """hashlib name for a CMR checksum algorithm ("SHA-256" -> "sha256", "MD5" -> "md5")."""
+    return (algorithm or "sha256").lower().replace("-", "")
+
+
+class _ZlibChecksum:
+    """hashlib-style wrapper for zlib's running checksums (CMR lists Adler-32 for some collections)."""
+    def __init__(self, func, start):
+        self._func = func
+        self.value = start
+
+    def update(self, data):
+        self.value = self._func(data, self.value)
+
+    def hexdigest(self):
+        return f"{self.value:08x}"
+
+
+_ZLIB_CHECKSUMS = {'adler32': (zlib.adler32, 1), 'crc32': (zlib.crc32, 0)}
+
+
+def _supported(algorithm):
+    name = _normalise(algorithm)
+    return name in _ZLIB_CHECKSUMS or name in hashlib.algorithms_available
+
+
+def _hasher(algorithm):
+    name = _normalise(algorithm)
+    if name in _ZLIB_CHECKSUMS:
+        return _ZlibChecksum(*_ZLIB_CHECKSUMS[name])
+    return hashlib.new(name)
+
+
+def _expected_checksum(granule):
+    """The remote checksum (lower-case hex) if the granule has one in an algorithm we can compute, else None."""
+    checksum = granule.get('checksum')
+    if not checksum or not _supported(granule.get('checksum_algorithm')):
+        return None
+    checksum = str(checksum).lower()
+    return checksum.zfill(8) if _normalise(granule.get('checksum_algorithm')) in _ZLIB_CHECKSUMS else checksum
+
+
+def _algorithm_for(granule):
+    """
+    Checksum algorithm to hash a granule with: the remote one if given and
+    supported, else sha256 (the remote checksum is then not checked).
+    """
+    return _normalise(granule.get('checksum_algorithm')) if _expected_checksum(granule) else "sha256"
+
+
+class ResumeNotSupported(Exception):
+    """The server ignored a range request, so a partial download must restart."""
+
+
+def _in_temporal(path, temporal):
+    """True if a file's coverage (from its name) overlaps temporal = (start, end) ISO dates."""
+    if not temporal:
+        return True
+    rng = granule_time_range(path)
+    if rng is None:
+        return True
+    start = pd.Timestamp(temporal[0]).timestamp()
+    end = (pd.Timestamp(temporal[1]) + pd.Timedelta(days=1)).timestamp()
+    return rng[0] < end and rng[1] >= start
+
+
+class LocalDirTransport:
+    """
+    Serves granules from a local mirror laid out as root/<short_name>/<file>.
+    Useful for tests and offline runs; the temporal range is applied to the
+    file names, the bbox is ignored.
+    """
+    def __init__(self, root):
+        self.root = Path(root)
+
+    def search(self, entry):
+        files = sorted((self.root / entry['short_name']).glob("*"))
+        files = [f for f in files if f.is_file() and _in_temporal(f, entry.get('temporal'))]
+        if entry.get('count'):
+            files = files[:entry['count']]
+        return [{'name': f.name, 'url': str(f), 'size': f.stat().st_size} for f in files]
+
+    def stream(self, granule, offset=0):
+        with open(granule['url'], 'rb') as f:
+            f.seek(offset)
+            while chunk := f.read(CHUNK_BYTES):
+                yield chunk
+
+
+class HTTPTransport:
+    """
+    Plain HTTP(S) transport. search() reads a JSON listing at
+    <base_url>/<short_name>/ (a list of {name, url?, size?, checksum?,
+    checksum_algorithm?}); stream() issues a ranged GET to resume partial
+    downloads. Point base_url at a stub server to test the manager.
+    """
+    def __init__(self, base_url=None, session=None, timeout=60):
+        self.base_url = base_url.rstrip("/") if base_url else None
+        self.session = session or requests.Session()
+        self.timeout = timeout
+
+    def search(self, entry):
+        response = self.session.get(f"{self.base_url}/{entry['short_name']}/", timeout=self.timeout)
+        response.raise_for_status()
+        granules = [g for g in response.json() if _in_temporal(g['name'], entry.get('temporal'))]
+        for g in granules:
+            g.setdefault('url', f"{self.base_url}/{entry['short_name']}/{g['name']}")
+        return granules[:entry['count']] if entry.get('count') else granules
+
+    def stream(self, granule, offset=0):
+        headers = {'Range': f"bytes={offset}-"} if offset else {}
+        with self.session.get(granule['url'], headers=headers, stream=True, timeout=self.timeout) as response:
+            response.raise_for_status()
+            if offset and response.status_code != 206:
+                raise ResumeNotSupported(granule['name'])
+            yield from response.iter_content(CHUNK_BYTES)
+
+
+class EarthdataTransport(HTTPTransport):
+    """
+    NASA Earthdata transport: granules are planned with a CMR search through
+    earthaccess (short_name, temporal, bounding_box, count) and streamed over
+    the authenticated earthaccess HTTPS session.
+    """
+    def __init__(self, timeout=60):
+        import earthaccess
+        self._earthaccess = earthaccess
+        try:
+            session = earthaccess.get_requests_https_session()
+        except Exception:
+            session = None  # not logged in: public collections only
+        super().__init__(session=session, timeout=timeout)
+
+    def search(self, entry):
+        kwargs = {'short_name': entry['short_name']}
+        if entry.get('temporal'):
+            kwargs['temporal'] = tuple(entry['temporal'])
+        if entry.get('bbox'):
+            kwargs['bounding_box'] = tuple(entry['bbox'])
+        if entry.get('count'):
+            kwargs['count'] = entry['count']
+
+        granules = []
+        for result in self._earthaccess.search_data(**kwargs):
+            links = result.data_links(access="external")
+            if not links:
+                continue
+            info = (result['umm'].get('DataGranule', {}).get('ArchiveAndDistributionInformation') or [{}])[0]
+            checksum = info.get('Checksum') or {}
+            granules.append({
+                'name': links[0].rsplit("/", 1)[-1],
+                'url': links[0],
+                'size': info.get('SizeInBytes'),
+                'checksum': checksum.get('Value'),
+                'checksum_algorithm': checksum.get('Algorithm'),
+            })
+        return granules
+
+
+class DownloadCatalog:
+    """
+    SQLite record of completed downloads: where each granule was written,
+    its size and its checksum. Used to skip (or verify) files that are
+    already present instead of downloading them again.
+    """
+    def __init__(self, path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        with self._conn:
+            self._conn.execute("""CREATE TABLE IF NOT EXISTS files (
+                path TEXT PRIMARY KEY, short_name TEXT, name TEXT, url TEXT, size INTEGER,
+                algorithm TEXT, checksum TEXT, downloaded_at REAL)""")
+
+    def get(self, path):
+        """(size, algorithm, checksum) recorded for a destination path, or None."""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT size, algorithm, checksum FROM files WHERE path = ?", (str(path),)).fetchone()
+
+    def record(self, path, short_name, granule, size, algorithm, checksum):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (str(path), short_name, granule['name'], granule.get('url'), size, algorithm, checksum, time.time()))
+
+    def close(self):
+        self._conn.close()
+
+
+def file_checksum(path, algorithm="sha256"):
+    h = _hasher(algorithm)
+    with open(path, 'rb') as f:
+        while chunk := f.read(CHUNK_BYTES):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class DownloadManager:
+    """
+    Parallel, resumable downloader for a manifest of satellite datasets.
+
+    A manifest is a list of dicts with short_name and optional temporal
+    (start, end), bbox (west, south, east, north), count, description and
+    subdir. plan() expands it into granules through the transport;
+    download() fetches them on a bounded thread pool. Each file streams into
+    <name>.part (resumed with a range request when one is left over), is
+    checked against the size / checksum the transport reports, then renamed
+    into place atomically. Files already recorded in the catalog are
+    skipped (re-hashed first when verify=True); files found on disk but not
+    in the catalog are hashed once and adopted if they match.
+    """
+    def __init__(self, output_dir, transport=None, catalog_path="data/cache/downloads.sqlite",
+                 max_workers=4, retries=3, backoff=1.0, verify=False):
+        self.output_dir = Path(output_dir)
+        self.transport = transport if transport is not None else EarthdataTransport()
+        self.catalog = DownloadCatalog(catalog_path)
+        self.max_workers = max_workers
+        self.retries = retries
+        self.backoff = backoff
+        self.verify = verify
+
+    def plan(self, manifest):
+        """Granules to fetch for each manifest entry, with their destination path and status."""
+        planned, seen = [], set()
+        for entry in manifest:
+            label = entry.get('description', entry['short_name'])
+            try:
+                granules = self.transport.search(entry)
+            except Exception as e:
+                print(f"⚠️ Could not search {label}: {e}")
+                continue
+            print(f"🛰️ {label}: {len(granules)} granule(s)")
+            target = self.output_dir / entry.get('subdir', "")
+            for g in granules:
+                dest = target / g['name']
+                if dest in seen:
+                    continue
+                seen.add(dest)
+                planned.append({'entry': entry, 'granule': g, 'path': dest, 'status': self._status(entry, dest, g)})
+        return planned
+
+    def _status(self, entry, dest, granule):
+        """'present' if dest matches the catalog and the remote size / checksum, else 'missing'."""
+        if not dest.exists():
+            return 'missing'
+        expected_size = int(granule['size']) if granule.get('size') else None
+        algorithm = _algorithm_for(granule)
+        expected_checksum = _expected_checksum(granule)
+        record = self.catalog.get(dest)
+        if record is None:
+            # Downloaded before the catalog existed: adopt it if it checks out
+            size = dest.stat().st_size
+            if expected_size is not None and size != expected_size:
+                return 'missing'
+            digest = file_checksum(dest, algorithm)
+            if expected_checksum is not None and digest != expected_checksum:
+                return 'missing'
+            self.catalog.record(dest, entry['short_name'], granule, size, algorithm, digest)
+            return 'present'
+
+        size, recorded_algorithm, checksum = record
+        if dest.stat().st_size != size or (expected_size is not None and expected_size != size):
+            return 'missing'
+        if expected_checksum is not None and recorded_algorithm == algorithm and checksum != expected_checksum:
+            return 'missing'
+        if self.verify and file_checksum(dest, recorded_algorithm) != checksum:
+            return 'missing'
+        return 'present'
+
+    def download(self, manifest):
+        """Downloads everything missing. Returns the plan with status downloaded / skipped / failed."""
+        planned = self.plan(manifest)
+        todo = [p for p in planned if p['status'] == 'missing']
+        for p in planned:
+            if p['status'] == 'present':
+                p['status'] = 'skipped'
+        if todo:
+            print(f"⬇️ Downloading {len(todo)} file(s) with {min(self.max_workers, len(todo))} worker(s)...")
+            with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+                list(pool.map(self._fetch, todo))
+
+        counts = {s: sum(p['status'] == s for p in planned) for s in ('downloaded', 'skipped', 'failed')}
+        print(f"✅ {counts['downloaded']} downloaded, {counts['skipped']} already present, {counts['failed']} failed")
+        return planned
+
+    def _fetch(self, item):
+        granule = item['granule']
+        for attempt in range(self.retries + 1):
+            try:
+                self._fetch_once(item)
+                item['status'] = 'downloaded'
+                print(f"✅ {granule['name']}")
+                return
+            except Exception as e:
+                if attempt == self.retries:
+                    item['status'] = 'failed'
+                    item['error'] = str(e)
+                    print(f"⚠️ Could not download {granule['name']}: {e}")
+                    return
+                time.sleep(self.backoff * (2 ** attempt) * (1 + random.random()))
+
+    def _fetch_once(self, item):
+        dest, granule = item['path'], item['granule']
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        part = dest.with_name(dest.name + ".part")
+        algorithm = _algorithm_for(granule)
+
+        hasher = _hasher(algorithm)
+        offset = part.stat().st_size if part.exists() else 0
+        if offset:
+            with open(part, 'rb') as f:
+                while chunk := f.read(CHUNK_BYTES):
+                    hasher.update(chunk)
+        try:
+            with open(part, 'ab') as out:
+                for chunk in self.transport.stream(granule, offset):
+                    out.write(chunk)
+                    hasher.update(chunk)
+        except ResumeNotSupported:
+            part.unlink()
+            raise
+
+        size = part.stat().st_size
+        digest = hasher.hexdigest()
+        if granule.get('size') and int(granule['size']) != size:
+            if size > int(granule['size']):
+                part.unlink()
+            raise IOError(f"size {size} != expected {granule['size']}")
+        if _expected_checksum(granule) not in (None, digest):
+            part.unlink()
+            raise IOError(f"{algorithm} mismatch")
+
+        os.replace(part, dest)
+        self.catalog.record(dest, item['entry']['short_name'], granule, size, algorithm, digest)
+
+    def close(self):
+        self.catalog.close()
@@ -0,0 +1,352 @@
+import numpy as np
+import pandas as pd
+
+from src.behavior import BEHAVIORS
+from src.rng import counter_bits, counter_integers
+
+REGIONS = ("Tropical", "Temperate", "Polar")
+REGION_EDGES = np.array([23.5, 50.0])            # |lat| bin edges
+ZONES = ("Photic (Surface)", "Mesopelagic (Twilight)", "Bathypelagic (Midnight)")
+ZONE_EDGES = np.array([200.0, 1000.0])           # depth bin edges (ft)
+COORD_SCALE = 1e4                                # locations are keyed at 1e-4 degree
+
+# Prey catalogue (images on Unsplash, prefetched into the local image cache by the app)
+PREY_DB = {
+    "Seal": {
+        "img": "https://images.unsplash.com/photo-1552353617-3bfd679b3bdd?auto=format&fit=crop&w=600&q=80",
+        "kcal": "60,000", "fat": "Very High", "protein": "High",
+        "tactic": "Ambush from below (Silhouette Targeting)",
+        "defense": "Haul-out on land / Agility",
+        "rivals": "Orcas, Large White Sharks",
+        "macros": {"Fat": 70, "Protein": 25, "Bone/Other": 5},
+        "hunt_depth": "Surface - 30m",
+        "efficiency": "⭐⭐⭐⭐⭐ (High Yield)"
+    },
+    "Tuna": {
+        "img": "https://images.unsplash.com/photo-1544551763-46a013bb70d5?auto=format&fit=crop&w=600&q=80",
+        "kcal": "15,000", "fat": "Med", "protein": "Very High",
+        "tactic": "High-Speed Pursuit (Endurance)",
+        "defense": "Speed bursts / Deep diving",
+        "rivals": "Mako Sharks, Humans",
+        "macros": {"Fat": 15, "Protein": 80, "Bone/Other": 5},
+        "hunt_depth": "50m - 200m",
+        "efficiency": "⭐⭐⭐ (High Effort)"
+    },
+    "Turtle": {
+        "img": "https://images.unsplash.com/photo-1437622368342-7a3d73a34c8f?auto=format&fit=crop&w=600&q=80",
+        "kcal": "8,000", "fat": "Low", "protein": "Med",
+        "tactic": "Crushing Bite (Shell penetration)",
+        "defense": "Hard Shell / Maneuverability",
+        "rivals": "Tiger Sharks, Crocodiles",
+        "macros": {"Fat": 10, "Protein": 40, "Bone/Other": 50},
+        "hunt_depth": "Surface - 20m",
+        "efficiency": "⭐⭐⭐⭐ (Consistent)"
+    },
+    "Squid": {
+        "img": "https://images.unsplash.com/photo-1566311132952-1522f7cc4baf?auto=format&fit=crop&w=600&q=80",
+        "kcal": "2,000", "fat": "Low", "protein": "High",
+        "tactic": "Night Stalking (Visual)",
+        "defense": "Ink Cloud / Jet Propulsion",
+        "rivals": "Sperm Whales, Blue Sharks",
+        "macros": {"Fat": 5, "Protein": 85, "Bone/Other": 10},
+        "hunt_depth": "300m - 800m",
+        "efficiency": "⭐⭐ (Volume Required)"
+    },
+    "Ray": {
+        "img": "https://images.unsplash.com/photo-1559762717-99c81ac85459?auto=format&fit=crop&w=600&q=80",
+        "kcal": "5,000", "fat": "Med", "protein": "Med",
+        "tactic": "Bottom Scanning (Electro-reception)",
+        "defense": "Venomous Barb / Sand Camouflage",
+        "rivals": "Hammerhead Sharks",
+        "macros": {"Fat": 20, "Protein": 60, "Bone/Other": 20},
+        "hunt_depth": "Seabed",
+        "efficiency": "⭐⭐⭐ (Specialized)"
+    },
+    "Mackerel": {
+        "img": "https://images.unsplash.com/photo-1534043464124-3832c2a009e8?auto=format&fit=crop&w=600&q=80",
+        "kcal": "1,200", "fat": "High", "protein": "Med",
+        "tactic": "Ram Feeding (School interception)",
+        "defense": "Baitball Formation / Flash Scatter",
+        "rivals": "Tuna, Dolphins, Seabirds",
+        "macros": {"Fat": 30, "Protein": 60, "Bone/Other": 10},
+        "hunt_depth": "Surface - 50m",
+        "efficiency": "⭐⭐ (Snack)"
+    }
+}
+
+PREY_IMAGE_URLS = [prey['img'] for prey in PREY_DB.values()]
+PREY_NAMES = tuple(PREY_DB)
+DEFAULT_PREY = PREY_NAMES.index("Mackerel")
+
+# Species rules in match order: (substring of the species, prey by region or one prey, metabolism, gut biome)
+SPECIES_DIET = (
+    ("White Shark", {"Tropical": "Tuna", "Temperate": "Seal", "Polar": "Seal"},
+     "Endothermic (High Burn)", "High Acidic Efficiency"),
+    ("Tiger", "Turtle", "Ectothermic (Slow Burn)", "Generalist Scavenger"),
+    ("Mako", "Tuna", "Endothermic (Extreme Burn)", "Rapid Protein Absorption"),
+    ("Blue", "Squid", "Ectothermic", "Cephalopod Specialist"),
+    ("Hammerhead", "Ray", "Ectothermic", "Venom Tolerant"),
+)
+GENERIC_DIET = ("Mackerel", "Standard", "Opportunistic")
+DIET_STATUSES = ("🥣 Digesting", "🏹 Hunting Mode", "🩸 Feeding Frenzy", "📉 Caloric Deficit")
+
+# ------------------------------------------------------------------------------
+# Catalogues. A biome is the flora / fauna community of a (zone, region) cell:
+# the sunlit zone differs by region, the deeper zones do not.
+# ------------------------------------------------------------------------------
+FLORA_BIOME = np.array([[0, 1, 2],      # photic: tropical, temperate, polar
+                        [3, 3, 3],      # mesopelagic
+                        [3, 3, 3]])     # bathypelagic
+FAUNA_BIOME = np.array([[0, 1, 2],
+                        [3, 3, 3],
+                        [4, 4, 4]])
+
+# biome, icon, name, type, base reaction, density range
+FLORA_ROWS = [
+    (0, "🌿", "Thalassia Seagrass", "Seabed", "Physical disturbance (Wake)", 500, 2000),
+    (0, "🦠", "Zooxanthellae", "Micro", "No direct impact", 100000, 5000000),
+    (0, "🎋", "Mangrove Roots", "Coastal", "Vibration detection", 10, 50),
+    (1, "🥬", "Giant Kelp", "Forest", "Frond displacement", 20, 100),
+    (1, "🍂", "Sargassum", "Floating", "Surface scatter", 200, 800),
+    (1, "🌱", "Eelgrass", "Seabed", "Sediment plume", 1000, 5000),
+    (2, "❄️", "Ice Algae", "Surface", "Micro-turbulence", 50000, 200000),
+    (2, "🧪", "Phytoplankton", "Micro", "Displacement", 1000000, 9000000),
+    (3, "🌨️", "Marine Snow", "Detritus", "Turbidity increase", 5000, 20000),
+    (3, "🌋", "Vent Bacteria", "Micro", "Thermal plume shift", 100000, 999999),
+]
+# biome, icon, name, role, status, population range
+FAUNA_ROWS = [
+    (0, "🐟", "Yellowfin Tuna", "Prey", "Alert", 12, 50),
+    (0, "🐢", "Green Turtle", "Prey", "Vulnerable", 1, 3),
+    (0, "🦈", "Reef Shark", "Competitor", "Avoidance", 1, 5),
+    (1, "🦭", "Harbor Seal", "High-Value Prey", "Evasive", 5, 15),
+    (1, "🐟", "Mackerel", "Baitfish", "Schooling", 200, 800),
+    (1, "🐋", "Orca", "Apex Threat", "Aggressive", 3, 6),
+    (2, "🐘", "Elephant Seal", "Prey", "Haul-out", 10, 40),
+    (2, "🐟", "Arctic Cod", "Baitfish", "Deep Scatter", 100, 500),
+    (2, "🦈", "Sleeper Shark", "Competitor", "Passive", 1, 1),
+    (3, "🦑", "Humboldt Squid", "Aggressive Prey", "Defensive", 20, 100),
+    (3, "🐠", "Lanternfish", "Baitfish", "Bioluminescent Flash", 1000, 5000),
+    (3, "🗡️", "Swordfish", "Competitor", "Stand-off", 1, 1),
+    (4, "🐙", "Giant Squid", "Apex Rival", "Territorial", 1, 1),
+    (4, "🐍", "Viperfish", "Opportunist", "Ignoring", 5, 20),
+    (4, "🐋", "Sperm Whale", "Apex Threat", "Hunting Shark", 1, 2),
+]
+
+
+def _table(rows, columns):
+    table = pd.DataFrame(rows, columns=columns)
+    for col in columns[1:-2]:
+        table[col] = table[col].astype("category")
+    return table.astype({'biome': np.int8, columns[-2]: np.int64, columns[-1]: np.int64})
+
+
+def _slots(table, n_biomes):
+    """(n_biomes, max members) row indices of each biome's members, padded with -1."""
+    members = [np.flatnonzero(table['biome'].to_numpy() == b) for b in range(n_biomes)]
+    slots = np.full((n_biomes, max(len(m) for m in members)), -1, dtype=np.int64)
+    for b, m in enumerate(members):
+        slots[b, :len(m)] = m
+    return slots
+
+
+FLORA = _table(FLORA_ROWS, ['biome', 'icon', 'name', 'type', 'base_reaction', 'low', 'high'])
+FAUNA = _table(FAUNA_ROWS, ['biome', 'icon', 'name', 'role', 'status', 'low', 'high'])
+FLORA_SLOTS = _slots(FLORA, FLORA_BIOME.max() + 1)
+FAUNA_SLOTS = _slots(FAUNA, FAUNA_BIOME.max() + 1)
+
+# ------------------------------------------------------------------------------
+# Reaction tables: the response of every catalogue row to each shark mode
+# ------------------------------------------------------------------------------
+PURSUIT, FORAGING, CRUISING = 0, 1, 2
+PURSUIT_BEHAVIORS = np.array(["Pursuit" in b['name'] for b in BEHAVIORS])
+FORAGING_BEHAVIORS = np.array(["Foraging" in b['name'] for b in BEHAVIORS])
+
+
+def _fauna_reaction(role, mode):
+    if mode == PURSUIT:
+        if role in ("Prey", "Baitfish"):
+            return "⚡ FLASH SCATTER (Panic)", 95
+        if role == "High-Value Prey":
+            return "🚀 RAPID EVASION", 85
+        if "Competitor" in role:
+            return "👀 VIGILANCE (Retreat)", 60
+        if "Apex" in role:
+            return "⚔️ COMBAT POSTURE", 90
+        return "Unaware", 0
+    if mode == FORAGING:
+        return ("🛡️ SHOALING (Defense)", 50) if "Prey" in role else ("⚠️ CAUTION (Tracking)", 30)
+    return ("👁️ WATCHFUL", 20) if "Prey" in role else ("💤 IGNORING", 5)
+
+
+_fauna_reactions = [[_fauna_reaction(role, mode) for mode in (PURSUIT, FORAGING, CRUISING)]
+                    for role in FAUNA['role'].astype(str)]
+FAUNA_REACTIONS = tuple(dict.fromkeys(r for row in _fauna_reactions for r, _ in row))
+FAUNA_REACTION = np.array([[FAUNA_REACTIONS.index(r) for r, _ in row] for row in _fauna_reactions], dtype=np.int8)
+FAUNA_STRESS = np.array([[s for _, s in row] for row in _fauna_reactions], dtype=np.int16)
+
+# Flora effects: index 0..2 are speed-driven, 3+ is the row's own base reaction
+FLORA_EFFECTS = ("🌊 HYDRODYNAMIC SHEAR", "💥 PHYSICAL TRAUMA RISK", "🍃 Minimal Disturbance") \
+    + tuple(FLORA['base_reaction'].astype(str))
+FLORA_EFFECT_STRESS = np.array([40, 80, 10] + [0] * len(FLORA), dtype=np.int16)
+FLORA_CANOPY = FLORA['type'].isin(["Forest", "Bed"]).to_numpy()
+
+
+# ------------------------------------------------------------------------------
+# Vectorized engine
+# ------------------------------------------------------------------------------
+def location_keys(lat, lon, depth=None):
+    """Counter-RNG keys of locations (coordinates at 1e-4 degree, depth to the foot)."""
+    lat_q = np.rint(np.asarray(lat, dtype=np.float64) * COORD_SCALE).astype(np.int64)
+    lon_q = np.rint(np.asarray(lon, dtype=np.float64) * COORD_SCALE).astype(np.int64)
+    keys = counter_bits(lat_q, lon_q)
+    if depth is not None:
+        keys = counter_bits(keys, np.rint(np.asarray(depth, dtype=np.float64)).astype(np.int64))
+    return keys
+
+
+def classify_locations(lat, depth):
+    """Region (|lat| bins) and zone (depth bins) codes, indices into REGIONS / ZONES."""
+    region = np.digitize(np.abs(np.asarray(lat, dtype=np.float64)), REGION_EDGES).astype(np.int8)
+    zone = np.digitize(np.asarray(depth, dtype=np.float64), ZONE_EDGES).astype(np.int8)
+    return region, zone
+
+
+def _draw(keys, slots, table, salt):
+    """Per-location draws in each slot's [low, high] range (0 for padding slots)."""
+    rows = np.where(slots >= 0, slots, 0)
+    low, high = table['low'].to_numpy()[rows], table['high'].to_numpy()[rows]
+    values = counter_integers(keys[:, None], rows * 8 + salt, low, high)
+    return np.where(slots >= 0, values, 0)
+
+
+def ecosystems(lat, lon, depth):
+    """
+    Flora / fauna communities of N locations in one pass. Returns a dict of
+    region and zone codes, flora_rows / fauna_rows (N, k) indices into
+    FLORA / FAUNA padded with -1, and the matching flora_density and
+    fauna_pop draws. The draws are keyed on location, so a place always
+    gets the same community.
+    """
+    lat = np.atleast_1d(np.asarray(lat, dtype=np.float64))
+    lon = np.atleast_1d(np.asarray(lon, dtype=np.float64))
+    depth = np.broadcast_to(np.asarray(depth, dtype=np.float64), lat.shape)
+    region, zone = classify_locations(lat, depth)
+    keys = location_keys(lat, lon, depth)
+    flora_rows = FLORA_SLOTS[FLORA_BIOME[zone, region]]
+    fauna_rows = FAUNA_SLOTS[FAUNA_BIOME[zone, region]]
+    return {
+        'region': region, 'zone': zone,
+        'flora_rows': flora_rows, 'flora_density': _draw(keys, flora_rows, FLORA, 1),
+        'fauna_rows': fauna_rows, 'fauna_pop': _draw(keys, fauna_rows, FAUNA, 2),
+    }
+
+
+def shark_mode(behavior, speed):
+    """Pursuit / foraging / cruising mode per ping from behaviour codes (see src.behavior) and speed (kts)."""
+    behavior = np.asarray(behavior, dtype=np.int64)
+    speed = np.nan_to_num(np.asarray(speed, dtype=np.float64))
+    return np.select([PURSUIT_BEHAVIORS[behavior] | (speed > 15), FORAGING_BEHAVIORS[behavior]],
+                     [PURSUIT, FORAGING], default=CRUISING).astype(np.int8)
+
+
+def impacts(eco, behavior, speed):
+    """
+    Ecosystem impact of a whole track at once: reaction codes (into
+    FAUNA_REACTIONS / FLORA_EFFECTS) and stress (0-100) for every member of
+    every ping's community. eco comes from ecosystems() for the same pings.
+    """
+    mode = shark_mode(behavior, speed)
+    speed = np.nan_to_num(np.asarray(speed, dtype=np.float64))[:, None]
+
+    fauna = eco['fauna_rows']
+    fauna_safe = np.where(fauna >= 0, fauna, 0)
+    fauna_reaction = FAUNA_REACTION[fauna_safe, mode[:, None]]
+    fauna_stress = np.where(fauna >= 0, FAUNA_STRESS[fauna_safe, mode[:, None]], 0)
+
+    flora = eco['flora_rows']
+    flora_safe = np.where(flora >= 0, flora, 0)
+    flora_effect = np.select([(speed > 12) & FLORA_CANOPY[flora_safe], speed > 20, speed < 2],
+                             [0, 1, 2], default=3 + flora_safe).astype(np.int16)
+    flora_stress = np.where(flora >= 0, FLORA_EFFECT_STRESS[flora_effect], 0)
+    return {'mode': mode, 'fauna_reaction': fauna_reaction, 'fauna_stress': fauna_stress,
+            'flora_effect': flora_effect, 'flora_stress': flora_stress}
+
+
+def diet_targets(species, region):
+    """(prey index into PREY_NAMES, metabolism, gut biome) of a species in each region code."""
+    for pattern, prey, metabolism, gut in SPECIES_DIET:
+        if pattern in species:
+            by_region = [prey[r] if isinstance(prey, dict) else prey for r in REGIONS]
+            return np.array([PREY_NAMES.index(p) for p in by_region])[region], metabolism, gut
+    prey, metabolism, gut = GENERIC_DIET
+    return np.full(np.shape(region), PREY_NAMES.index(prey)), metabolism, gut
+
+
+def diets(species, lat, lon):
+    """
+    Dietary state of a shark species at N locations: prey index, status
+    index (into DIET_STATUSES), digestion %, hours since the last meal,
+    hunt success % and energy expenditure (kcal/day), keyed on location.
+    """
+    lat = np.atleast_1d(np.asarray(lat, dtype=np.float64))
+    lon = np.atleast_1d(np.asarray(lon, dtype=np.float64))
+    region, _ = classify_locations(lat, np.zeros_like(lat))
+    prey, metabolism, gut = diet_targets(species, region)
+    keys = location_keys(lat, lon)[:, None]
+    draws = counter_integers(keys, np.arange(5), [0, 10, 2, 20, 500], [len(DIET_STATUSES) - 1, 90, 48, 60, 3000])
+    status = draws[:, 0]
+    digesting = np.array(["Digesting" in s for s in DIET_STATUSES])[status]
+    return {'prey': prey, 'metabolism': metabolism, 'gut_biome': gut, 'status': status,
+            'digest_progress': np.where(digesting, draws[:, 1], 0), 'last_meal_h': draws[:, 2],
+            'hunt_success': draws[:, 3], 'energy_kcal': draws[:, 4]}
+
+
+# ------------------------------------------------------------------------------
+# Single-location views in the shape the console renders
+# ------------------------------------------------------------------------------
+def local_ecosystem(lat, lon, depth):
+    """Ecosystem dict ({'flora': [...], 'fauna': [...]}) and region name of one location."""
+    eco = ecosystems(lat, lon, depth)
+    flora = [{'icon': FLORA.at[r, 'icon'], 'name': FLORA.at[r, 'name'], 'type': FLORA.at[r, 'type'],
+              'base_reaction': FLORA.at[r, 'base_reaction'], 'density': int(d), 'row': int(r)}
+             for r, d in zip(eco['flora_rows'][0], eco['flora_density'][0]) if r >= 0]
+    fauna = [{'icon': FAUNA.at[r, 'icon'], 'name': FAUNA.at[r, 'name'], 'role': FAUNA.at[r, 'role'],
+              'status': FAUNA.at[r, 'status'], 'pop': int(p), 'row': int(r)}
+             for r, p in zip(eco['fauna_rows'][0], eco['fauna_pop'][0]) if r >= 0]
+    return {'flora': flora, 'fauna': fauna}, REGIONS[eco['region'][0]]
+
+
+def ecosystem_impact(behavior, ecosystem, speed):
+    """Impact cards (Icon, Species, Role, Reaction, Stress, Population) of one ping's ecosystem dict."""
+    width = max(len(ecosystem['flora']), len(ecosystem['fauna']), 1)
+
+    def rows(members):
+        return np.array([[m['row'] for m in members] + [-1] * (width - len(members))])
+
+    eco = {'flora_rows': rows(ecosystem['flora']), 'fauna_rows': rows(ecosystem['fauna'])}
+    out = impacts(eco, [behavior], [speed])
+    fauna = [{"Icon": a['icon'], "Species": a['name'], "Role": a['role'],
+              "Reaction": FAUNA_REACTIONS[out['fauna_reaction'][0, i]], "Stress": int(out['fauna_stress'][0, i]),
+              "Population": a['pop']} for i, a in enumerate(ecosystem['fauna'])]
+    flora = [{"Icon": p['icon'], "Species": p['name'], "Role": p['type'],
+              "Reaction": FLORA_EFFECTS[out['flora_effect'][0, i]], "Stress": int(out['flora_stress'][0, i]),
+              "Population": p['density']} for i, p in enumerate(ecosystem['flora'])]
+    return {'flora': flora, 'fauna': fauna}
+
+
+def dietary_profile(species, lat, lon):
+    """Diet card of one species at one location (prey data, status, digestion and metabolism)."""
+    d = diets(species, lat, lon)
+    prey = PREY_NAMES[d['prey'][0]]
+    return {
+        "prey_name": prey,
+        "prey_data": PREY_DB.get(prey, PREY_DB[PREY_NAMES[DEFAULT_PREY]]),
+        "metabolism": d['metabolism'],
+        "gut_biome": d['gut_biome'],
+        "status": DIET_STATUSES[d['status'][0]],
+        "digest_progress": int(d['digest_progress'][0]),
+        "last_meal": f"{d['last_meal_h'][0]} hours ago",
+        "hunt_success": f"{d['hunt_success'][0]}%",
+        "energy_expenditure": f"{d['energy_kcal'][0]} kcal/day",
+    }
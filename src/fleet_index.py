@@ -0,0 +1,145 @@
+import numpy as np
+import pandas as pd
+
+
+def _lower_names(names):
+    """Lower-cased names as a fixed-width string array (categoricals only lower their categories)."""
+    if isinstance(names.dtype, pd.CategoricalDtype):
+        categories = np.asarray(names.cat.categories.astype(str).str.lower(), dtype=str)
+        codes = names.cat.codes.to_numpy()
+        out = categories[np.maximum(codes, 0)] if len(categories) else np.full(len(names), "")
+        return np.where(codes < 0, "", out)
+    return names.fillna("").astype(str).str.lower().to_numpy(dtype=str)
+
+
+class FleetIndex:
+    """
+    Lookup and faceted search over one fleet snapshot.
+
+    Tag ids go through a hash index (O(1) per lookup). Names, last_seen and
+    latitude are held as sorted arrays, so a name prefix, a time window or
+    a latitude band is a binary search returning a slice of row positions.
+    species and gender are integer-coded facets. search() combines filters
+    into the matching row positions in snapshot order (newest first), and
+    page() materializes only the rows the UI shows. Build it once per
+    snapshot version.
+    """
+    def __init__(self, df):
+        self.df = df
+        self.n = len(df)
+        self._ids = pd.Index(df['id'].to_numpy())
+        self.unique_ids = self._ids.is_unique
+
+        names = _lower_names(df['name'])
+        self._name_order = np.argsort(names, kind="stable")
+        self._names_sorted = names[self._name_order]
+
+        seen = pd.to_datetime(df['last_seen']).to_numpy().astype("datetime64[s]").astype(np.int64)
+        self._time_order = np.argsort(seen, kind="stable")
+        self._times_sorted = seen[self._time_order]
+
+        self.lat = df['lat'].to_numpy(dtype=np.float64)
+        self.lon = ((df['lon'].to_numpy(dtype=np.float64) + 180.0) % 360.0) - 180.0
+        self._lat_order = np.argsort(self.lat, kind="stable")
+        self._lat_sorted = self.lat[self._lat_order]
+
+        self.facets = {}
+        for col in ('species', 'gender'):
+            codes, labels = pd.factorize(df[col].astype(object).fillna("Unknown"), sort=True)
+            self.facets[col] = (codes, [str(label) for label in labels])
+
+    # --------------------------------------------------------------------------
+    # Lookup
+    # --------------------------------------------------------------------------
+    def position(self, shark_id):
+        """Row position of a tag id, or None."""
+        try:
+            pos = self._ids.get_loc(shark_id)
+        except (KeyError, TypeError):
+            return None
+        if isinstance(pos, slice):
+            return pos.start
+        if isinstance(pos, np.ndarray):
+            return int(np.flatnonzero(pos)[0])
+        return int(pos)
+
+    def get(self, shark_id):
+        """The fleet row of a tag id (a Series), or None."""
+        pos = self.position(shark_id)
+        return None if pos is None else self.df.iloc[pos]
+
+    # --------------------------------------------------------------------------
+    # Sorted-array ranges
+    # --------------------------------------------------------------------------
+    def name_prefix(self, prefix):
+        """Row positions whose name starts with prefix (case-insensitive)."""
+        prefix = prefix.lower()
+        lo = np.searchsorted(self._names_sorted, prefix, side="left")
+        hi = np.searchsorted(self._names_sorted, prefix + "\U0010ffff", side="left")
+        return self._name_order[lo:hi]
+
+    def seen_between(self, start=None, end=None):
+        """Row positions with start <= last_seen <= end (datetime-likes; None is open)."""
+        lo = 0 if start is None else np.searchsorted(self._times_sorted, _epoch(start), side="left")
+        hi = self.n if end is None else np.searchsorted(self._times_sorted, _epoch(end), side="right")
+        return self._time_order[lo:hi]
+
+    def in_bbox(self, bbox):
+        """Row positions inside bbox = (lat_min, lat_max, lon_min, lon_max); lon_min > lon_max crosses the antimeridian."""
+        lat_min, lat_max, lon_min, lon_max = bbox
+        lo = np.searchsorted(self._lat_sorted, lat_min, side="left")
+        hi = np.searchsorted(self._lat_sorted, lat_max, side="right")
+        rows = self._lat_order[lo:hi]
+        lon = self.lon[rows]
+        keep = (lon >= lon_min) & (lon <= lon_max) if lon_min <= lon_max else (lon >= lon_min) | (lon <= lon_max)
+        return rows[keep]
+
+    # --------------------------------------------------------------------------
+    # Search
+    # --------------------------------------------------------------------------
+    def search(self, query="", species=None, gender=None, bbox=None, seen_after=None, seen_before=None):
+        """
+        Row positions (ascending, i.e. snapshot order) matching every given
+        filter: query is a name prefix or an exact tag id, species / gender
+        are collections of allowed labels, bbox a region and seen_after /
+        seen_before a last_seen window.
+        """
+        mask = np.ones(self.n, dtype=bool)
+        query = (query or "").strip()
+        if query:
+            hits = self.name_prefix(query)
+            if query.isdigit():
+                pos = self.position(int(query))
+                if pos is not None:
+                    hits = np.union1d(hits, [pos])
+            mask &= _mask(hits, self.n)
+        if bbox is not None:
+            mask &= _mask(self.in_bbox(bbox), self.n)
+        if seen_after is not None or seen_before is not None:
+            mask &= _mask(self.seen_between(seen_after, seen_before), self.n)
+        for col, allowed in (('species', species), ('gender', gender)):
+            if allowed:
+                codes, labels = self.facets[col]
+                table = np.isin(labels, list(allowed))
+                mask &= table[codes] if len(labels) else False
+        return np.flatnonzero(mask)
+
+    def facet_counts(self, col, rows=None):
+        """{label: count} of a facet over rows (all tags by default)."""
+        codes, labels = self.facets[col]
+        counts = np.bincount(codes if rows is None else codes[rows], minlength=len(labels))
+        return dict(zip(labels, counts.tolist()))
+
+    def page(self, rows, page=0, page_size=50):
+        """The fleet rows of one page of search results."""
+        return self.df.iloc[rows[page * page_size:(page + 1) * page_size]]
+
+
+def _epoch(value):
+    return int(np.datetime64(pd.Timestamp(value).to_datetime64(), 's').astype(np.int64))
+
+
+def _mask(rows, n):
+    mask = np.zeros(n, dtype=bool)
+    mask[rows] = True
+    return mask
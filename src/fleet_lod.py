@@ -0,0 +1,88 @@
+import numpy as np
+import pandas as pd
+
+
+class FleetLOD:
+    """
+    Level-of-detail index over a fleet snapshot for the global map.
+
+    The fleet is pre-binned into a hierarchy of lat/lon cells (base_cell_deg
+    at level 0, halving at every level). Each level stores per-cell, per-
+    species counts and member centroids, so low zoom levels plot a few
+    hundred clusters instead of every tag. At high zoom only the tags inside
+    the visible viewport are returned. Build it once per fleet snapshot.
+    """
+    def __init__(self, df, n_levels=7, base_cell_deg=16.0):
+        self.df = df
+        self.n_levels = n_levels
+        self.base_cell_deg = base_cell_deg
+        self.lat = df['lat'].to_numpy(dtype=np.float64)
+        self.lon = ((df['lon'].to_numpy(dtype=np.float64) + 180.0) % 360.0) - 180.0
+        species_codes, self.species = pd.factorize(df['species'])
+        self.levels = [self._aggregate(level, species_codes) for level in range(n_levels)]
+
+    def cell_size(self, level):
+        return self.base_cell_deg / (2 ** level)
+
+    def _aggregate(self, level, species_codes):
+        size = self.cell_size(level)
+        n_cols = int(np.ceil(360.0 / size))
+        row = np.floor((np.clip(self.lat, -90, 89.999999) + 90.0) / size).astype(np.int64)
+        col = np.floor((self.lon + 180.0) / size).astype(np.int64) % n_cols
+        key = (row * n_cols + col) * (len(self.species) + 1) + (species_codes + 1)
+
+        keys, inverse, counts = np.unique(key, return_inverse=True, return_counts=True)
+        cell = keys // (len(self.species) + 1)
+        code = keys % (len(self.species) + 1) - 1
+        return pd.DataFrame({
+            'cell': cell,
+            'lat': np.bincount(inverse, weights=self.lat) / counts,
+            'lon': np.bincount(inverse, weights=self.lon) / counts,
+            'species': pd.Categorical.from_codes(code, self.species) if len(self.species) else None,
+            'count': counts,
+        })
+
+    def level_for_zoom(self, zoom):
+        return int(np.clip(round(zoom), 0, self.n_levels - 1))
+
+    def clusters(self, zoom, bbox=None):
+        """Per-cell, per-species aggregates at the level matching zoom."""
+        agg = self.levels[self.level_for_zoom(zoom)]
+        if bbox is not None:
+            agg = agg[_in_bbox(agg['lat'].to_numpy(), agg['lon'].to_numpy(), bbox)]
+        return agg
+
+    def tags(self, bbox):
+        """Individual tags inside bbox = (lat_min, lat_max, lon_min, lon_max)."""
+        return self.df[_in_bbox(self.lat, self.lon, bbox)]
+
+    def view(self, zoom, bbox=None, max_tags=2000):
+        """
+        What to draw for a viewport: ('tags', rows) if the visible tags fit
+        within max_tags, otherwise ('clusters', aggregates).
+        """
+        if bbox is not None:
+            mask = _in_bbox(self.lat, self.lon, bbox)
+            if mask.sum() <= max_tags:
+                return 'tags', self.df[mask]
+        elif len(self.df) <= max_tags:
+            return 'tags', self.df
+        return 'clusters', self.clusters(zoom, bbox)
+
+
+def viewport(center_lat, center_lon, zoom):
+    """Approximate bbox seen at a zoom level (zoom 0 = whole globe, halves per step)."""
+    half_lon = 180.0 / (2 ** zoom)
+    half_lat = 90.0 / (2 ** zoom)
+    return (max(center_lat - half_lat, -90.0), min(center_lat + half_lat, 90.0),
+            center_lon - half_lon, center_lon + half_lon)
+
+
+def _in_bbox(lat, lon, bbox):
+    lat_min, lat_max, lon_min, lon_max = bbox
+    in_lat = (lat >= lat_min) & (lat <= lat_max)
+    if lon_max - lon_min >= 360.0:
+        return in_lat
+    # Shift longitudes into the window so boxes crossing the antimeridian work
+    rel = (lon - lon_min) % 360.0
+    return in_lat & (rel <= (lon_max - lon_min))
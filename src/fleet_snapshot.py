@@ -0,0 +1,244 @@
+import os
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+FLEET_COLUMNS = ["id", "name", "species", "gender", "length", "weight", "last_seen", "lat", "lon", "image_url"]
+
+
+class FleetSnapshot:
+    """
+    One immutable version of the fleet table.
+
+    Readers may hold a snapshot for as long as they like: refreshes never
+    modify it, they publish a new one. version only increases when the
+    tags actually change, so it is a stable cache key for anything built
+    from the table (map aggregates, search indexes).
+    """
+    __slots__ = ("df", "version", "source", "fetched_at", "changes")
+
+    def __init__(self, df, version, source, fetched_at, changes=None):
+        self.df = df
+        self.version = version
+        self.source = source            # "live", "cached" (last live table on disk) or "simulated"
+        self.fetched_at = fetched_at
+        self.changes = changes or {'added': len(df), 'updated': 0, 'removed': 0}
+
+    def age(self, now=None):
+        return (now or time.time()) - self.fetched_at
+
+    def touched(self, fetched_at, source=None):
+        """Same table and version, confirmed current at fetched_at."""
+        return FleetSnapshot(self.df, self.version, source or self.source, fetched_at,
+                             {'added': 0, 'updated': 0, 'removed': 0})
+
+
+def _sort_fleet(df):
+    if 'last_seen' in df.columns and len(df):
+        df = df.iloc[np.argsort(-df['last_seen'].to_numpy().astype("datetime64[s]").astype(np.int64), kind="stable")]
+    return df.reset_index(drop=True)
+
+
+def _common_dtype(series, values):
+    """
+    series and values (a Series) converted to one dtype, preferring the
+    series' own: categoricals gain the new categories, and values that do
+    not fit (NaN into an int column) move both to pandas' common type.
+    """
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        extra = pd.Index(values.dropna().unique()).difference(series.cat.categories)
+        if len(extra):
+            series = series.cat.add_categories(extra)
+    try:
+        return series, values.astype(series.dtype)
+    except (TypeError, ValueError):
+        dtype = pd.concat([series.iloc[:0], values.iloc[:0]]).dtype
+        return series.astype(dtype), values.astype(dtype)
+
+
+def merge_fleet(current, incoming, full=True):
+    """
+    Merges a freshly downloaded fleet table into the current one by tag id.
+
+    Only rows whose values differ are written; tags missing from a full
+    download are dropped. Returns (df, changes) with changes counting the
+    added / updated / removed tags. When nothing changed, df is the current
+    table itself, so callers can keep the old version.
+    """
+    incoming = incoming.drop_duplicates('id', keep='first')
+    if current is None or current.empty:
+        return _sort_fleet(incoming), {'added': len(incoming), 'updated': 0, 'removed': 0}
+
+    pos = pd.Index(current['id']).get_indexer(incoming['id'])
+    known = pos >= 0
+    rows = pos[known]
+    cols = [c for c in current.columns if c != 'id' and c in incoming.columns]
+
+    changed = np.zeros(len(rows), dtype=bool)
+    for col in cols:
+        old = current[col].to_numpy()[rows]
+        new = incoming[col].to_numpy()[known]
+        changed |= ~((old == new) | (pd.isna(old) & pd.isna(new)))
+    removed = ~current['id'].isin(incoming['id']).to_numpy() if full else np.zeros(len(current), dtype=bool)
+
+    changes = {'added': int((~known).sum()), 'updated': int(changed.sum()), 'removed': int(removed.sum())}
+    if not any(changes.values()):
+        return current, changes
+
+    df = current.copy()
+    if changes['updated']:
+        # Column by column, so each keeps its dtype (int16 length, categorical species, ...)
+        updates = incoming.iloc[np.flatnonzero(known)[changed]]
+        for col in cols:
+            series, values = _common_dtype(df[col], updates[col])
+            series = series.copy()
+            series.iloc[rows[changed]] = values.to_numpy()
+            df[col] = series
+    if changes['removed']:
+        df = df.loc[~removed].copy()
+    if changes['added']:
+        added = incoming.loc[~known]
+        columns = {}
+        for col in df.columns:
+            values = added[col] if col in added.columns else pd.Series(np.nan, index=added.index)
+            df[col], columns[col] = _common_dtype(df[col], values)
+        df = pd.concat([df, pd.DataFrame(columns, index=added.index)], ignore_index=True)
+    return _sort_fleet(df), changes
+
+
+class FleetService:
+    """
+    Fleet snapshot shared by every session, kept fresh by one background
+    thread (stale-while-revalidate).
+
+    snapshot() never waits on the network: it returns the latest published
+    table, stale if the upstream is slow or down. A single daemon thread
+    downloads the feed every ttl seconds (retry seconds after a failure) and
+    merges only the changed tags into a new versioned snapshot. refresh()
+    is single-flight: a caller that arrives while a download is running
+    waits for that one instead of starting another.
+
+    fetch() returns the full fleet table or raises. Until the first
+    download succeeds, readers get the last live table saved in cache_path
+    or, failing that, the table from fallback() (the simulated fleet).
+    """
+    def __init__(self, fetch, fallback=None, ttl=600, retry=60, cache_path=None, autostart=True):
+        self._fetch = fetch
+        self._fallback = fallback
+        self.ttl = ttl
+        self.retry = retry
+        self.cache_path = Path(cache_path) if cache_path else None
+        self.last_error = None
+        self.last_attempt = 0.0
+        self._flight = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._snapshot = self._load_cached() or self._fallback_snapshot()
+        if autostart:
+            self.start()
+
+    def _fallback_snapshot(self):
+        df = self._fallback() if self._fallback is not None else pd.DataFrame(columns=FLEET_COLUMNS)
+        return FleetSnapshot(_sort_fleet(df), 0, "simulated", time.time())
+
+    def _load_cached(self):
+        if self.cache_path is None or not self.cache_path.exists():
+            return None
+        try:
+            df = pd.read_parquet(self.cache_path)
+        except Exception as e:
+            print(f"⚠️ Could not read cached fleet ({e}).")
+            return None
+        return FleetSnapshot(df, 1, "cached", self.cache_path.stat().st_mtime)
+
+    def _persist(self, snapshot):
+        if self.cache_path is None:
+            return
+        try:
+            self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.cache_path.with_name(self.cache_path.name + ".part")
+            snapshot.df.to_parquet(tmp, index=False)
+            os.replace(tmp, self.cache_path)
+        except Exception as e:
+            print(f"⚠️ Could not cache fleet snapshot: {e}")
+
+    # --------------------------------------------------------------------------
+    # Readers
+    # --------------------------------------------------------------------------
+    def snapshot(self):
+        """Latest published snapshot, immediately. Nudges the refresher if it is overdue."""
+        snapshot = self._snapshot
+        if snapshot.source != "live" or snapshot.age() > self.ttl:
+            if time.time() - self.last_attempt > self.retry:
+                self._wake.set()
+        return snapshot
+
+    @property
+    def refreshing(self):
+        return self._flight.locked()
+
+    def is_stale(self):
+        snapshot = self._snapshot
+        return snapshot.source != "live" or snapshot.age() > self.ttl
+
+    # --------------------------------------------------------------------------
+    # Refresh
+    # --------------------------------------------------------------------------
+    def refresh(self, wait=True):
+        """
+        Downloads the feed and publishes the merged snapshot. If a refresh is
+        already running, waits for it (or returns at once with wait=False).
+        Returns the latest snapshot; on failure the previous one stays.
+        """
+        if not self._flight.acquire(blocking=False):
+            if wait:
+                with self._flight:
+                    pass
+            return self._snapshot
+        try:
+            self.last_attempt = time.time()
+            try:
+                incoming = self._fetch()
+                if incoming is None or incoming.empty:
+                    raise ValueError("Empty fleet feed")
+            except Exception as e:
+                self.last_error = str(e) or type(e).__name__
+                return self._snapshot
+            self.last_error = None
+
+            current = self._snapshot
+            base = current.df if current.source in ("live", "cached") else None
+            df, changes = merge_fleet(base, incoming)
+            if df is base:
+                published = current.touched(time.time(), source="live")
+            else:
+                published = FleetSnapshot(df, current.version + 1, "live", time.time(), changes)
+                self._persist(published)
+            self._snapshot = published
+            return published
+        finally:
+            self._flight.release()
+
+    def request_refresh(self):
+        """Asks the background thread to refresh now (returns immediately)."""
+        self._wake.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.refresh(wait=False)
+            self._wake.wait(self.ttl if self.last_error is None else self.retry)
+            self._wake.clear()
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="fleet-refresh", daemon=True)
+            self._thread.start()
+
+    def close(self):
+        self._stop.set()
+        self._wake.set()
@@ -0,0 +1,198 @@
+import re
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import xarray as xr
+
+from src.movement import to_epoch_seconds
+from src.process_ocean import CHLOROPHYLL_VARIABLES, open_chlorophyll_granule
+from src.spatial_index import GridIndex, index_for
+
+# AQUA_MODIS.20231001_20231031.L3m.MO.CHL..., PACE_OCI.20240305T123456.L2.OC_BGC...
+GRANULE_DATE = re.compile(r"\.(\d{8})(?:T(\d{6}))?(?:_(\d{8}))?\.")
+# Product tokens of OB.DAAC chlorophyll files (PACE OC_BGC, MODIS L3m CHL / chlor_a)
+CHLOROPHYLL_PRODUCT = re.compile(r"[._](?:OC_BGC|BGC|CHL|chlor_a)[._]", re.IGNORECASE)
+DAY_S = 86400
+
+
+def _name_time_range(name):
+    match = GRANULE_DATE.search(name)
+    if not match:
+        return None
+    day, clock, end_day = match.groups()
+    start = pd.Timestamp(f"{day}T{clock}" if clock else day)
+    if end_day:
+        end = pd.Timestamp(end_day) + pd.Timedelta(seconds=DAY_S - 1)
+    elif clock:
+        end = start  # L2 swath: a few minutes, treat as instantaneous
+    else:
+        end = start + pd.Timedelta(seconds=DAY_S - 1)
+    return start.timestamp(), end.timestamp()
+
+
+def _attrs_time_range(attrs):
+    start = pd.Timestamp(attrs['time_coverage_start']).tz_localize(None)
+    end = pd.Timestamp(attrs.get('time_coverage_end', attrs['time_coverage_start'])).tz_localize(None)
+    return start.timestamp(), end.timestamp()
+
+
+def granule_time_range(path):
+    """
+    (start, end) coverage of a granule in epoch seconds. Parsed from the
+    OB.DAAC file name when possible, otherwise from the file's
+    time_coverage_start/end attributes. Returns None if neither is present.
+    """
+    rng = _name_time_range(Path(path).name)
+    if rng is not None:
+        return rng
+    try:
+        with xr.open_dataset(path) as ds:
+            return _attrs_time_range(ds.attrs)
+    except Exception:
+        return None
+
+
+def chlorophyll_time_range(path):
+    """
+    Coverage of a chlorophyll granule like granule_time_range, or None if
+    the file is not one. An OB.DAAC name carries both the date and the
+    product (OC_BGC, CHL); any other file is opened once to read its
+    coverage attributes and check for a chlorophyll variable, so other
+    products downloaded next to it (SWOT SSH, SST) are never candidates.
+    """
+    name = Path(path).name
+    rng = _name_time_range(name)
+    if rng is not None:
+        return rng if CHLOROPHYLL_PRODUCT.search(name) else None
+    try:
+        with xr.open_dataset(path) as ds:
+            has_chlorophyll = any(v in ds for v in CHLOROPHYLL_VARIABLES)
+            rng = _attrs_time_range(ds.attrs)
+        if not has_chlorophyll:
+            with xr.open_dataset(path, group='geophysical_data') as geo:
+                has_chlorophyll = any(v in geo for v in CHLOROPHYLL_VARIABLES)
+    except Exception:
+        return None
+    return rng if has_chlorophyll else None
+
+
+class GranuleTimeIndex:
+    """
+    Time coverage of a set of chlorophyll granules, for matching pings to
+    the best granule. Files that are not chlorophyll granules, or have no
+    coverage time, are skipped. A granule qualifies if its coverage is
+    within the tolerance of the ping; among those the one with the smallest
+    gap + duration / 2 wins, so a swath minutes away beats the daily file
+    containing the ping, which beats the monthly composite.
+    """
+    def __init__(self, files):
+        self.files = []
+        starts, ends = [], []
+        skipped = 0
+        for f in files:
+            rng = chlorophyll_time_range(f)
+            if rng is None:
+                skipped += 1
+                continue
+            self.files.append(Path(f))
+            starts.append(rng[0])
+            ends.append(rng[1])
+        if skipped:
+            print(f"ℹ️ Skipped {skipped} files that are not chlorophyll granules with a coverage time")
+        self.start = np.array(starts, dtype=np.float64)
+        self.end = np.array(ends, dtype=np.float64)
+        self.duration = self.end - self.start
+
+    @classmethod
+    def from_dir(cls, directory, pattern="*.nc"):
+        return cls(sorted(Path(directory).rglob(pattern)))
+
+    def __len__(self):
+        return len(self.files)
+
+    def match(self, time_s, tolerance_s):
+        """
+        Best granule index per ping (-1 if none within tolerance_s).
+
+        Granules are grouped by coverage length (rounded to days). Within a
+        group the closest granule is a neighbour of the ping in sorted
+        midpoint order, so matching is O(pings x log granules) per group.
+        """
+        time_s = np.asarray(time_s, dtype=np.float64)
+        best = np.full(time_s.shape, -1, dtype=np.int64)
+        best_score = np.full(time_s.shape, np.inf)
+        if not len(self):
+            return best
+
+        duration_class = np.round(self.duration / DAY_S)
+        for cls_value in np.unique(duration_class):
+            members = np.flatnonzero(duration_class == cls_value)
+            mid = (self.start[members] + self.end[members]) / 2.0
+            order = np.argsort(mid)
+            members, mid = members[order], mid[order]
+
+            pos = np.searchsorted(mid, time_s)
+            for offset in (-1, 0, 1):
+                cand = np.clip(pos + offset, 0, members.size - 1)
+                g = members[cand]
+                gap = np.maximum(np.maximum(self.start[g] - time_s, time_s - self.end[g]), 0.0)
+                score = gap + self.duration[g] / 2.0
+                better = (gap <= tolerance_s) & (score < best_score)
+                best = np.where(better, g, best)
+                best_score = np.where(better, score, best_score)
+        return best
+
+
+def sample_chlorophyll_matched(tag_df, granules, tolerance=pd.Timedelta(days=1), max_distance_km=None):
+    """
+    Samples chlorophyll for each tag from the granule closest to its time.
+
+    `granules` is a GranuleTimeIndex (or a directory / list of files to
+    index). Pings are grouped by their matched granule, so every granule is
+    opened exactly once and all of its pings are sampled in one vectorized
+    pass. Adds chl_nearest, chl_bilinear (mapped grids only), chl_distance_km,
+    sat_time, sat_file and flag_outside (no granule in tolerance, or the
+    nearest pixel is further than max_distance_km).
+    """
+    if not isinstance(granules, GranuleTimeIndex):
+        granules = GranuleTimeIndex.from_dir(granules) if isinstance(granules, (str, Path)) else GranuleTimeIndex(granules)
+    print(f"Sampling Chlorophyll from {len(granules)} granules (tolerance {tolerance})...")
+
+    n = len(tag_df)
+    time_s = to_epoch_seconds(tag_df['time'])
+    lat = tag_df['lat'].to_numpy(dtype=np.float64)
+    lon = tag_df['lon'].to_numpy(dtype=np.float64)
+    match = granules.match(time_s, pd.Timedelta(tolerance).total_seconds())
+
+    chl_nearest = np.full(n, np.nan)
+    chl_bilinear = np.full(n, np.nan)
+    distance_km = np.full(n, np.nan)
+
+    order = np.argsort(match, kind='stable')
+    groups, first = np.unique(match[order], return_index=True)
+    for g, rows in zip(groups, np.split(order, first[1:])):
+        if g < 0:
+            continue
+        try:
+            values, g_lat, g_lon, _ = open_chlorophyll_granule(granules.files[g])
+        except ValueError as e:
+            print(f"⚠️ {granules.files[g].name}: {e}")
+            continue
+        index = index_for(g_lat, g_lon)
+        chl_nearest[rows], distance_km[rows] = index.sample(values, lat[rows], lon[rows], max_distance_km)
+        if isinstance(index, GridIndex):
+            chl_bilinear[rows] = index.bilinear(values, lat[rows], lon[rows])
+
+    matched = match >= 0
+    sat_start = np.where(matched, granules.start[np.maximum(match, 0)], np.nan) if len(granules) else np.full(n, np.nan)
+    sat_file = np.array([str(f) for f in granules.files] + [None], dtype=object)[np.where(matched, match, -1)]
+
+    tag_df = tag_df.copy()
+    tag_df['chl_nearest'] = chl_nearest
+    tag_df['chl_bilinear'] = chl_bilinear
+    tag_df['chl_distance_km'] = distance_km
+    tag_df['sat_time'] = pd.to_datetime(sat_start, unit='s')
+    tag_df['sat_file'] = sat_file
+    tag_df['flag_outside'] = ~matched | np.isnan(distance_km)
+    return tag_df
@@ -0,0 +1,132 @@
+import threading
+from pathlib import Path
+
+import numpy as np
+
+
+class GridStore:
+    """
+    Read-only, memory-mapped access to the model grid layers in models/.
+
+    Layers (map_sst, map_chlor, map_depth, map_ssh, ...) are opened with
+    mmap_mode='r', so nothing is read until a window is sliced and one copy
+    of the pages is shared by every session in the process. NaNs are left
+    in the files and only filled in the windows returned by read().
+    """
+    def __init__(self, root="models"):
+        self.root = Path(root)
+        self._layers = {}
+        self._lock = threading.Lock()  # shared by every session thread
+
+        self.lat_grid = self._open("lat_grid")
+        self.lon_grid = self._open("lon_grid")
+        # 1-D axes for window lookups (grids may be stored as 1-D axes or 2-D meshes)
+        self.lat_axis = self._axis(self.lat_grid, 0)
+        self.lon_axis = self._axis(self.lon_grid, 1)
+
+    def _open(self, name):
+        path = self.root / f"{name}.npy"
+        if not path.exists():
+            return None
+        return np.load(path, mmap_mode='r')
+
+    @staticmethod
+    def _axis(grid, dim):
+        if grid is None:
+            return None
+        if grid.ndim == 1:
+            return np.asarray(grid)
+        return np.asarray(grid[:, 0] if dim == 0 else grid[0, :])
+
+    def has(self, name):
+        return self.layer(name) is not None
+
+    def layer(self, name):
+        """Raw memory-mapped layer (NaNs intact), or None if it is not on disk."""
+        with self._lock:
+            if name not in self._layers:
+                self._layers[name] = self._open(name)
+            return self._layers[name]
+
+    def window(self, lat_min, lat_max, lon_min, lon_max):
+        """Row/column slices of the grid cells inside a lat/lon bounding box."""
+        if self.lat_axis is None or self.lon_axis is None:
+            raise ValueError(f"No lat_grid/lon_grid in {self.root}; windowed reads need grid axes.")
+        return (_axis_slice(self.lat_axis, lat_min, lat_max),
+                _axis_slice(self.lon_axis, lon_min, lon_max))
+
+    def read(self, name, bbox=None, fill=0.0):
+        """
+        Reads a layer (or the window bbox=(lat_min, lat_max, lon_min, lon_max))
+        into memory with NaNs replaced by `fill`. Returns None if missing.
+        """
+        data = self.layer(name)
+        if data is None:
+            return None
+        if bbox is not None:
+            rows, cols = self.window(*bbox)
+            data = data[rows, cols]
+        out = np.array(data)
+        if fill is not None:
+            np.nan_to_num(out, copy=False, nan=fill)
+        return out
+
+    def axes(self, bbox=None):
+        """Latitude and longitude axes, cropped to bbox if given."""
+        if bbox is None:
+            return self.lat_axis, self.lon_axis
+        rows, cols = self.window(*bbox)
+        return self.lat_axis[rows], self.lon_axis[cols]
+
+
+def _readonly(array):
+    if array is None or not array.flags.writeable:
+        return array
+    view = array.view()
+    view.flags.writeable = False
+    return view
+
+
+class GridContext:
+    """
+    Immutable bundle of the grid layers one render needs, passed explicitly
+    instead of through module globals so concurrent sessions cannot swap
+    each other's fields. Arrays are read-only views (memmaps from a
+    GridStore already are) and attributes cannot be rebound.
+    """
+    __slots__ = ("lat_grid", "lon_grid", "map_sst", "map_chlor", "map_depth", "map_ssh")
+
+    def __init__(self, **layers):
+        unknown = set(layers) - set(self.__slots__)
+        if unknown:
+            raise TypeError(f"Unknown grid layers: {sorted(unknown)}")
+        for name in self.__slots__:
+            object.__setattr__(self, name, _readonly(layers.get(name)))
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"GridContext is immutable (cannot set {name!r})")
+
+    def __delattr__(self, name):
+        raise AttributeError(f"GridContext is immutable (cannot delete {name!r})")
+
+    @classmethod
+    def from_store(cls, store):
+        layers = {name: store.layer(name) for name in cls.__slots__ if name.startswith("map_")}
+        return cls(lat_grid=store.lat_grid, lon_grid=store.lon_grid, **layers)
+
+    @property
+    def has_chlorophyll(self):
+        return self.map_chlor is not None and self.lat_grid is not None and self.lon_grid is not None
+
+
+def _axis_slice(axis, lo, hi):
+    """Slice of a monotonic axis covering [lo, hi] (either sort direction)."""
+    lo, hi = min(lo, hi), max(lo, hi)
+    if axis[0] <= axis[-1]:
+        start = np.searchsorted(axis, lo, side='left')
+        stop = np.searchsorted(axis, hi, side='right')
+    else:
+        rev = axis[::-1]
+        start = axis.size - np.searchsorted(rev, hi, side='right')
+        stop = axis.size - np.searchsorted(rev, lo, side='left')
+    return slice(int(start), int(stop))
@@ -0,0 +1,145 @@
+import hashlib
+import pickle
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+# Model globals for process-pool workers (set once per worker by _init_worker)
+_WORKER_MODEL = None
+_WORKER_IMPUTER = None
+
+
+def _init_worker(model, imputer):
+    global _WORKER_MODEL, _WORKER_IMPUTER
+    _WORKER_MODEL = model
+    _WORKER_IMPUTER = imputer
+
+
+def _predict_tile(X):
+    return predict_presence(_WORKER_MODEL, _WORKER_IMPUTER, X)
+
+
+def predict_presence(model, imputer, X):
+    """Presence probability (class 1) for a feature matrix."""
+    if imputer is not None:
+        X = imputer.transform(X)
+    return model.predict_proba(X)[:, 1]
+
+
+def model_fingerprint(model, imputer=None):
+    """Stable short hash of a fitted model (and imputer) for cache keys."""
+    return hashlib.sha256(pickle.dumps((model, imputer))).hexdigest()[:16]
+
+
+def sst_gradient(map_sst):
+    """SST front strength used as a model feature (clipped gradient magnitude)."""
+    dy, dx = np.gradient(map_sst)
+    return np.clip(np.nan_to_num(np.sqrt(dx**2 + dy**2)), 0, 0.1)
+
+
+def habitat_features(sst, depth, chlor, gradient):
+    """Feature matrix in the column order the habitat model was trained on."""
+    return np.column_stack((sst.ravel(), depth.ravel(), chlor.ravel(), gradient.ravel(), gradient.ravel()))
+
+
+class HabitatInference:
+    """
+    Tiled, memoized habitat-probability inference over a model grid.
+
+    The grid is predicted in blocks of `tile_rows` rows. Finished maps
+    (float32) are kept in an LRU keyed on (model hash, temp_adjust, grid
+    version) and bounded by max_bytes, so revisiting a slider value is a
+    dictionary lookup. Each map also records the hash of every tile's
+    feature block: when the grid version changes but only part of an input
+    layer did, the unchanged tiles are copied from the cached map for the
+    same warming offset and just the affected tiles are re-predicted. Set
+    workers > 1 to spread tiles over a process pool.
+    """
+    def __init__(self, model, imputer=None, tile_rows=128, max_bytes=512 * 2**20, workers=0):
+        self.model = model
+        self.imputer = imputer
+        self.model_hash = model_fingerprint(model, imputer)
+        self.tile_rows = tile_rows
+        self.max_bytes = max_bytes
+        self.workers = workers
+
+        self._maps = OrderedDict()  # key -> (probs, tile hashes)
+        self._map_bytes = 0
+        self._gradients = {}
+        self._pool = None
+        self._lock = threading.Lock()
+        self.stats = {'map_hits': 0, 'map_misses': 0, 'tile_hits': 0, 'tile_misses': 0}
+
+    def predict_grid(self, map_sst, map_depth, map_chlor, temp_adjust=0.0, grid_version=0):
+        """Returns the habitat probability map (read-only float32) for the given warming offset."""
+        temp_adjust = round(float(temp_adjust), 6)
+        key = (self.model_hash, temp_adjust, grid_version)
+        with self._lock:
+            if key in self._maps:
+                self._maps.move_to_end(key)
+                self.stats['map_hits'] += 1
+                return self._maps[key][0]
+            self.stats['map_misses'] += 1
+            # Tiles can only be reused from a map with the same offset, shape and tiling
+            donor = next((entry for k, entry in reversed(self._maps.items())
+                          if k[:2] == key[:2] and entry[0].shape == map_sst.shape
+                          and len(entry[1]) == -(-map_sst.shape[0] // self.tile_rows)), None)
+
+        # A uniform warming offset does not change the SST gradient. Sessions on other grid
+        # versions share the engine, so only the local reference is used after the lookup
+        with self._lock:
+            gradient = self._gradients.get(grid_version)
+        if gradient is None:
+            gradient = sst_gradient(np.nan_to_num(map_sst)).astype(np.float32)
+            with self._lock:
+                self._gradients = {grid_version: gradient}
+
+        probs = np.empty(map_sst.shape, dtype=np.float32)
+        hashes = []
+        pending = []
+        for i, r0 in enumerate(range(0, map_sst.shape[0], self.tile_rows)):
+            r1 = min(r0 + self.tile_rows, map_sst.shape[0])
+            # Layers may be memory-mapped with NaNs; fill them one tile at a time
+            X = habitat_features(np.nan_to_num(map_sst[r0:r1]) + temp_adjust, np.nan_to_num(map_depth[r0:r1]),
+                                 np.nan_to_num(map_chlor[r0:r1]), gradient[r0:r1])
+            digest = hashlib.blake2b(X.tobytes(), digest_size=16).digest()
+            hashes.append(digest)
+            if donor is not None and donor[1][i] == digest:
+                probs[r0:r1] = donor[0][r0:r1]
+            else:
+                pending.append((r0, r1, X))
+
+        for (r0, r1, _), tile in zip(pending, self._run_tiles([p[2] for p in pending])):
+            probs[r0:r1] = tile.reshape(r1 - r0, *map_sst.shape[1:])
+        with self._lock:
+            self.stats['tile_hits'] += len(hashes) - len(pending)
+            self.stats['tile_misses'] += len(pending)
+
+        probs.flags.writeable = False
+        self._remember(key, probs, tuple(hashes))
+        return probs
+
+    def _run_tiles(self, tiles):
+        if self.workers > 1 and len(tiles) > 1:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker,
+                                                 initargs=(self.model, self.imputer))
+            return self._pool.map(_predict_tile, tiles)
+        return (predict_presence(self.model, self.imputer, X) for X in tiles)
+
+    def _remember(self, key, probs, hashes):
+        """Adds a map, evicting the least recently used ones over max_bytes (the newest always stays)."""
+        with self._lock:
+            if key in self._maps:
+                self._map_bytes -= self._maps.pop(key)[0].nbytes
+            self._maps[key] = (probs, hashes)
+            self._map_bytes += probs.nbytes
+            while self._map_bytes > self.max_bytes and len(self._maps) > 1:
+                self._map_bytes -= self._maps.popitem(last=False)[1][0].nbytes
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
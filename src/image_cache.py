@@ -0,0 +1,156 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import requests
+
+DEFAULT_HEADERS = {"User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64)", "Referer": "https://unsplash.com/"}
+
+
+def is_image_bytes(b):
+    """True for JPEG, PNG, GIF and WEBP payloads (by magic number)."""
+    if not b or not isinstance(b, (bytes, bytearray)):
+        return False
+    return b.startswith(b"\xff\xd8") or b.startswith(b"\x89PNG") or b.startswith(b"GIF8") or b[0:4] == b"RIFF"
+
+
+class ImageCache:
+    """
+    Image assets served from memory, backed by a content-addressed disk
+    store (<cache_dir>/<sha256[:2]>/<sha256>) and a SQLite index of
+    url -> digest.
+
+    get() never touches the network: it returns the bytes from memory or
+    disk, or None while the image is missing, in which case a background
+    download is queued and the caller shows its fallback. prefetch() warms
+    a list of URLs at startup. Only payloads that look like images are
+    stored; failed URLs are not retried for retry_after seconds.
+    """
+    def __init__(self, cache_dir="data/cache/images", session=None, headers=None, timeout=6,
+                 max_workers=4, retry_after=3600):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.session = session or requests.Session()
+        self.headers = dict(DEFAULT_HEADERS if headers is None else headers)
+        self.timeout = timeout
+        self.retry_after = retry_after
+        self._memory = {}
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="image-cache")
+        self._conn = sqlite3.connect(str(self.cache_dir / "index.sqlite"), check_same_thread=False)
+        with self._conn:
+            self._conn.execute("""CREATE TABLE IF NOT EXISTS images (
+                url TEXT PRIMARY KEY, digest TEXT, content_type TEXT, fetched_at REAL, error TEXT)""")
+
+    def _blob_path(self, digest):
+        return self.cache_dir / digest[:2] / digest
+
+    def _lookup(self, url):
+        with self._lock:
+            return self._conn.execute("SELECT digest, fetched_at, error FROM images WHERE url = ?", (url,)).fetchone()
+
+    def _load(self, url):
+        """Bytes of a cached URL from disk (None if absent or the blob no longer validates)."""
+        row = self._lookup(url)
+        if row is None or row[0] is None:
+            return None
+        try:
+            data = self._blob_path(row[0]).read_bytes()
+        except OSError:
+            return None
+        if hashlib.sha256(data).hexdigest() != row[0] or not is_image_bytes(data):
+            return None
+        return data
+
+    def get(self, url):
+        """Cached image bytes for a URL, or None (a background fetch is then queued). Never blocks on the network."""
+        if not url:
+            return None
+        data = self._memory.get(url)
+        if data is not None:
+            return data
+        data = self._load(url)
+        if data is not None:
+            self._memory[url] = data
+            return data
+        self.prefetch([url])
+        return None
+
+    def prefetch(self, urls):
+        """Queues background downloads for URLs not cached yet. Returns their futures."""
+        futures = []
+        for url in urls:
+            if not url or url in self._memory:
+                continue
+            with self._lock:
+                if url in self._pending:
+                    futures.append(self._pending[url])
+                    continue
+            row = self._lookup(url)
+            if row is not None and row[0] is None and time.time() - (row[1] or 0) < self.retry_after:
+                continue  # failed recently
+            if row is not None and row[0] is not None:
+                data = self._load(url)
+                if data is not None:
+                    self._memory[url] = data
+                    continue
+            with self._lock:
+                if url not in self._pending:
+                    self._pending[url] = self._pool.submit(self._fetch, url)
+                futures.append(self._pending[url])
+        return futures
+
+    def wait(self, timeout=None):
+        """Blocks until the queued downloads finish (used by scripts, not by the app)."""
+        with self._lock:
+            pending = list(self._pending.values())
+        for future in pending:
+            try:
+                future.result(timeout=timeout)
+            except Exception:
+                pass
+
+    def _fetch(self, url):
+        try:
+            r = self.session.get(url, headers=self.headers, timeout=self.timeout)
+            try:
+                content_type = r.headers.get('content-type', '')
+                data = r.content
+                if r.status_code // 100 != 2:
+                    raise ValueError(f"HTTP {r.status_code}")
+                if not is_image_bytes(data):
+                    raise ValueError(f"Not an image ({content_type or 'unknown type'})")
+            finally:
+                r.close()
+            self._store(url, data, content_type)
+            return data
+        except Exception as e:
+            with self._lock, self._conn:
+                self._conn.execute("INSERT OR REPLACE INTO images VALUES (?, NULL, NULL, ?, ?)",
+                                   (url, time.time(), str(e)))
+            return None
+        finally:
+            with self._lock:
+                self._pending.pop(url, None)
+
+    def _store(self, url, data, content_type):
+        digest = hashlib.sha256(data).hexdigest()
+        path = self._blob_path(digest)
+        if not path.exists():
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_name(path.name + f".{threading.get_ident()}.part")
+            tmp.write_bytes(data)
+            os.replace(tmp, path)
+        with self._lock, self._conn:
+            self._conn.execute("INSERT OR REPLACE INTO images VALUES (?, ?, ?, ?, NULL)",
+                               (url, digest, content_type, time.time()))
+        self._memory[url] = data
+
+    def close(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
+        self._conn.close()
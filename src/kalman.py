@@ -0,0 +1,156 @@
+import numpy as np
+import pandas as pd
+
+from src.movement import contiguous_order, time_order, track_starts
+
+def _transition(dt, std_acc):
+    """Batched constant-velocity transition A and process noise Q for step sizes dt (B,)."""
+    B = dt.shape[0]
+    A = np.tile(np.eye(4), (B, 1, 1))
+    A[:, 0, 2] = dt
+    A[:, 1, 3] = dt
+
+    dt2 = dt ** 2
+    dt3 = dt2 * dt / 2.0
+    dt4 = dt2 * dt2 / 4.0
+    Q = np.zeros((B, 4, 4))
+    Q[:, 0, 0] = Q[:, 1, 1] = dt4
+    Q[:, 0, 2] = Q[:, 2, 0] = Q[:, 1, 3] = Q[:, 3, 1] = dt3
+    Q[:, 2, 2] = Q[:, 3, 3] = dt2
+    return A, Q * std_acc ** 2
+
+
+def kalman_batch(z, dt, length, std_acc=1.0, meas_std=0.1, smooth=False):
+    """
+    Constant-velocity Kalman filter over a batch of padded tracks.
+    The state is [lat, lon, v_lat, v_lon]; only the position is observed.
+
+    z: (B, T, 2) measured positions, NaN where a ping has no fix.
+    dt: (B, T) step before each ping (dt[:, 0] is ignored).
+    length: (B,) number of real pings per track; steps beyond it are padding.
+
+    Runs the forward filter for all tracks at once, one time step per
+    iteration. With smooth=True a Rauch-Tung-Striebel backward pass is
+    added for offline reprocessing. Returns state means (B, T, 4).
+    """
+    B, T = z.shape[:2]
+    R = np.eye(2) * meas_std ** 2
+
+    x = np.zeros((B, 4))
+    x[:, :2] = np.nan_to_num(z[:, 0])
+    P = np.tile(np.eye(4), (B, 1, 1))
+
+    xs = np.empty((B, T, 4))
+    if smooth:
+        Ps = np.empty((B, T, 4, 4))
+        x_pred_all = np.empty((B, T, 4))
+        P_pred_all = np.empty((B, T, 4, 4))
+        A_all = np.empty((B, T, 4, 4))
+
+    for t in range(T):
+        active = t < length
+        A, Q = _transition(np.where(active, dt[:, t], 0.0) if t else np.zeros(B), std_acc)
+
+        # Predict
+        x_pred = np.einsum('bij,bj->bi', A, x)
+        P_pred = A @ P @ A.transpose(0, 2, 1) + Q
+
+        # Update (only where there is a fix)
+        S = P_pred[:, :2, :2] + R
+        K = P_pred[:, :, :2] @ np.linalg.inv(S)
+        innovation = np.nan_to_num(z[:, t] - x_pred[:, :2])
+        x_upd = x_pred + np.einsum('bij,bj->bi', K, innovation)
+        P_upd = P_pred - K @ P_pred[:, :2, :]
+
+        observed = active & np.isfinite(z[:, t]).all(axis=1)
+        x = np.where(observed[:, None], x_upd, np.where(active[:, None], x_pred, x))
+        P = np.where(observed[:, None, None], P_upd, np.where(active[:, None, None], P_pred, P))
+        xs[:, t] = x
+
+        if smooth:
+            Ps[:, t] = P
+            x_pred_all[:, t] = x_pred
+            P_pred_all[:, t] = P_pred
+            A_all[:, t] = A
+
+    if not smooth:
+        return xs
+
+    # Rauch-Tung-Striebel backward pass
+    x_s = xs.copy()
+    P_s = Ps.copy()
+    for t in range(T - 2, -1, -1):
+        has_next = (t + 1) < length
+        if not has_next.any():
+            continue
+        A_next = A_all[:, t + 1]
+        C = Ps[:, t] @ A_next.transpose(0, 2, 1) @ np.linalg.pinv(P_pred_all[:, t + 1])
+        x_back = xs[:, t] + np.einsum('bij,bj->bi', C, x_s[:, t + 1] - x_pred_all[:, t + 1])
+        P_back = Ps[:, t] + C @ (P_s[:, t + 1] - P_pred_all[:, t + 1]) @ C.transpose(0, 2, 1)
+        x_s[:, t] = np.where(has_next[:, None], x_back, xs[:, t])
+        P_s[:, t] = np.where(has_next[:, None, None], P_back, Ps[:, t])
+    return x_s
+
+
+def smooth_tracks(lat, lon, time_s=None, track_ids=None, smooth=False,
+                  std_acc=1.0, meas_std=0.1, time_scale_s=86400.0, default_dt=1.0):
+    """
+    Kalman-filters one or many tracks given as flat ping arrays.
+
+    dt is taken from time_s (seconds) in units of time_scale_s (days by
+    default); missing or unparsable times fall back to default_dt. Pings may
+    come in any order (feeds are often newest-first): each track is filtered
+    in time order, untimed pings last, and results come back in input order.
+    Tracks are batched into a padded (tracks, pings) tensor so all sharks
+    are filtered together. Because the forward filter is causal, the
+    estimate at ping i equals filtering the track up to i's time - callers
+    can run it once per track and index into the result.
+
+    Returns a dict of arrays aligned with the input: lat, lon, v_lat, v_lon
+    (velocities in degrees per time unit).
+    """
+    lat = np.asarray(lat, dtype=np.float64)
+    lon = np.asarray(lon, dtype=np.float64)
+    n = lat.shape[0]
+    if n == 0:
+        empty = np.empty(0)
+        return {'lat': empty, 'lon': empty, 'v_lat': empty, 'v_lon': empty}
+
+    if track_ids is None:
+        codes = np.zeros(n, dtype=np.int64)
+    else:
+        codes, _ = pd.factorize(np.asarray(track_ids))
+    order = contiguous_order(codes) if time_s is None else time_order(codes, time_s)
+    if order is None:
+        order = np.arange(n)
+    codes = codes[order]
+
+    if time_s is None:
+        dt = np.full(n, default_dt)
+    else:
+        t = np.asarray(time_s, dtype=np.float64)[order]
+        dt = np.empty(n)
+        dt[0] = default_dt
+        dt[1:] = (t[1:] - t[:-1]) / time_scale_s
+        dt[~np.isfinite(dt)] = default_dt
+
+    # Scatter pings into a padded (tracks, max_len) layout
+    starts = track_starts(codes)
+    track = np.cumsum(starts) - 1
+    start_pos = np.flatnonzero(starts)
+    pos = np.arange(n) - start_pos[track]
+    n_tracks = start_pos.shape[0]
+    length = np.bincount(track, minlength=n_tracks)
+    T = int(length.max())
+
+    z = np.full((n_tracks, T, 2), np.nan)
+    z[track, pos, 0] = lat[order]
+    z[track, pos, 1] = lon[order]
+    dt_pad = np.zeros((n_tracks, T))
+    dt_pad[track, pos] = dt
+
+    states = kalman_batch(z, dt_pad, length, std_acc=std_acc, meas_std=meas_std, smooth=smooth)
+
+    out = np.empty((n, 4))
+    out[order] = states[track, pos]
+    return {'lat': out[:, 0], 'lon': out[:, 1], 'v_lat': out[:, 2], 'v_lon': out[:, 3]}
@@ -0,0 +1,149 @@
+import numpy as np
+import pandas as pd
+
+EARTH_RADIUS_M = 6371000.0
+
+
+def to_epoch_seconds(times):
+    """Converts datetimes (any pandas-parsable form) to float seconds, NaN for NaT."""
+    times = pd.to_datetime(pd.Series(times), errors='coerce', utc=True).dt.tz_convert(None)
+    t_ns = times.to_numpy(dtype='datetime64[ns]')
+    seconds = t_ns.astype('int64') / 1e9
+    seconds[np.isnat(t_ns)] = np.nan
+    return seconds
+
+
+def track_starts(track_ids):
+    """Boolean mask that is True at the first ping of every contiguous track."""
+    ids = np.asarray(track_ids)
+    starts = np.ones(ids.shape[0], dtype=bool)
+    if ids.shape[0] > 1:
+        starts[1:] = ids[1:] != ids[:-1]
+    return starts
+
+
+def contiguous_order(track_ids):
+    """
+    Returns a permutation that makes every track contiguous, or None if the
+    pings are already grouped. The sort is stable, so each track keeps its
+    original ping order.
+    """
+    codes = np.asarray(track_ids)
+    n_runs = int(track_starts(codes).sum())
+    if n_runs == len(np.unique(codes)):
+        return None
+    return np.argsort(codes, kind='stable')
+
+
+def time_order(track_ids, time_s):
+    """
+    Returns a permutation that makes every track contiguous with its pings in
+    time order, or None if they already are. Feeds often list pings
+    newest-first; metrics and filters need them oldest-first. Pings without
+    a time go after the timed pings of their track, and ties keep their
+    original order.
+    """
+    t = np.asarray(time_s, dtype=np.float64)
+    codes = np.zeros(t.shape[0], dtype=np.int64) if track_ids is None else np.asarray(track_ids)
+    order = np.lexsort((t, codes))
+    if np.array_equal(order, np.arange(t.shape[0])):
+        return None
+    return order
+
+
+def _previous(values, starts):
+    prev = np.empty_like(values, dtype=np.float64)
+    prev[0] = np.nan
+    prev[1:] = values[:-1]
+    prev[starts] = np.nan
+    return prev
+
+
+def track_metrics(lat, lon, time_s, track_ids=None, dtype=np.float64):
+    """
+    Vectorized step/speed/bearing/turn metrics for one or many tracks.
+
+    Inputs are 1-D arrays of equal length, grouped so each track is
+    contiguous (see contiguous_order). time_s is seconds since any epoch
+    (NaN for missing). Metrics are never computed across track boundaries:
+    the first ping of each track gets NaN step/dt/speed/bearing and the first
+    two get NaN turn.
+
+    Returns a dict with lat_prev, lon_prev, step_m, dt_s, speed_ms,
+    bearing (degrees clockwise from north, 0-360) and turn_deg (signed
+    heading change, -180 to 180). Maths runs in float64; outputs are cast
+    to `dtype` (float32 halves memory for large archives).
+    """
+    lat = np.asarray(lat, dtype=np.float64)
+    lon = np.asarray(lon, dtype=np.float64)
+    time_s = np.asarray(time_s, dtype=np.float64)
+    n = lat.shape[0]
+    if track_ids is None:
+        starts = np.zeros(n, dtype=bool)
+        starts[:1] = True
+    else:
+        starts = track_starts(track_ids)
+
+    if n == 0:
+        empty = np.empty(0, dtype=dtype)
+        return {k: empty for k in ['lat_prev', 'lon_prev', 'step_m', 'dt_s', 'speed_ms', 'bearing', 'turn_deg']}
+
+    lat_prev = _previous(lat, starts)
+    lon_prev = _previous(lon, starts)
+    dt_s = time_s - _previous(time_s, starts)
+
+    phi1 = np.radians(lat_prev)
+    phi2 = np.radians(lat)
+    dphi = phi2 - phi1
+    dlmb = np.radians(lon - lon_prev)
+    cos_phi1 = np.cos(phi1)
+    cos_phi2 = np.cos(phi2)
+
+    # Haversine step length
+    a = np.sin(dphi / 2.0) ** 2 + cos_phi1 * cos_phi2 * np.sin(dlmb / 2.0) ** 2
+    step_m = 2.0 * EARTH_RADIUS_M * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        speed_ms = np.where(dt_s > 0, step_m / dt_s, np.nan)
+
+    # Initial great-circle bearing of each step
+    y = np.sin(dlmb) * cos_phi2
+    x = cos_phi1 * np.sin(phi2) - np.sin(phi1) * cos_phi2 * np.cos(dlmb)
+    bearing = np.degrees(np.arctan2(y, x)) % 360.0
+    bearing[step_m == 0] = np.nan  # a zero-length step has no heading
+
+    # Turning angle between consecutive steps of the same track
+    bearing_prev = _previous(bearing, starts)
+    turn_deg = (bearing - bearing_prev + 180.0) % 360.0 - 180.0
+
+    out = {
+        'lat_prev': lat_prev,
+        'lon_prev': lon_prev,
+        'step_m': step_m,
+        'dt_s': dt_s,
+        'speed_ms': speed_ms,
+        'bearing': bearing,
+        'turn_deg': turn_deg,
+    }
+    if dtype != np.float64:
+        out = {k: v.astype(dtype) for k, v in out.items()}
+    return out
+
+
+def chronological_metrics(lat, lon, time_s, track_ids=None, dtype=np.float64):
+    """
+    track_metrics for pings in any order (e.g. newest-first). Each track is
+    measured in time order and the metrics are returned aligned with the
+    input rows.
+    """
+    order = time_order(track_ids, time_s)
+    if order is None:
+        return track_metrics(lat, lon, time_s, track_ids, dtype=dtype)
+    ids = None if track_ids is None else np.asarray(track_ids)[order]
+    metrics = track_metrics(np.asarray(lat)[order], np.asarray(lon)[order], np.asarray(time_s)[order], ids,
+                            dtype=dtype)
+    out = {}
+    for key, values in metrics.items():
+        out[key] = np.empty_like(values)
+        out[key][order] = values
+    return out
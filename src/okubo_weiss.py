@@ -0,0 +1,156 @@
+from pathlib import Path
+
+import numpy as np
+
+from src.spatial_index import GridIndex
+
+G = 9.81
+OMEGA = 7.2921e-5
+EARTH_RADIUS_M = 6371000.0
+F_MIN = 1e-5  # |f| floor near the equator, where geostrophy breaks down
+
+
+def okubo_weiss_field(ssh, lat, lon):
+    """
+    Computes the Okubo-Weiss parameter over a whole SSH grid.
+
+    ssh is (n_lat, n_lon) in metres on the 1-D axes lat/lon (degrees, any
+    spacing). Geostrophic velocities and their gradients use centred finite
+    differences with the true metric spacing: dy = R dlat and
+    dx = R cos(lat) dlon, so cells shrink towards the poles.
+
+    Returns a dict of 2-D arrays: W, vorticity, strain (total strain
+    magnitude), u and v.
+    """
+    ssh = np.asarray(ssh, dtype=np.float64)
+    lat = np.asarray(lat, dtype=np.float64)
+    lon = np.asarray(lon, dtype=np.float64)
+
+    y_m = EARTH_RADIUS_M * np.radians(lat)
+    lon_r = np.radians(lon)
+    cos_lat = np.maximum(np.cos(np.radians(lat)), 1e-6)[:, None]
+
+    def d_dy(field):
+        return np.gradient(field, y_m, axis=0)
+
+    def d_dx(field):
+        return np.gradient(field, lon_r, axis=1) / (EARTH_RADIUS_M * cos_lat)
+
+    f = 2 * OMEGA * np.sin(np.radians(lat))
+    f = np.where(np.abs(f) < F_MIN, np.copysign(F_MIN, f), f)[:, None]
+
+    # Geostrophic balance: u = -g/f dη/dy, v = g/f dη/dx
+    u = -G / f * d_dy(ssh)
+    v = G / f * d_dx(ssh)
+
+    du_dx, du_dy = d_dx(u), d_dy(u)
+    dv_dx, dv_dy = d_dx(v), d_dy(v)
+
+    s_n = du_dx - dv_dy
+    s_s = dv_dx + du_dy
+    vorticity = dv_dx - du_dy
+    W = s_n**2 + s_s**2 - vorticity**2
+    return {'W': W, 'vorticity': vorticity, 'strain': np.sqrt(s_n**2 + s_s**2), 'u': u, 'v': v}
+
+
+def _coarsen(field, axis_lat, axis_lon):
+    """2x2 block-mean (NaN-aware) of a field and its axes."""
+    ny, nx = (field.shape[0] // 2) * 2, (field.shape[1] // 2) * 2
+    blocks = field[:ny, :nx].reshape(ny // 2, 2, nx // 2, 2)
+    with np.errstate(invalid='ignore'):
+        count = np.isfinite(blocks).sum(axis=(1, 3))
+        total = np.nansum(blocks, axis=(1, 3))
+        coarse = np.where(count > 0, total / np.maximum(count, 1), np.nan)
+    return coarse, axis_lat[:ny].reshape(-1, 2).mean(axis=1), axis_lon[:nx].reshape(-1, 2).mean(axis=1)
+
+
+class OkuboWeissPyramid:
+    """
+    Okubo-Weiss W, vorticity and strain precomputed for one SSH grid, stored
+    at full resolution plus successive 2x coarsenings. Point lookups are
+    bilinear interpolations on a chosen level; the levels also back the
+    map layer so large grids render at a screen-sized resolution.
+    """
+    FIELDS = ('W', 'vorticity', 'strain')
+
+    def __init__(self, levels, sigma_w):
+        self.levels = levels  # list of dicts: lat, lon, W, vorticity, strain
+        self.sigma_w = sigma_w
+
+    @classmethod
+    def build(cls, ssh, lat, lon, n_levels=4):
+        fields = okubo_weiss_field(ssh, lat, lon)
+        level = {'lat': np.asarray(lat, dtype=np.float64), 'lon': np.asarray(lon, dtype=np.float64)}
+        level.update({k: fields[k] for k in cls.FIELDS})
+        levels = [level]
+        while len(levels) < n_levels and min(level['W'].shape) >= 4:
+            nxt = {}
+            for k in cls.FIELDS:
+                nxt[k], nxt['lat'], nxt['lon'] = _coarsen(level[k], level['lat'], level['lon'])
+            levels.append(nxt)
+            level = nxt
+        sigma_w = float(np.nanstd(fields['W'])) if np.isfinite(fields['W']).any() else 0.0
+        return cls(levels, sigma_w)
+
+    def save(self, path):
+        arrays = {'sigma_w': np.array(self.sigma_w), 'n_levels': np.array(len(self.levels))}
+        for i, level in enumerate(self.levels):
+            for k, v in level.items():
+                arrays[f"{k}_{i}"] = v
+        np.savez(path, **arrays)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            n = int(data['n_levels'])
+            levels = [{k: data[f"{k}_{i}"] for k in ('lat', 'lon') + cls.FIELDS} for i in range(n)]
+            return cls(levels, float(data['sigma_w']))
+
+    @classmethod
+    def from_grid_store(cls, store, cache_path=None, n_levels=4):
+        """
+        Loads the pyramid persisted next to the grids, rebuilding it when
+        map_ssh.npy is newer than the cache. Returns None without SSH data.
+        """
+        ssh = store.layer('map_ssh')
+        if ssh is None or store.lat_axis is None or store.lon_axis is None:
+            return None
+        cache_path = Path(cache_path or store.root / "okubo_weiss_pyramid.npz")
+        ssh_path = store.root / "map_ssh.npy"
+        if cache_path.exists() and cache_path.stat().st_mtime >= ssh_path.stat().st_mtime:
+            return cls.load(cache_path)
+        pyramid = cls.build(ssh, store.lat_axis, store.lon_axis, n_levels=n_levels)
+        pyramid.save(cache_path)
+        return pyramid
+
+    def level_for(self, max_cells):
+        """Finest level whose longest side is at most max_cells."""
+        for i, level in enumerate(self.levels):
+            if max(level['W'].shape) <= max_cells:
+                return i
+        return len(self.levels) - 1
+
+    def field(self, name='W', level=0):
+        lvl = self.levels[level]
+        return lvl[name], lvl['lat'], lvl['lon']
+
+    def lookup(self, lat, lon, name='W', level=0):
+        """Bilinear interpolation of a field at points (scalar or arrays)."""
+        lvl = self.levels[level]
+        grid = lvl[name]
+        index = GridIndex(lvl['lat'], lvl['lon'])
+        out = index.bilinear(grid, lat, lon)
+        # Fall back to the nearest cell next to coastlines / data gaps
+        nearest, _ = index.sample(grid, lat, lon)
+        out = np.where(np.isfinite(out), out, nearest)
+        return out if np.ndim(lat) else float(out[0])
+
+    def status(self, W):
+        """Human-friendly eddy label using the W0 = -0.2 sigma_W threshold."""
+        if not np.isfinite(W):
+            return "❔ No SSH coverage"
+        if W < -0.2 * self.sigma_w:
+            return "🌀 Eddy Edge / Core (Foraging)"
+        elif W < 0:
+            return "🔄 Weak Eddy Strain"
+        return "🌊 Strain / Laminar"
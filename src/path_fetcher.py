@@ -0,0 +1,150 @@
+import datetime
+import random
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import pandas as pd
+import requests
+from requests.adapters import HTTPAdapter
+
+HISTORY_URL = "https://www.ocearch.org/tracker/detail/{shark_id}/json"
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+
+class PathCache:
+    """
+    SQLite store of shark ping histories, keyed by (shark_id, tz).
+    Also keeps the newest tz and the HTTP validators (ETag / Last-Modified)
+    per shark so refreshes only merge pings we have not seen yet.
+    """
+    def __init__(self, path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        with self._conn:
+            self._conn.execute("""CREATE TABLE IF NOT EXISTS pings (
+                shark_id INTEGER, tz INTEGER, lat REAL, lon REAL, active INTEGER,
+                PRIMARY KEY (shark_id, tz))""")
+            self._conn.execute("""CREATE TABLE IF NOT EXISTS sharks (
+                shark_id INTEGER PRIMARY KEY, last_tz INTEGER, etag TEXT,
+                last_modified TEXT, fetched_at REAL)""")
+
+    def state(self, shark_id):
+        """(last_tz, etag, last_modified) for a shark, or Nones if never fetched."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT last_tz, etag, last_modified FROM sharks WHERE shark_id = ?", (shark_id,)).fetchone()
+        return row if row else (None, None, None)
+
+    def merge(self, shark_id, pings, etag=None, last_modified=None):
+        """Inserts pings newer than the cached history. Returns the number added."""
+        last_tz = self.state(shark_id)[0]
+        rows = [(shark_id, int(p['tz']), float(p['latitude']), float(p['longitude']), int(p.get('active') == "1"))
+                for p in pings if last_tz is None or int(p['tz']) > last_tz]
+        newest = max([r[1] for r in rows] + ([last_tz] if last_tz is not None else []), default=None)
+        with self._lock, self._conn:
+            self._conn.executemany("INSERT OR IGNORE INTO pings VALUES (?, ?, ?, ?, ?)", rows)
+            self._conn.execute(
+                "INSERT OR REPLACE INTO sharks VALUES (?, ?, ?, ?, ?)",
+                (shark_id, newest, etag, last_modified, time.time()))
+        return len(rows)
+
+    def touch(self, shark_id):
+        with self._lock, self._conn:
+            self._conn.execute("UPDATE sharks SET fetched_at = ? WHERE shark_id = ?", (time.time(), shark_id))
+
+    def load(self, shark_id):
+        """Cached history as a DataFrame (datetime, lat, lon, active), newest first."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT tz, lat, lon, active FROM pings WHERE shark_id = ? ORDER BY tz DESC", (shark_id,)).fetchall()
+        return pd.DataFrame({
+            "datetime": [datetime.datetime.fromtimestamp(r[0]) for r in rows],
+            "lat": [r[1] for r in rows],
+            "lon": [r[2] for r in rows],
+            "active": [bool(r[3]) for r in rows],
+        }, columns=["datetime", "lat", "lon", "active"])
+
+    def close(self):
+        self._conn.close()
+
+
+class PathFetcher:
+    """
+    Concurrent path-history downloader backed by a PathCache.
+
+    Requests share one pooled requests.Session (connection reuse) and run on
+    a bounded thread pool. Each request is conditional on the cached
+    ETag/Last-Modified, failures are retried with exponential backoff and
+    jitter, and only pings newer than the cached history are stored.
+    retries / timeout are the policy for background (fetch_many) pulls;
+    interactive callers can pass a smaller budget to fetch(). `url_template`
+    can point at a local stub server for testing.
+    """
+    def __init__(self, cache_path="data/cache/shark_paths.sqlite", url_template=HISTORY_URL,
+                 max_workers=16, retries=3, backoff=0.5, timeout=5, session=None):
+        self.cache = PathCache(cache_path)
+        self.url_template = url_template
+        self.max_workers = max_workers
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=max_workers, pool_maxsize=max_workers)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            session.headers["User-Agent"] = "Mozilla/5.0"
+        self.session = session
+
+    def refresh(self, shark_id, retries=None, timeout=None):
+        """
+        Downloads new pings for one shark. Returns the number of new pings
+        (raises on failure). retries / timeout override the fetcher's policy.
+        """
+        retries = self.retries if retries is None else retries
+        timeout = self.timeout if timeout is None else timeout
+        _, etag, last_modified = self.cache.state(shark_id)
+        headers = {}
+        if etag:
+            headers["If-None-Match"] = etag
+        if last_modified:
+            headers["If-Modified-Since"] = last_modified
+
+        url = self.url_template.format(shark_id=shark_id)
+        for attempt in range(retries + 1):
+            try:
+                response = self.session.get(url, headers=headers, timeout=timeout)
+                if response.status_code == 304:
+                    self.cache.touch(shark_id)
+                    return 0
+                if response.status_code in RETRY_STATUS:
+                    raise requests.HTTPError(f"HTTP {response.status_code}", response=response)
+                response.raise_for_status()
+                pings = response.json().get('pings', [])
+                return self.cache.merge(shark_id, pings, response.headers.get("ETag"),
+                                        response.headers.get("Last-Modified"))
+            except (requests.ConnectionError, requests.Timeout, requests.HTTPError) as e:
+                status = getattr(getattr(e, 'response', None), 'status_code', None)
+                if attempt == retries or (status is not None and status not in RETRY_STATUS):
+                    raise
+                time.sleep(self.backoff * (2 ** attempt) * (1 + random.random()))
+
+    def fetch(self, shark_id, retries=None, timeout=None):
+        """History for one shark; falls back to the cached pings if the network fails."""
+        try:
+            self.refresh(shark_id, retries, timeout)
+        except Exception as e:
+            print(f"⚠️ Could not refresh path for {shark_id}: {e}")
+        return self.cache.load(shark_id)
+
+    def fetch_many(self, shark_ids):
+        """Histories for many sharks, downloaded concurrently. Returns {shark_id: DataFrame}."""
+        shark_ids = list(dict.fromkeys(shark_ids))
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            frames = pool.map(self.fetch, shark_ids)
+            return dict(zip(shark_ids, frames))
@@ -0,0 +1,212 @@
+import hashlib
+import json
+import os
+import pickle
+import threading
+import time
+import tracemalloc
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from pathlib import Path
+
+CHUNK_BYTES = 1 << 20
+
+
+class Stage:
+    """
+    One step of a Pipeline.
+
+    func is called with the outputs of `deps` (positionally, in order) and
+    `params` (as keywords). `after` only orders the stage behind others
+    (e.g. "fetch before indexing the download folder") without passing
+    data. `files` lists input files, or is a callable returning them that is
+    evaluated when the stage is about to run, so it sees what upstream
+    stages wrote. Stages with cache=False (side effects such as auth or
+    downloads) always run and cannot be data dependencies.
+    """
+    def __init__(self, name, func, deps=(), after=(), files=(), params=None, cache=True, version=1):
+        self.name = name
+        self.func = func
+        self.deps = tuple(deps)
+        self.after = tuple(after)
+        self.files = files
+        self.params = params or {}
+        self.cache = cache
+        self.version = version
+
+    def input_files(self):
+        files = self.files() if callable(self.files) else self.files
+        return sorted(Path(f) for f in files)
+
+
+class FileDigests:
+    """
+    Content hashes of input files, remembered by (path, size, mtime) so
+    unchanged multi-GB granules are not re-read on every run.
+    """
+    def __init__(self, path):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        try:
+            self._known = json.loads(self.path.read_text())
+        except (OSError, ValueError):
+            self._known = {}
+
+    def digest(self, path):
+        path = Path(path)
+        if not path.exists():
+            return "missing"
+        st = path.stat()
+        stamp = f"{st.st_size}:{st.st_mtime_ns}"
+        key = str(path.resolve())
+        with self._lock:
+            known = self._known.get(key)
+        if known and known[0] == stamp:
+            return known[1]
+
+        h = hashlib.blake2b(digest_size=16)
+        with open(path, 'rb') as f:
+            while chunk := f.read(CHUNK_BYTES):
+                h.update(chunk)
+        with self._lock:
+            self._known[key] = [stamp, h.hexdigest()]
+        return h.hexdigest()
+
+    def save(self):
+        with self._lock:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_suffix(".tmp")
+            tmp.write_text(json.dumps(self._known))
+            os.replace(tmp, self.path)
+
+
+class Pipeline:
+    """
+    Declarative stage graph with on-disk, content-addressed caching.
+
+    A stage's cache key hashes its name, version, params, the contents of
+    its input files and the keys of its data dependencies, so editing one
+    input invalidates exactly the stages downstream of it. Outputs are
+    pickled under cache_dir as <stage>-<key>.pkl. Stages whose dependencies
+    are done run concurrently on a thread pool. Every stage logs wall time
+    and traced memory (net change and process-wide peak, shared by stages
+    running at the same time).
+    """
+    def __init__(self, stages, cache_dir="data/cache/pipeline", max_workers=4, trace_memory=True):
+        self.stages = {s.name: s for s in stages}
+        self.cache_dir = Path(cache_dir)
+        self.max_workers = max_workers
+        self.trace_memory = trace_memory
+        self.digests = FileDigests(self.cache_dir / "file_digests.json")
+        self.log = []
+        self._check()
+
+    def _check(self):
+        for s in self.stages.values():
+            for d in s.deps + s.after:
+                if d not in self.stages:
+                    raise ValueError(f"Stage {s.name!r} depends on unknown stage {d!r}")
+            for d in s.deps:
+                if not self.stages[d].cache and s.cache:
+                    raise ValueError(f"Cached stage {s.name!r} cannot take data from uncached stage {d!r}; use after=")
+        self._order()  # raises on cycles
+
+    def _order(self):
+        order, state = [], {}
+
+        def visit(name):
+            if state.get(name) == 'done':
+                return
+            if state.get(name) == 'visiting':
+                raise ValueError(f"Pipeline has a cycle through {name!r}")
+            state[name] = 'visiting'
+            for d in self.stages[name].deps + self.stages[name].after:
+                visit(d)
+            state[name] = 'done'
+            order.append(name)
+
+        for name in self.stages:
+            visit(name)
+        return order
+
+    def key(self, stage, keys):
+        h = hashlib.blake2b(digest_size=16)
+        h.update(f"{stage.name}:{stage.version}:{repr(sorted(stage.params.items()))}".encode())
+        for f in stage.input_files():
+            h.update(f"{f}:{self.digests.digest(f)}".encode())
+        for d in stage.deps:
+            h.update(f"{d}:{keys[d]}".encode())
+        return h.hexdigest()
+
+    def _run_stage(self, stage, keys, outputs, force):
+        start = time.perf_counter()
+        if self.trace_memory:
+            before = tracemalloc.get_traced_memory()[0]
+
+        key = self.key(stage, keys) if stage.cache else None
+        path = self.cache_dir / f"{stage.name}-{key}.pkl" if key else None
+        status = 'ran'
+        if path is not None and path.exists() and stage.name not in force:
+            with open(path, 'rb') as f:
+                result = pickle.load(f)
+            status = 'cached'
+        else:
+            result = stage.func(*[outputs[d] for d in stage.deps], **stage.params)
+            if path is not None:
+                path.parent.mkdir(parents=True, exist_ok=True)
+                tmp = path.with_suffix(f".{threading.get_ident()}.tmp")
+                with open(tmp, 'wb') as f:
+                    pickle.dump(result, f, protocol=pickle.HIGHEST_PROTOCOL)
+                os.replace(tmp, path)
+                for old in self.cache_dir.glob(f"{stage.name}-*.pkl"):
+                    if old != path:
+                        old.unlink(missing_ok=True)
+
+        entry = {'stage': stage.name, 'status': status, 'key': key,
+                 'seconds': round(time.perf_counter() - start, 3)}
+        if self.trace_memory:
+            current, peak = tracemalloc.get_traced_memory()
+            entry['mem_delta_mb'] = round((current - before) / 1e6, 1)
+            entry['mem_peak_mb'] = round(peak / 1e6, 1)
+        print(f"⏱️ {stage.name}: {status} in {entry['seconds']:.2f}s"
+              + (f" (Δ{entry['mem_delta_mb']} MB, peak {entry['mem_peak_mb']} MB)" if self.trace_memory else ""))
+        return key, result, entry
+
+    def run(self, targets=None, force=()):
+        """
+        Runs the stages needed for `targets` (default: all). Stages named in
+        `force` rerun even if cached. Returns {stage name: output}.
+        """
+        needed = set()
+
+        def need(name):
+            if name not in needed:
+                needed.add(name)
+                for d in self.stages[name].deps + self.stages[name].after:
+                    need(d)
+
+        for name in (targets or self.stages):
+            need(name)
+
+        started_tracing = self.trace_memory and not tracemalloc.is_tracing()
+        if started_tracing:
+            tracemalloc.start()
+        keys, outputs, pending, running = {}, {}, set(needed), {}
+        self.log = []
+        try:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+                while pending or running:
+                    for name in sorted(pending):
+                        stage = self.stages[name]
+                        if all(d in outputs for d in stage.deps + stage.after):
+                            pending.discard(name)
+                            running[pool.submit(self._run_stage, stage, keys, outputs, set(force))] = name
+                    done, _ = wait(running, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        name = running.pop(future)
+                        keys[name], outputs[name], entry = future.result()
+                        self.log.append(entry)
+        finally:
+            self.digests.save()
+            if started_tracing:
+                tracemalloc.stop()
+        return outputs
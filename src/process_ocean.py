@@ -1,15 +1,20 @@
 import xarray as xr
 import numpy as np
 import pandas as pd
-from math import radians, sin, cos, asin, sqrt, atan2, degrees
 
-def sample_chlorophyll(tag_df, satellite_file):
+from src.movement import contiguous_order, to_epoch_seconds, track_metrics, track_starts
+from src.spatial_index import index_for
+
+CHLOROPHYLL_VARIABLES = ('chlor_a', 'chlorophyll', 'Rrs_443')
+
+
+def open_chlorophyll_granule(satellite_file):
     """
-    Takes a DataFrame of shark tags (lon, lat, time) and samples
-    Chlorophyll-a from the given satellite NetCDF file.
+    Reads the chlorophyll field and its navigation from a PACE L2 / MODIS L3
+    NetCDF file. Returns (values, lat, lon, attrs); lat/lon are 2-D for
+    swaths and 1-D axes for mapped grids. Raises ValueError if the file has
+    no usable chlorophyll or coordinates.
     """
-    print(f"Sampling Chlorophyll from {satellite_file}...")
-    
     # Open the datasets
     try:
         ds_geo = xr.open_dataset(satellite_file, group='geophysical_data')
@@ -22,19 +27,17 @@ def sample_chlorophyll(tag_df, satellite_file):
             ds_geo = xr.open_dataset(satellite_file)
             ds_nav = None
         except Exception as e:
-            print(f"Error opening file: {e}")
-            return tag_df
+            raise ValueError(f"Error opening file: {e}")
 
     # Find the chlorophyll variable
     var_name = None
-    for v in ['chlor_a', 'chlorophyll', 'Rrs_443']:
+    for v in CHLOROPHYLL_VARIABLES:
         if v in ds_geo:
             var_name = v
             break
             
     if not var_name:
-        print("Error: No chlorophyll variable found in file.")
-        return tag_df
+        raise ValueError("Error: No chlorophyll variable found in file.")
 
     # For PACE data, lat/lon are in navigation_data
     if ds_nav is not None and 'latitude' in ds_nav and 'longitude' in ds_nav:
@@ -46,54 +49,87 @@ def sample_chlorophyll(tag_df, satellite_file):
         lon_2d = ds_geo['lon'].values if 'lon' in ds_geo else None
         
     if lat_2d is None or lon_2d is None:
-        print("Error: Could not find latitude/longitude data.")
+        raise ValueError("Error: Could not find latitude/longitude data.")
+
+    values = ds_geo[var_name].values
+    attrs = dict(ds_geo.attrs)
+    ds_geo.close()
+    if ds_nav is not None:
+        ds_nav.close()
+    return values, lat_2d, lon_2d, attrs
+
+def sample_chlorophyll(tag_df, satellite_file, max_distance_km=None):
+    """
+    Takes a DataFrame of shark tags (lon, lat, time) and samples
+    Chlorophyll-a from the given satellite NetCDF file.
+
+    All tags are matched in one batched nearest-pixel query against a
+    spatial index of the granule. The great-circle distance to the matched
+    pixel is stored in `chl_distance_km`; tags further than max_distance_km
+    from any valid pixel get NaN.
+    """
+    print(f"Sampling Chlorophyll from {satellite_file}...")
+
+    try:
+        values, lat_2d, lon_2d, _ = open_chlorophyll_granule(satellite_file)
+    except ValueError as e:
+        print(e)
         return tag_df
 
-    # Sample values for each shark location
-    sampled_values = []
-    for _, row in tag_df.iterrows():
-        shark_lat = row['lat']
-        shark_lon = row['lon']
-        
-        # Calculate distances to all pixels
-        distances = ((lat_2d - shark_lat)**2 + (lon_2d - shark_lon)**2)**0.5
-        min_idx = np.unravel_index(np.argmin(distances), distances.shape)
-        
-        # Get the value at nearest pixel
-        value = ds_geo[var_name].values[min_idx]
-        sampled_values.append(value)
+    # Build the index once per granule (L3 mapped files only carry 1-D axes)
+    index = index_for(lat_2d, lon_2d)
+
+    # Sample every shark location in a single query
+    sampled_values, distances_km = index.sample(
+        values,
+        tag_df['lat'].to_numpy(),
+        tag_df['lon'].to_numpy(),
+        max_distance_km=max_distance_km,
+    )
 
     # Add to DataFrame
     tag_df['chlorophyll'] = sampled_values
+    tag_df['chl_distance_km'] = distances_km
     return tag_df
 
-def calculate_movement_metrics(df):
+def calculate_movement_metrics(df, float32=False):
     """
-    Calculates Step Length (meters), Speed (m/s), and Turning Angle.
+    Calculates Step Length (meters), Speed (m/s), Bearing and Turning Angle
+    per shark in one vectorized pass.
+
+    Pings are compared only with the previous ping of the same `shark_id`,
+    so the first ping of every shark has NaN metrics. Set float32=True to
+    store the metric columns as float32.
     """
     print("Calculating movement metrics...")
     df = df.copy()
-    
-    # Shift columns to compare "Now" vs "Previous"
-    df['lon_prev'] = df['lon'].shift(1)
-    df['lat_prev'] = df['lat'].shift(1)
-    df['time_prev'] = df['time'].shift(1)
-
-    # Haversine Distance Function
-    def get_dist(row):
-        if pd.isna(row['lon_prev']): return np.nan
-        lon1, lat1, lon2, lat2 = map(radians, [row['lon_prev'], row['lat_prev'], row['lon'], row['lat']])
-        dlon = lon2 - lon1
-        dlat = lat2 - lat1
-        a = sin(dlat/2)**2 + cos(lat1)*cos(lat2)*sin(dlon/2)**2
-        c = 2 * asin(sqrt(a))
-        return c * 6371000 # Earth radius in meters
-
-    # Calculate Distance
-    df['step_meters'] = df.apply(get_dist, axis=1)
-
-    # Calculate Speed (Distance / Time)
-    df['dt_seconds'] = (df['time'] - df['time_prev']).dt.total_seconds()
-    df['speed_ms'] = df['step_meters'] / df['dt_seconds']
-
-    return df
\ No newline at end of file
+
+    # Make each shark's pings contiguous (stable, so ping order is kept)
+    if 'shark_id' in df.columns:
+        codes, _ = pd.factorize(df['shark_id'])
+        order = contiguous_order(codes)
+        if order is not None:
+            df = df.iloc[order]
+            codes = codes[order]
+    else:
+        codes = None
+
+    times = pd.to_datetime(df['time'])
+    time_s = to_epoch_seconds(times)
+
+    metrics = track_metrics(
+        df['lat'].to_numpy(), df['lon'].to_numpy(), time_s, codes,
+        dtype=np.float32 if float32 else np.float64,
+    )
+    starts = track_starts(codes) if codes is not None else np.arange(len(df)) == 0
+
+    df['lon_prev'] = metrics['lon_prev']
+    df['lat_prev'] = metrics['lat_prev']
+    df['time_prev'] = times.shift(1).where(~starts)
+    df['step_meters'] = metrics['step_m']
+    df['dt_seconds'] = metrics['dt_s']
+    df['speed_ms'] = metrics['speed_ms']
+    df['bearing'] = metrics['bearing']
+    df['turn_deg'] = metrics['turn_deg']
+
+    return df
@@ -0,0 +1,252 @@
+import cProfile
+import functools
+import io
+import json
+import os
+import pstats
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+import pandas as pd
+
+PROFILE_ENV = "SHARK_PROFILE"
+LOG_DIR = Path(os.environ.get("SHARK_PROFILE_DIR", "data/cache/profile"))
+
+_local = threading.local()
+
+
+def enabled_by_env():
+    return os.environ.get(PROFILE_ENV, "").lower() not in ("", "0", "false", "no")
+
+
+class RerunProfile:
+    """
+    Timings and cache counters of one script run.
+
+    Sections nest: a section opened inside another is recorded under its
+    path ("habitat/predict_grid"), so the summary reads like a flame graph
+    folded into a table, with the time spent in each section itself (self)
+    next to the total including its children.
+    """
+    def __init__(self, label="", capture=None):
+        self.label = label
+        self.started = time.time()
+        self._t0 = time.perf_counter()
+        self.elapsed = None
+        self.sections = {}          # path -> [calls, total seconds, child seconds]
+        self.counters = {}          # name -> {'hit': n, 'miss': n}
+        self._stack = []
+        self.capture = capture      # None, "cprofile" or "pyinstrument"
+        self._profiler = None
+        self.profile_text = None
+        self.profile_path = None
+
+    def push(self, name):
+        self._stack.append(name)
+        return "/".join(self._stack)
+
+    def pop(self, path, seconds):
+        self._stack.pop()
+        entry = self.sections.setdefault(path, [0, 0.0, 0.0])
+        entry[0] += 1
+        entry[1] += seconds
+        if self._stack:
+            parent = self.sections.setdefault("/".join(self._stack), [0, 0.0, 0.0])
+            parent[2] += seconds
+
+    def count(self, name, hit):
+        counter = self.counters.setdefault(name, {'hit': 0, 'miss': 0})
+        counter['hit' if hit else 'miss'] += 1
+
+    def summary(self):
+        """Per-section table: path, depth, calls, total / self milliseconds and share of the run."""
+        total = self.elapsed if self.elapsed is not None else time.perf_counter() - self._t0
+        rows = [{'section': path, 'depth': path.count("/"), 'calls': calls,
+                 'total_ms': t * 1e3, 'self_ms': (t - child) * 1e3,
+                 'share': t / total if total else 0.0}
+                for path, (calls, t, child) in self.sections.items()]
+        columns = ['section', 'depth', 'calls', 'total_ms', 'self_ms', 'share']
+        return pd.DataFrame(rows, columns=columns).sort_values('section', ignore_index=True)
+
+    def cache_summary(self):
+        rows = [{'cache': name, 'hits': c['hit'], 'misses': c['miss'],
+                 'hit_rate': c['hit'] / (c['hit'] + c['miss'])}
+                for name, c in sorted(self.counters.items())]
+        return pd.DataFrame(rows, columns=['cache', 'hits', 'misses', 'hit_rate'])
+
+    # --------------------------------------------------------------------------
+    # Whole-run capture (cProfile, or pyinstrument when installed)
+    # --------------------------------------------------------------------------
+    def start_capture(self):
+        if self.capture == "pyinstrument":
+            try:
+                from pyinstrument import Profiler
+            except ImportError:
+                print("⚠️ pyinstrument not installed, using cProfile.")
+                self.capture = "cprofile"
+            else:
+                self._profiler = Profiler()
+                self._profiler.start()
+                return
+        if self.capture == "cprofile":
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+
+    def stop_capture(self, log_dir):
+        if self._profiler is None:
+            return
+        log_dir.mkdir(parents=True, exist_ok=True)
+        stamp = time.strftime("%Y%m%d-%H%M%S", time.localtime(self.started))
+        if self.capture == "pyinstrument":
+            self._profiler.stop()
+            self.profile_text = self._profiler.output_text(unicode=True, color=False)
+            self.profile_path = log_dir / f"rerun-{stamp}.html"
+            self.profile_path.write_text(self._profiler.output_html())
+        else:
+            self._profiler.disable()
+            self.profile_path = log_dir / f"rerun-{stamp}.prof"
+            self._profiler.dump_stats(self.profile_path)  # snakeviz / pstats
+            out = io.StringIO()
+            pstats.Stats(self._profiler, stream=out).sort_stats("cumulative").print_stats(30)
+            self.profile_text = out.getvalue()
+        self._profiler = None
+
+    def record(self):
+        """JSON-able record of the run, one line of the timing log."""
+        return {'started': self.started, 'label': self.label, 'elapsed_ms': (self.elapsed or 0.0) * 1e3,
+                'sections': self.summary().drop(columns='depth').to_dict('records'),
+                'caches': {name: dict(c) for name, c in self.counters.items()},
+                'profile': str(self.profile_path) if self.profile_path else None}
+
+
+def current():
+    """Profile of the run executing on this thread (None when profiling is off)."""
+    return getattr(_local, "profile", None)
+
+
+def start_rerun(label="", capture=None):
+    """Starts recording a script run on this thread (Streamlit runs each rerun on its session's thread)."""
+    if current() is not None:
+        # The previous run ended early (st.stop / exception): log what it got through
+        current().label += " (stopped)"
+        finish_rerun()
+    profile = RerunProfile(label, capture)
+    _local.profile = profile
+    profile.start_capture()
+    return profile
+
+
+def finish_rerun(log_dir=None):
+    """Stops the current run, appends it to <log_dir>/reruns.jsonl and returns it."""
+    profile = current()
+    if profile is None:
+        return None
+    _local.profile = None
+    profile.elapsed = time.perf_counter() - profile._t0
+    log_dir = Path(log_dir) if log_dir is not None else LOG_DIR
+    profile.stop_capture(log_dir)
+    try:
+        log_dir.mkdir(parents=True, exist_ok=True)
+        with open(log_dir / "reruns.jsonl", "a") as f:
+            f.write(json.dumps(profile.record(), default=str) + "\n")
+    except OSError as e:
+        print(f"⚠️ Could not write timing log: {e}")
+    return profile
+
+
+@contextmanager
+def section(name):
+    """Times a named block of the current run; a no-op when profiling is off."""
+    profile = current()
+    if profile is None:
+        yield
+        return
+    path = profile.push(name)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        profile.pop(path, time.perf_counter() - start)
+
+
+def timed(name=None):
+    """Decorator form of section(); the section name defaults to the function name."""
+    def decorate(func):
+        label = name or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if current() is None:
+                return func(*args, **kwargs)
+            with section(label):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def count(name, hit=True):
+    """Counts a cache hit (or miss) in the current run."""
+    profile = current()
+    if profile is not None:
+        profile.count(name, hit)
+
+
+def cached(cache_decorator, name=None):
+    """
+    Applies a memoizing decorator (st.cache_data(...), st.cache_resource,
+    functools.lru_cache(...)) and counts its hits and misses: a call is a
+    miss when the wrapped function body actually runs. The call itself is
+    timed as a section.
+
+        @profiling.cached(st.cache_data(max_entries=32))
+        def apply_kalman_smoothing(df): ...
+
+    The body wrapper keeps __wrapped__, so Streamlit still hashes the
+    original source and signature (underscore arguments stay unhashed).
+    """
+    def decorate(func):
+        label = name or func.__name__
+
+        @functools.wraps(func)
+        def body(*args, **kwargs):
+            count(label, hit=False)
+            return func(*args, **kwargs)
+
+        memoized = cache_decorator(body)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            profile = current()
+            if profile is None:
+                return memoized(*args, **kwargs)
+            misses = profile.counters.get(label, {}).get('miss', 0)
+            with section(label):
+                result = memoized(*args, **kwargs)
+            if profile.counters.get(label, {}).get('miss', 0) == misses:
+                profile.count(label, hit=True)
+            return result
+
+        for attr in ("clear", "cache_clear", "cache_info"):
+            if hasattr(memoized, attr):
+                setattr(wrapper, attr, getattr(memoized, attr))
+        return wrapper
+    return decorate
+
+
+def render_panel(profile, container):
+    """Per-run flame summary, cache counters and captured profile, drawn into a Streamlit container."""
+    table = profile.summary()
+    container.caption(f"Last run: {profile.elapsed * 1e3:,.0f} ms · {profile.label}")
+    if len(table):
+        table['section'] = ["· " * d + path.rsplit("/", 1)[-1] for d, path in zip(table['depth'], table['section'])]
+        table['share'] = (table['share'] * 100).round(1)
+        container.dataframe(table.drop(columns='depth').round({'total_ms': 1, 'self_ms': 1}),
+                            hide_index=True, use_container_width=True)
+    caches = profile.cache_summary()
+    if len(caches):
+        container.dataframe(caches, hide_index=True, use_container_width=True)
+    if profile.profile_text:
+        container.caption(f"Profile saved to {profile.profile_path}")
+        container.code(profile.profile_text[:20_000], language="text")
@@ -0,0 +1,48 @@
+import hashlib
+
+import numpy as np
+
+_GOLDEN = np.uint64(0x9E3779B97F4A7C15)
+_MIX1 = np.uint64(0xBF58476D1CE4E5B9)
+_MIX2 = np.uint64(0x94D049BB133111EB)
+
+
+def stable_key(*parts):
+    """
+    64-bit key derived from arbitrary values (ids, names, rounded coords).
+    Unlike hash(), it is the same in every process and session.
+    """
+    digest = hashlib.blake2b(repr(parts).encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'little')
+
+
+def _splitmix64(x):
+    x = x + _GOLDEN
+    x = (x ^ (x >> np.uint64(30))) * _MIX1
+    x = (x ^ (x >> np.uint64(27))) * _MIX2
+    return x ^ (x >> np.uint64(31))
+
+
+def counter_bits(keys, counters):
+    """Vectorized counter-based 64-bit random words: one per (key, counter) pair."""
+    keys = np.asarray(keys).astype(np.uint64)
+    counters = np.asarray(counters).astype(np.uint64)
+    with np.errstate(over='ignore'):
+        return _splitmix64(_splitmix64(keys) ^ (counters * _GOLDEN))
+
+
+def counter_uniform(keys, counters):
+    """Uniform [0, 1) floats from counter_bits; broadcasts keys against counters."""
+    return (counter_bits(keys, counters) >> np.uint64(11)).astype(np.float64) * (1.0 / (1 << 53))
+
+
+def counter_integers(keys, counters, low, high):
+    """Integers in [low, high] (inclusive, like random.randint) from counter_uniform."""
+    low = np.asarray(low)
+    high = np.asarray(high)
+    return low + np.floor(counter_uniform(keys, counters) * (high - low + 1)).astype(np.int64)
+
+
+def rng_for(*parts):
+    """A fresh np.random.Generator seeded from a stable key (for per-call streams)."""
+    return np.random.default_rng(stable_key(*parts))
@@ -0,0 +1,171 @@
+import numpy as np
+from scipy.spatial import cKDTree
+
+EARTH_RADIUS_KM = 6371.0
+
+
+def _to_unit_xyz(lat, lon):
+    """Converts lat/lon degrees to points on the unit sphere (N x 3)."""
+    lat_r = np.radians(np.asarray(lat, dtype=np.float64))
+    lon_r = np.radians(np.asarray(lon, dtype=np.float64))
+    cos_lat = np.cos(lat_r)
+    return np.column_stack((cos_lat * np.cos(lon_r), cos_lat * np.sin(lon_r), np.sin(lat_r)))
+
+
+def _chord_to_km(chord):
+    """Converts a unit-sphere chord length to great-circle distance in km."""
+    return 2.0 * EARTH_RADIUS_KM * np.arcsin(np.clip(chord / 2.0, 0.0, 1.0))
+
+
+def _km_to_chord(km):
+    return 2.0 * np.sin(min(km / EARTH_RADIUS_KM, np.pi) / 2.0)
+
+
+class SwathIndex:
+    """
+    KD-tree over a satellite swath's navigation grid.
+
+    Pixels are indexed as 3-D unit vectors, so the chord distance used by the
+    tree is monotonic with the great-circle distance: nearest and k-nearest
+    queries are exact on the sphere and behave across the antimeridian.
+    Build once per granule, then query whole tag tables in one call.
+    """
+    def __init__(self, lat_2d, lon_2d):
+        lat = np.asarray(lat_2d, dtype=np.float64)
+        lon = np.asarray(lon_2d, dtype=np.float64)
+        if lat.shape != lon.shape:
+            raise ValueError(f"lat/lon shapes differ: {lat.shape} vs {lon.shape}")
+
+        self.shape = lat.shape
+        valid = np.isfinite(lat.ravel()) & np.isfinite(lon.ravel())
+        # Map tree positions back to flat pixel indices of the full swath
+        self._pixel_ids = np.flatnonzero(valid)
+        self._tree = cKDTree(_to_unit_xyz(lat.ravel()[valid], lon.ravel()[valid]))
+
+    @classmethod
+    def from_axes(cls, lat_1d, lon_1d):
+        """Builds an index for a regular (L3 mapped) grid given its 1-D axes."""
+        lat_2d, lon_2d = np.meshgrid(lat_1d, lon_1d, indexing='ij')
+        return cls(lat_2d, lon_2d)
+
+    def query(self, lat, lon, k=1, max_distance_km=None):
+        """
+        Finds the k nearest swath pixels for each (lat, lon) point.
+
+        Returns (distance_km, flat_index). Both are 1-D for k=1 and (N, k)
+        otherwise. Points with no pixel inside max_distance_km (or with NaN
+        coordinates) get distance NaN and index -1.
+        """
+        lat = np.atleast_1d(np.asarray(lat, dtype=np.float64))
+        lon = np.atleast_1d(np.asarray(lon, dtype=np.float64))
+        ok = np.isfinite(lat) & np.isfinite(lon)
+
+        out_shape = (lat.size,) if k == 1 else (lat.size, k)
+        dist_km = np.full(out_shape, np.nan)
+        flat_idx = np.full(out_shape, -1, dtype=np.int64)
+        if not ok.any() or self._tree.n == 0:
+            return dist_km, flat_idx
+
+        upper = _km_to_chord(max_distance_km) if max_distance_km is not None else np.inf
+        chord, tree_idx = self._tree.query(_to_unit_xyz(lat[ok], lon[ok]), k=k,
+                                           distance_upper_bound=upper, workers=-1)
+
+        # cKDTree signals "nothing within bound" with inf distance and index n
+        found = np.isfinite(chord)
+        pixel = np.where(found, self._pixel_ids[np.minimum(tree_idx, self._tree.n - 1)], -1)
+        dist_km[ok] = np.where(found, _chord_to_km(np.where(found, chord, 0.0)), np.nan)
+        flat_idx[ok] = pixel
+        return dist_km, flat_idx
+
+    def sample(self, values, lat, lon, max_distance_km=None):
+        """
+        Samples a field defined on the swath at the nearest pixel of each point.
+
+        Returns (values, distance_km); unmatched points are NaN in both.
+        """
+        field = np.asarray(values)
+        if field.shape != self.shape:
+            raise ValueError(f"Field shape {field.shape} does not match swath {self.shape}")
+
+        dist_km, flat_idx = self.query(lat, lon, k=1, max_distance_km=max_distance_km)
+        sampled = np.full(flat_idx.shape, np.nan)
+        hit = flat_idx >= 0
+        sampled[hit] = field.ravel()[flat_idx[hit]]
+        return sampled, dist_km
+
+
+def axis_position(axis, x):
+    """Fractional index of x on a monotonic 1-D axis (NaN outside the axis)."""
+    axis = np.asarray(axis, dtype=np.float64)
+    if axis.size > 1 and axis[0] > axis[-1]:
+        return (axis.size - 1) - axis_position(axis[::-1], x)
+    return np.interp(x, axis, np.arange(axis.size), left=np.nan, right=np.nan)
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """Vectorized great-circle distance in kilometers."""
+    lat1r = np.radians(lat1)
+    lat2r = np.radians(lat2)
+    a = np.sin((lat2r - lat1r) / 2.0)**2 + np.cos(lat1r) * np.cos(lat2r) * np.sin(np.radians(lon2 - lon1) / 2.0)**2
+    return 2.0 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+class GridIndex:
+    """
+    Index over a regular (L3 mapped) grid given by its 1-D lat/lon axes.
+    Same sample() interface as SwathIndex, but lookups are direct axis
+    arithmetic - no tree over millions of cells - and bilinear sampling is
+    available.
+    """
+    def __init__(self, lat_axis, lon_axis):
+        self.lat_axis = np.asarray(lat_axis, dtype=np.float64)
+        self.lon_axis = np.asarray(lon_axis, dtype=np.float64)
+        self.shape = (self.lat_axis.size, self.lon_axis.size)
+
+    def _positions(self, lat, lon):
+        lat = np.atleast_1d(np.asarray(lat, dtype=np.float64))
+        lon = np.atleast_1d(np.asarray(lon, dtype=np.float64))
+        return axis_position(self.lat_axis, lat), axis_position(self.lon_axis, lon), lat, lon
+
+    def sample(self, values, lat, lon, max_distance_km=None):
+        """Nearest-cell values and distance to the cell centre (NaN if off-grid)."""
+        field = np.asarray(values)
+        fi, fj, lat, lon = self._positions(lat, lon)
+        sampled = np.full(fi.shape, np.nan)
+        dist_km = np.full(fi.shape, np.nan)
+        ok = np.isfinite(fi) & np.isfinite(fj)
+        i = np.rint(fi[ok]).astype(np.int64)
+        j = np.rint(fj[ok]).astype(np.int64)
+        dist_km[ok] = haversine_km(lat[ok], lon[ok], self.lat_axis[i], self.lon_axis[j])
+        sampled[ok] = field[i, j]
+        if max_distance_km is not None:
+            far = dist_km > max_distance_km
+            sampled[far] = np.nan
+            dist_km[far] = np.nan
+        return sampled, dist_km
+
+    def bilinear(self, values, lat, lon):
+        """Bilinear interpolation between the four surrounding cells (NaN if any is missing)."""
+        field = np.asarray(values, dtype=np.float64)
+        fi, fj, _, _ = self._positions(lat, lon)
+        out = np.full(fi.shape, np.nan)
+        ok = np.isfinite(fi) & np.isfinite(fj)
+        if ok.any():
+            i0 = np.clip(np.floor(fi[ok]).astype(np.int64), 0, max(field.shape[0] - 2, 0))
+            j0 = np.clip(np.floor(fj[ok]).astype(np.int64), 0, max(field.shape[1] - 2, 0))
+            i1 = np.minimum(i0 + 1, field.shape[0] - 1)
+            j1 = np.minimum(j0 + 1, field.shape[1] - 1)
+            wi = fi[ok] - i0
+            wj = fj[ok] - j0
+            out[ok] = (field[i0, j0] * (1 - wi) * (1 - wj) + field[i1, j0] * wi * (1 - wj)
+                       + field[i0, j1] * (1 - wi) * wj + field[i1, j1] * wi * wj)
+        return out
+
+
+def index_for(lat, lon):
+    """GridIndex for 1-D axes (mapped grids), SwathIndex for 2-D navigation (swaths)."""
+    lat = np.asarray(lat)
+    lon = np.asarray(lon)
+    if lat.ndim == 1 and lon.ndim == 1:
+        return GridIndex(lat, lon)
+    return SwathIndex(lat, lon)
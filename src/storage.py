@@ -0,0 +1,200 @@
+import shutil
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+
+PARTITION_COLS = ("shark_id", "month")
+TIME_COLS = ("time", "timestamp", "datetime")
+# Full precision for positions (float32 is ~2 m at 180°); measurements fit in float32
+FLOAT64_COLS = {"lat", "lon", "lat_prev", "lon_prev"}
+
+
+def time_column(df):
+    """Name of the timestamp column of a track table."""
+    for col in TIME_COLS:
+        if col in df.columns:
+            return col
+    raise ValueError(f"No time column (one of {TIME_COLS}) in {list(df.columns)}")
+
+
+def _in_zone(value, tz):
+    """
+    Timestamp comparable with a column in zone tz (None for naive columns).
+    Naive values are taken as the column's zone, aware ones are converted;
+    naive columns hold UTC wall time.
+    """
+    ts = pd.Timestamp(value)
+    if tz is not None:
+        return ts.tz_localize(tz) if ts.tzinfo is None else ts.tz_convert(tz)
+    return ts if ts.tzinfo is None else ts.tz_convert(None)
+
+
+def _utc_naive(times):
+    """datetime64 values of a (possibly timezone-aware) time column, as UTC wall time."""
+    if getattr(times.dtype, "tz", None) is not None:
+        times = times.dt.tz_convert(None)
+    return times.to_numpy()
+
+
+def normalize_tracks(df):
+    """
+    Track table with storage dtypes: categorical shark_id, datetime64 time,
+    float64 positions and float32 for every other float column.
+    """
+    df = df.copy()
+    if "shark_id" in df.columns:
+        df["shark_id"] = df["shark_id"].astype(str).astype("category")
+    for col in TIME_COLS:
+        if col in df.columns:
+            df[col] = pd.to_datetime(df[col])
+    for col in df.columns:
+        if pd.api.types.is_float_dtype(df[col]) and col not in FLOAT64_COLS:
+            df[col] = df[col].astype(np.float32)
+    return df
+
+
+def write_tracks(df, root, export_csv=None, overwrite=False):
+    """
+    Writes a track table as Parquet partitioned by shark_id and month
+    (root/shark_id=.../month=YYYY-MM/part-0.parquet).
+
+    Only the partitions present in df are replaced, so appending a new
+    month or re-processing one shark rewrites just those files
+    (overwrite=True clears the whole store first). CSV stays available as
+    an export format via export_csv=path.
+    """
+    df = normalize_tracks(df)
+    if overwrite and Path(root).exists():
+        shutil.rmtree(root)
+    time_col = time_column(df)
+    df = df.sort_values(["shark_id", time_col], kind="stable")
+    # Month labels via the few distinct months rather than strftime on every row
+    months, month_codes = np.unique(_utc_naive(df[time_col]).astype("datetime64[M]"), return_inverse=True)
+    month = pd.Categorical.from_codes(month_codes.ravel(), [str(m) for m in months])
+    table = pa.Table.from_pandas(df.assign(month=month), preserve_index=False)
+    ds.write_dataset(table, str(root), format="parquet", partitioning=list(PARTITION_COLS),
+                     partitioning_flavor="hive", existing_data_behavior="delete_matching",
+                     basename_template="part-{i}.parquet")
+    if export_csv is not None:
+        Path(export_csv).parent.mkdir(parents=True, exist_ok=True)
+        df.to_csv(export_csv, index=False)
+
+
+def open_tracks(root):
+    # Dictionary-typed partition columns arrive in pandas as categoricals
+    return ds.dataset(str(root), format="parquet",
+                      partitioning=ds.HivePartitioning.discover(infer_dictionary=True))
+
+
+def _filter(dataset, shark_ids=None, start=None, end=None):
+    """Arrow filter expression: partition pruning on shark_id / month, row filter on time."""
+    names = dataset.schema.names
+    expr = None
+
+    def both(a, b):
+        return b if a is None else a & b
+
+    if shark_ids is not None:
+        ids = [str(s) for s in np.atleast_1d(shark_ids)]
+        expr = both(expr, ds.field("shark_id").isin(ids))
+    time_col = next((c for c in TIME_COLS if c in names), None)
+    if start is not None or end is not None:
+        time_type = dataset.schema.field(time_col).type
+        tz = getattr(time_type, "tz", None)
+    # Months are partitioned on UTC wall time
+    if start is not None:
+        start = _in_zone(start, tz)
+        expr = both(expr, ds.field("month") >= _in_zone(start, None).strftime("%Y-%m"))
+        expr = both(expr, ds.field(time_col) >= pa.scalar(start, type=time_type))
+    if end is not None:
+        end = _in_zone(end, tz)
+        expr = both(expr, ds.field("month") <= _in_zone(end, None).strftime("%Y-%m"))
+        expr = both(expr, ds.field(time_col) <= pa.scalar(end, type=time_type))
+    return expr
+
+
+def read_tracks(root, shark_ids=None, start=None, end=None, columns=None):
+    """
+    Loads tracks from a partitioned Parquet store. shark_ids and the
+    [start, end] time window are pushed down: partitions outside them are
+    never opened and Parquet row-group statistics skip the rest. Returns a
+    DataFrame ordered by shark and time, with shark_id categorical.
+    """
+    dataset = open_tracks(root)
+    if columns is not None:
+        columns = list(dict.fromkeys(["shark_id", *columns]))
+    table = dataset.to_table(columns=columns, filter=_filter(dataset, shark_ids, start, end))
+    df = table.to_pandas()
+    df = df.drop(columns=["month"], errors="ignore")
+    df["shark_id"] = df["shark_id"].cat.remove_unused_categories()
+
+    # Files are written sorted and read back in path order, so this is
+    # normally a cheap O(n) check rather than a sort
+    time_col = next((c for c in TIME_COLS if c in df.columns), None)
+    codes = df["shark_id"].cat.codes.to_numpy()
+    ordered = bool(np.all(np.diff(codes) >= 0)) if len(df) else True
+    if ordered and time_col is not None:
+        t = _utc_naive(df[time_col])
+        ordered = bool(np.all((np.diff(codes) != 0) | (t[1:] >= t[:-1])))
+    if not ordered:
+        df = df.sort_values(["shark_id"] + ([time_col] if time_col else []), kind="stable")
+    return df.reset_index(drop=True)
+
+
+def store_files(source):
+    """Data files behind a track source (the Parquet parts of a store, or the CSV itself)."""
+    source = Path(source)
+    return sorted(source.rglob("*.parquet")) if source.is_dir() else [source]
+
+
+def shark_ids(root):
+    """Shark IDs in a store, from the partition directories alone (no data read)."""
+    return sorted(p.name.split("=", 1)[1] for p in Path(root).glob("shark_id=*") if p.is_dir())
+
+
+def load_tracks(source, **filters):
+    """
+    Loads tracks from a Parquet store directory or a CSV file with storage
+    dtypes. Filters (shark_ids, start, end, columns) are pushed down for
+    Parquet and applied after parsing for CSV.
+    """
+    source = Path(source)
+    if source.is_dir():
+        return read_tracks(source, **filters)
+    df = normalize_tracks(pd.read_csv(source))
+    if filters.get("shark_ids") is not None:
+        df = df[df["shark_id"].isin([str(s) for s in np.atleast_1d(filters["shark_ids"])])]
+    time_col = time_column(df) if filters.get("start") is not None or filters.get("end") is not None else None
+    tz = getattr(df[time_col].dtype, "tz", None) if time_col else None
+    if filters.get("start") is not None:
+        df = df[df[time_col] >= _in_zone(filters["start"], tz)]
+    if filters.get("end") is not None:
+        df = df[df[time_col] <= _in_zone(filters["end"], tz)]
+    if filters.get("columns") is not None:
+        df = df[list(dict.fromkeys(["shark_id", *filters["columns"]]))]
+    return df.reset_index(drop=True)
+
+
+def parquet_path(csv_path):
+    """Parquet store that sits next to a CSV file (data/x.csv -> data/x.parquet/)."""
+    return Path(csv_path).with_suffix(".parquet")
+
+
+def convert_csv(csv_path, root=None):
+    """One-off conversion of a CSV track file into a Parquet store. Returns the store path."""
+    root = Path(root) if root is not None else parquet_path(csv_path)
+    write_tracks(pd.read_csv(csv_path), root)
+    return root
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Convert a CSV track file into a partitioned Parquet store.")
+    parser.add_argument("csv", help="CSV file (e.g. data/shark_tracks.csv)")
+    parser.add_argument("store", nargs="?", help="Output directory (default: <csv>.parquet next to it)")
+    args = parser.parse_args()
+    print(f"✅ Wrote {convert_csv(args.csv, args.store)}")
@@ -0,0 +1,150 @@
+import base64
+import json
+
+import numpy as np
+import pandas as pd
+
+PLOTLY_CDN = "https://cdn.plot.ly/plotly-2.35.2.min.js"
+
+
+def douglas_peucker_rank(lat, lon):
+    """
+    Douglas-Peucker significance of every point of a track.
+
+    Instead of running once per tolerance, the recursion records for each
+    point the (projected, degree-scale) deviation at which it would be kept,
+    capped by its parent's so the ranking is nested. Keeping the points with
+    the highest significance gives the DP simplification for that size. The
+    end points get +inf.
+    """
+    lat = np.asarray(lat, dtype=np.float64)
+    lon = np.asarray(lon, dtype=np.float64)
+    n = lat.size
+    significance = np.zeros(n)
+    if n == 0:
+        return significance
+    significance[[0, -1]] = np.inf
+
+    # Equirectangular projection so distances are comparable in both axes
+    x = np.unwrap(np.radians(lon)) * np.cos(np.radians(np.nanmean(lat)))
+    y = np.radians(lat)
+
+    stack = [(0, n - 1, np.inf)]
+    while stack:
+        i, j, parent = stack.pop()
+        if j - i < 2:
+            continue
+        dx, dy = x[j] - x[i], y[j] - y[i]
+        px, py = x[i + 1:j] - x[i], y[i + 1:j] - y[i]
+        norm = np.hypot(dx, dy)
+        if norm > 0:
+            dist = np.abs(dx * py - dy * px) / norm
+        else:
+            dist = np.hypot(px, py)
+        k = int(np.nanargmax(dist)) if np.isfinite(dist).any() else 0
+        sig = min(float(np.nan_to_num(dist[k])), parent)
+        significance[i + 1 + k] = np.degrees(sig)
+        stack.append((i, i + 1 + k, sig))
+        stack.append((i + 1 + k, j, sig))
+    return significance
+
+
+def downsample_track(lat, lon, max_points=1500):
+    """Indices (sorted) of at most max_points points kept by Douglas-Peucker."""
+    n = len(lat)
+    if n <= max_points:
+        return np.arange(n)
+    rank = douglas_peucker_rank(lat, lon)
+    keep = np.argpartition(-rank, max_points - 1)[:max_points]
+    return np.sort(keep)
+
+
+def track_hash(df):
+    """Content hash of a track's coordinates and timestamps."""
+    cols = [c for c in ['lat', 'lon', 'time', 'datetime'] if c in df.columns]
+    return int(pd.util.hash_pandas_object(df[cols], index=False).sum())
+
+
+def _b64(array, dtype):
+    return base64.b64encode(np.ascontiguousarray(array, dtype=dtype).tobytes()).decode('ascii')
+
+
+def render_trajectory_html(lat, lon, time_s=None, icon="🦈", height=550, frame_ms=150, zoom=6):
+    """
+    Self-contained HTML that animates a track with Plotly.js.
+
+    The track is embedded once as base64 Float32/Float64 typed arrays and the
+    animation only moves a cursor: the "travelled" trace is a subarray view
+    of the same buffers, so the payload grows O(pings) instead of Plotly
+    frames repeating the trace O(pings^2). time_s (epoch seconds, NaN for
+    missing) is formatted as UTC labels in the browser.
+    """
+    lat = np.asarray(lat, dtype=np.float64)
+    lon = np.asarray(lon, dtype=np.float64)
+    n = lat.size
+    times = np.full(n, np.nan) if time_s is None else np.asarray(time_s, dtype=np.float64)
+    center = {"lat": float(np.nanmean(lat)) if n else 0.0, "lon": float(np.nanmean(lon)) if n else 0.0}
+
+    payload = json.dumps({
+        "lat": _b64(lat, np.float32), "lon": _b64(lon, np.float32), "t": _b64(times, np.float64),
+        "n": n, "icon": icon, "center": center, "zoom": zoom, "frameMs": frame_ms,
+    })
+    return f"""<!DOCTYPE html>
+<html><head><meta charset="utf-8"><script src="{PLOTLY_CDN}"></script>
+<style>
+  body {{ margin: 0; font-family: Arial, Helvetica, sans-serif; }}
+  #controls {{ display: flex; align-items: center; gap: 8px; padding: 6px 8px; }}
+  #cursor {{ flex: 1; }}
+  #label {{ min-width: 190px; font-size: 13px; color: #2b5b6f; }}
+</style></head>
+<body>
+<div id="map" style="height:{height - 44}px;"></div>
+<div id="controls">
+  <button id="play">▶ Play</button>
+  <input id="cursor" type="range" min="0" max="{max(n - 1, 0)}" value="0">
+  <span id="label"></span>
+</div>
+<script>
+(function() {{
+  const P = {payload};
+  const decode = (b64, T) => {{
+    const bin = atob(b64), bytes = new Uint8Array(bin.length);
+    for (let i = 0; i < bin.length; i++) bytes[i] = bin.charCodeAt(i);
+    return new T(bytes.buffer);
+  }};
+  const lat = decode(P.lat, Float32Array), lon = decode(P.lon, Float32Array), t = decode(P.t, Float64Array);
+  const label = i => isFinite(t[i]) ? new Date(t[i] * 1000).toISOString().replace('T', ' ').slice(0, 19) + ' UTC' : 'Ping ' + (i + 1);
+
+  const traces = [
+    {{type: 'scattermapbox', mode: 'lines', lat: lat, lon: lon, hoverinfo: 'skip',
+      line: {{color: 'rgba(0, 119, 182, 0.25)', width: 3}}, name: 'Track'}},
+    {{type: 'scattermapbox', mode: 'lines', lat: lat.subarray(0, 1), lon: lon.subarray(0, 1), hoverinfo: 'skip',
+      line: {{color: 'rgba(0, 119, 182, 0.8)', width: 3}}, name: 'Travelled'}},
+    {{type: 'scattermapbox', mode: 'markers+text', lat: [lat[0]], lon: [lon[0]], text: [P.icon],
+      textfont: {{size: 22}}, marker: {{size: 14, color: 'rgba(255, 87, 34, 0.6)'}}, name: 'Shark'}}
+  ];
+  const layout = {{mapbox: {{style: 'open-street-map', center: P.center, zoom: P.zoom}},
+                   margin: {{r: 0, t: 0, l: 0, b: 0}}, showlegend: false}};
+  Plotly.newPlot('map', traces, layout, {{responsive: true}});
+
+  const slider = document.getElementById('cursor'), text = document.getElementById('label'), button = document.getElementById('play');
+  function show(i) {{
+    Plotly.restyle('map', {{lat: [lat.subarray(0, i + 1), [lat[i]]], lon: [lon.subarray(0, i + 1), [lon[i]]]}}, [1, 2]);
+    slider.value = i;
+    text.textContent = label(i);
+  }}
+  let timer = null;
+  button.onclick = () => {{
+    if (timer) {{ clearInterval(timer); timer = null; button.textContent = '▶ Play'; return; }}
+    button.textContent = '⏸ Pause';
+    if (+slider.value >= P.n - 1) show(0);
+    timer = setInterval(() => {{
+      const next = +slider.value + 1;
+      if (next >= P.n) {{ button.onclick(); return; }}
+      show(next);
+    }}, P.frameMs);
+  }};
+  slider.oninput = () => show(+slider.value);
+  if (P.n) show(0);
+}})();
+</script></body></html>"""
@@ -0,0 +1,402 @@
+"""
+Compiles a fitted sklearn tree ensemble into flat node arrays.
+
+    python -m src.tree_compile models/shark_ai_model.pkl --imputer models/shark_imputer.pkl \\
+        --verify data/my_training_data.csv
+
+writes models/shark_ai_model.npz next to the pickle and checks that the
+compiled model reproduces predict_proba on the verification rows.
+"""
+import argparse
+import json
+import os
+import sys
+from pathlib import Path
+
+import numpy as np
+
+try:
+    import numba
+except ImportError:
+    numba = None
+
+NUMBA_AVAILABLE = numba is not None
+FORMAT_VERSION = 1
+
+
+def _float32_floor(threshold):
+    """
+    float32 thresholds that split float32 inputs exactly like the float64
+    originals: sklearn compares float32 features with float64 thresholds,
+    and x <= t holds for a float32 x iff x <= (largest float32 <= t).
+    """
+    t32 = threshold.astype(np.float32)
+    up = t32.astype(np.float64) > threshold
+    t32[up] = np.nextafter(t32[up], np.float32(-np.inf))
+    return t32
+
+
+class CompiledForest:
+    """
+    A tree ensemble as contiguous node arrays, evaluated for a whole batch
+    without sklearn's input validation or per-estimator dispatch.
+
+    Every node has a feature, a float32 threshold and left / right child
+    indices into the shared arrays; leaves point at themselves, so a block
+    of samples walks each tree in lockstep for max_depth branch-free steps
+    (numba kernel when installed, numpy otherwise). Leaf rows of `value`
+    hold each tree's contribution: class fractions / n_trees for forests
+    (summed into probabilities; only class 1 for binary ones) or
+    learning_rate * leaf value for binary gradient boosting (summed onto
+    `base` and passed through a sigmoid).
+    Inputs are cast to float32 as sklearn does, so the splits are the
+    same; `fill` holds a folded SimpleImputer's column statistics.
+    """
+    def __init__(self, feature, threshold, left, right, value, roots, max_depth, n_features, classes,
+                 link="identity", base=None, fill=None, missing_left=None):
+        self.feature = np.ascontiguousarray(feature, dtype=np.int32)
+        self.threshold = np.ascontiguousarray(threshold, dtype=np.float32)
+        self.left = np.ascontiguousarray(left, dtype=np.int32)
+        self.right = np.ascontiguousarray(right, dtype=np.int32)
+        self.value = np.ascontiguousarray(value, dtype=np.float32)
+        self.roots = np.ascontiguousarray(roots, dtype=np.int32)
+        self.max_depth = int(max_depth)
+        self.n_features = int(n_features)
+        self.classes = np.asarray(classes)
+        self.link = link
+        self.base = np.zeros(self.value.shape[1], dtype=np.float64) if base is None else np.asarray(base, np.float64)
+        self.fill = None if fill is None else np.asarray(fill, dtype=np.float32)
+        self.missing_left = None if missing_left is None else np.asarray(missing_left, dtype=bool)
+        # Kernel views: (left, right) pairs, child = _children[2 * node + goes_right]; unsigned indices
+        self._children = np.ascontiguousarray(np.column_stack((self.left, self.right)).ravel(), dtype=np.uint32)
+        self._feature_index = self.feature.astype(np.uint32)
+
+    @property
+    def n_trees(self):
+        return len(self.roots)
+
+    @property
+    def n_nodes(self):
+        return len(self.feature)
+
+    # --------------------------------------------------------------------------
+    # Evaluation
+    # --------------------------------------------------------------------------
+    def _prepare(self, X):
+        X = np.array(X, dtype=np.float32, order="C", ndmin=2)
+        if X.shape[1] != self.n_features:
+            raise ValueError(f"X has {X.shape[1]} features, the model expects {self.n_features}")
+        if self.fill is not None:
+            missing = np.isnan(X)
+            if missing.any():
+                X[missing] = np.broadcast_to(self.fill, X.shape)[missing]
+        return X
+
+    def raw_predict(self, X, backend="auto"):
+        """
+        Summed leaf values plus base: class probabilities for forests (just
+        class 1 for binary ones), log-odds for boosting. backend is "numba" (compiled kernel, used
+        by "auto" when numba is installed) or "numpy".
+        """
+        X = self._prepare(X)
+        out = np.zeros((len(X), self.value.shape[1]), dtype=np.float64)
+        if backend == "numba" or (backend == "auto" and NUMBA_AVAILABLE):
+            if not NUMBA_AVAILABLE:
+                raise ImportError("numba is not installed")
+            missing = self.missing_left is not None
+            kernel = _forest_kernel(numba.config.NUMBA_NUM_THREADS > 1, missing)
+            kernel(X, self._feature_index, self.threshold, self._children,
+                   self.missing_left if missing else np.zeros(1, dtype=bool), self.value, self.roots, out)
+        else:
+            _forest_numpy(X, self.feature, self.threshold, self._children, self.missing_left, self.value,
+                          self.roots, self.max_depth, out)
+        return out + self.base
+
+    def predict_proba(self, X, backend="auto"):
+        raw = self.raw_predict(X, backend)
+        if self.link == "identity":
+            return raw
+        p = 1.0 / (1.0 + np.exp(-raw[:, 0])) if self.link == "logistic" else raw[:, 0]
+        return np.column_stack((1.0 - p, p))
+
+    # --------------------------------------------------------------------------
+    # Artifact
+    # --------------------------------------------------------------------------
+    def save(self, path):
+        """Writes the compiled model as an uncompressed .npz (loads in milliseconds)."""
+        path = Path(path)
+        meta = {'format': FORMAT_VERSION, 'max_depth': self.max_depth, 'n_features': self.n_features,
+                'link': self.link}
+        arrays = {'feature': self.feature, 'threshold': self.threshold, 'left': self.left, 'right': self.right,
+                  'value': self.value, 'roots': self.roots, 'classes': self.classes, 'base': self.base,
+                  'meta': np.array(json.dumps(meta))}
+        if self.fill is not None:
+            arrays['fill'] = self.fill
+        if self.missing_left is not None:
+            arrays['missing_left'] = self.missing_left
+        tmp = path.with_name(path.name + ".part.npz")
+        np.savez(tmp, **arrays)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as data:
+            meta = json.loads(str(data['meta']))
+            if meta.get('format') != FORMAT_VERSION:
+                raise ValueError(f"{path}: compiled model format {meta.get('format')}, expected {FORMAT_VERSION}")
+            return cls(data['feature'], data['threshold'], data['left'], data['right'], data['value'],
+                       data['roots'], meta['max_depth'], meta['n_features'], data['classes'], meta['link'],
+                       base=data['base'], fill=data['fill'] if 'fill' in data else None,
+                       missing_left=data['missing_left'] if 'missing_left' in data else None)
+
+
+def _forest_numpy(X, feature, threshold, children, missing_left, value, roots, depth, out, block_elems=65536):
+    """Lockstep walk of all trees for blocks of rows, accumulating leaf values into out."""
+    block = max(64, block_elems // max(len(roots), 1))
+    n_features = X.shape[1]
+    for start in range(0, len(X), block):
+        flat = X[start:start + block].ravel()
+        m = len(flat) // n_features
+        offsets = (np.arange(m, dtype=np.int32) * n_features)[:, None]
+        idx = np.broadcast_to(roots, (m, len(roots))).copy()
+        for _ in range(depth):
+            x = flat[offsets + feature[idx]]
+            go_right = ~(x <= threshold[idx])
+            if missing_left is not None:
+                go_right &= ~(np.isnan(x) & missing_left[idx])
+            step = children[2 * idx + go_right]
+            if np.array_equal(step, idx):
+                break
+            idx = step
+        acc = np.zeros((m, value.shape[1]), dtype=np.float32)
+        for t in range(len(roots)):
+            acc += value[idx[:, t]]
+        out[start:start + m] += acc
+
+
+_KERNELS = {}
+
+
+def _forest_kernel(parallel, missing):
+    """
+    numba kernel walking blocks of rows through one tree at a time, so the
+    tree's nodes stay in cache while neighbouring grid cells (which mostly
+    take the same path) keep the branches predictable. Specialized (and
+    compiled on first use) for running blocks on several threads and for
+    NaN routing (missing_left).
+    """
+    key = (parallel, missing)
+    if key in _KERNELS:
+        return _KERNELS[key]
+
+    @numba.njit(parallel=parallel, nogil=True, cache=True)
+    def kernel(X, feature, threshold, children, missing_left, value, roots, out):
+        # Node indices are uint32 so numba emits no negative-index wraparound checks
+        block = 4096
+        n = X.shape[0]
+        for b in numba.prange((n + block - 1) // block):
+            stop = min(n, (b + 1) * block)
+            for t in range(roots.shape[0]):
+                root = np.uint32(roots[t])
+                for i in range(b * block, stop):
+                    row = X[i]
+                    j = root
+                    while children[np.uint32(2) * j] != j:
+                        x = row[feature[j]]
+                        go_right = np.uint32(not x <= threshold[j])
+                        if missing:
+                            go_right -= np.uint32((x != x) & missing_left[j])
+                        j = children[np.uint32(2) * j + go_right]
+                    for c in range(value.shape[1]):
+                        out[i, c] += value[j, c]
+
+    _KERNELS[key] = kernel
+    return kernel
+
+
+# ------------------------------------------------------------------------------
+# Compilation
+# ------------------------------------------------------------------------------
+def _imputer_fill(imputer, n_features):
+    if imputer is None:
+        return None
+    statistics = getattr(imputer, 'statistics_', None)
+    missing = getattr(imputer, 'missing_values', np.nan)
+    if (statistics is None or getattr(imputer, 'add_indicator', False)
+            or not (isinstance(missing, float) and np.isnan(missing))):
+        raise TypeError(f"Cannot fold {type(imputer).__name__} into a compiled model (only SimpleImputer on NaN).")
+    statistics = np.asarray(statistics, dtype=np.float64)
+    if len(statistics) != n_features or np.isnan(statistics).any():
+        raise TypeError("Imputer drops all-missing columns; refit it with keep_empty_features=True.")
+    return statistics
+
+
+def compile_model(model, imputer=None):
+    """
+    Flattens a fitted RandomForestClassifier / ExtraTreesClassifier /
+    DecisionTreeClassifier or binary GradientBoostingClassifier (and an
+    optional SimpleImputer in front of it) into a CompiledForest.
+    """
+    name = type(model).__name__
+    if name == "GradientBoostingClassifier":
+        if model.estimators_.shape[1] != 1:
+            raise TypeError("Only binary GradientBoostingClassifier models can be compiled.")
+        trees = [est.tree_ for est in model.estimators_[:, 0]]
+        scales = [model.learning_rate] * len(trees)
+        link = "logistic"
+        base = np.asarray(model._raw_predict_init(np.zeros((1, model.n_features_in_)))[0], dtype=np.float64)
+    elif name in ("RandomForestClassifier", "ExtraTreesClassifier"):
+        trees = [est.tree_ for est in model.estimators_]
+        scales = [1.0 / len(trees)] * len(trees)
+        link, base = "identity", None
+    elif name == "DecisionTreeClassifier":
+        trees, scales, link, base = [model.tree_], [1.0], "identity", None
+    else:
+        raise TypeError(f"Cannot compile {name}; expected a tree ensemble classifier.")
+
+    features, thresholds, lefts, rights, values, roots, missing = [], [], [], [], [], [], []
+    offset = 0
+    for tree, scale in zip(trees, scales):
+        n = tree.node_count
+        leaf = tree.children_left == -1
+        own = np.arange(offset, offset + n)
+        features.append(np.where(leaf, 0, tree.feature))
+        thresholds.append(np.where(leaf, np.inf, _float32_floor(tree.threshold)))
+        lefts.append(np.where(leaf, own, tree.children_left + offset))
+        rights.append(np.where(leaf, own, tree.children_right + offset))
+        value = tree.value[:, 0, :]
+        if link != "logistic":
+            value = value / value.sum(axis=1, keepdims=True)  # per-tree predict_proba
+            if value.shape[1] == 2:
+                link, value = "binary", value[:, 1:]  # P(class 0) is 1 - P(class 1)
+        values.append(np.where(leaf[:, None], value * scale, 0.0))
+        missing.append(getattr(tree, 'missing_go_to_left', np.zeros(n, dtype=np.uint8)).astype(bool) & ~leaf)
+        roots.append(offset)
+        offset += n
+
+    missing_left = np.concatenate(missing)
+    return CompiledForest(
+        np.concatenate(features), np.concatenate(thresholds), np.concatenate(lefts), np.concatenate(rights),
+        np.concatenate(values), roots, max(tree.max_depth for tree in trees), model.n_features_in_,
+        getattr(model, 'classes_', np.array([0, 1])), link=link, base=base,
+        fill=_imputer_fill(imputer, model.n_features_in_),
+        missing_left=missing_left if missing_left.any() else None)
+
+
+def artifact_path(model_path):
+    return Path(model_path).with_suffix(".npz")
+
+
+def load_or_compile(model_path, imputer_path=None, path=None):
+    """
+    Compiled model for a joblib pickle (and imputer): the .npz artifact when
+    it is newer than its sources, otherwise compiled now and saved.
+    """
+    import joblib
+
+    path = Path(path) if path is not None else artifact_path(model_path)
+    sources = [Path(p) for p in (model_path, imputer_path) if p is not None and Path(p).exists()]
+    if path.exists() and all(path.stat().st_mtime >= p.stat().st_mtime for p in sources):
+        try:
+            return CompiledForest.load(path)
+        except Exception as e:
+            print(f"⚠️ Recompiling model ({e}).")
+    model = joblib.load(model_path)
+    imputer = joblib.load(imputer_path) if imputer_path is not None and Path(imputer_path).exists() else None
+    compiled = compile_model(model, imputer)
+    try:
+        compiled.save(path)
+    except OSError as e:
+        print(f"⚠️ Could not save compiled model: {e}")
+    return compiled
+
+
+# ------------------------------------------------------------------------------
+# Verification
+# ------------------------------------------------------------------------------
+def _nearest(axis, values):
+    axis = np.asarray(axis, dtype=np.float64)
+    order = np.argsort(axis)
+    pos = np.clip(np.searchsorted(axis[order], values), 1, len(axis) - 1)
+    lo, hi = order[pos - 1], order[pos]
+    return np.where(np.abs(values - axis[lo]) <= np.abs(values - axis[hi]), lo, hi)
+
+
+def verification_features(csv_path, n_features, grid_root="models"):
+    """
+    Feature matrix for the rows of a training CSV. Numeric columns other
+    than 'presence' are used as they are when their count matches the
+    model; otherwise the habitat features (sst, depth, chlorophyll, SST
+    gradient) are sampled from the model grids at each row's lat / lon,
+    with the CSV's chlorophyll (NaNs included, for the imputer).
+    """
+    import pandas as pd
+
+    from src.grid_store import GridStore
+    from src.habitat import habitat_features, sst_gradient
+
+    df = pd.read_csv(csv_path)
+    numeric = df.drop(columns=[c for c in ('presence',) if c in df.columns]).select_dtypes("number")
+    if numeric.shape[1] == n_features:
+        return numeric.to_numpy(dtype=np.float64)
+
+    store = GridStore(grid_root)
+    if store.lat_axis is None or not store.has("map_sst") or not store.has("map_depth"):
+        raise FileNotFoundError(f"{csv_path} has no {n_features} feature columns and {grid_root} has no grids to sample.")
+    rows = _nearest(store.lat_axis, df['lat'].to_numpy(np.float64))
+    cols = _nearest(store.lon_axis, df['lon'].to_numpy(np.float64))
+    sst = store.read("map_sst")
+    chl_col = next((c for c in df.columns if c.startswith("chlor")), None)
+    chlor = df[chl_col].to_numpy(np.float64) if chl_col else store.read("map_chlor")[rows, cols]
+    return habitat_features(sst[rows, cols], store.read("map_depth")[rows, cols], chlor,
+                            sst_gradient(sst)[rows, cols])
+
+
+def verify(compiled, model, imputer, X, atol=1e-5):
+    """Largest absolute difference between compiled and sklearn probabilities (raises above atol)."""
+    from src.habitat import predict_presence
+
+    expected = predict_presence(model, imputer, X)
+    got = compiled.predict_proba(X)[:, 1]
+    worst = float(np.max(np.abs(got - expected))) if len(X) else 0.0
+    if not worst <= atol:
+        raise AssertionError(f"Compiled model differs from predict_proba by {worst:.3g} (> {atol:g})")
+    return worst
+
+
+def main(argv=None):
+    import time
+
+    import joblib
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("model", nargs="?", default="models/shark_ai_model.pkl")
+    parser.add_argument("--imputer", default="models/shark_imputer.pkl")
+    parser.add_argument("--output", type=Path, help="Artifact path (default: the model path with .npz)")
+    parser.add_argument("--verify", type=Path, help="CSV whose rows must reproduce predict_proba")
+    parser.add_argument("--atol", type=float, default=1e-5)
+    args = parser.parse_args(argv)
+
+    model = joblib.load(args.model)
+    imputer = joblib.load(args.imputer) if args.imputer and Path(args.imputer).exists() else None
+    compiled = compile_model(model, imputer)
+    output = args.output or artifact_path(args.model)
+    compiled.save(output)
+    start = time.perf_counter()
+    CompiledForest.load(output)
+    print(f"✅ {type(model).__name__}: {compiled.n_trees} trees, {compiled.n_nodes:,} nodes, depth {compiled.max_depth}"
+          f" -> {output} ({output.stat().st_size / 1e6:.1f} MB, loads in {(time.perf_counter() - start) * 1e3:.1f} ms)")
+
+    if args.verify:
+        X = verification_features(args.verify, compiled.n_features, grid_root=Path(args.model).parent)
+        try:
+            worst = verify(compiled, model, imputer, X, args.atol)
+        except AssertionError as e:
+            print(f"❌ {e}")
+            return 1
+        print(f"✅ Matches predict_proba on {len(X):,} rows of {args.verify} (max |Δ| = {worst:.2g})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
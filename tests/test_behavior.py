@@ -0,0 +1,47 @@
+import numpy as np
+import pandas as pd
+
+from src.behavior import MS_TO_KNOTS, classify_tracks
+from src.movement import chronological_metrics, track_metrics
+
+
+def _newest_first_track(n=10):
+    # A fast straight run, listed newest-first like the fleet feed and the path cache
+    now = pd.Timestamp("2024-06-01", tz="UTC")
+    return pd.DataFrame({
+        'lat': 20.0 - np.arange(n) * 0.5,
+        'lon': -60.0 - np.arange(n) * 0.5,
+        'time': [now - pd.Timedelta(hours=i) for i in range(n)],
+    })
+
+
+def test_chronological_metrics_match_oldest_first_order():
+    df = _newest_first_track()
+    time_s = df['time'].astype("int64").to_numpy() / 1e9
+    lat, lon = df['lat'].to_numpy(), df['lon'].to_numpy()
+
+    got = chronological_metrics(lat, lon, time_s)
+    expected = track_metrics(lat[::-1], lon[::-1], time_s[::-1])
+    for key in expected:
+        np.testing.assert_allclose(got[key], expected[key][::-1], equal_nan=True)
+    assert np.isnan(got['speed_ms'][-1])  # the oldest ping has no previous one
+
+
+def test_newest_first_track_has_real_speeds():
+    df = _newest_first_track()
+    timeline = classify_tracks(df)
+    speed = timeline['speed_kts'].to_numpy()
+    assert (speed[:-1] > 15).all()
+    assert timeline['behavior_name'].iloc[0] == "🚀 High-Velocity Pursuit"
+
+    oldest_first = classify_tracks(df.iloc[::-1].reset_index(drop=True))
+    np.testing.assert_allclose(speed, oldest_first['speed_kts'].to_numpy()[::-1])
+
+
+def test_tracks_are_measured_separately():
+    a, b = _newest_first_track(), _newest_first_track()
+    b['lon'] += 5.0
+    df = pd.concat([a.assign(shark_id=1), b.assign(shark_id=2)], ignore_index=True)
+    speed_ms = classify_tracks(df)['speed_kts'].to_numpy() / MS_TO_KNOTS
+    assert np.isnan(speed_ms[[len(a) - 1, len(df) - 1]]).all()
+    np.testing.assert_allclose(speed_ms[:len(a)], speed_ms[len(a):], rtol=1e-3, equal_nan=True)
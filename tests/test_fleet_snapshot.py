@@ -0,0 +1,49 @@
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from shark_network import generate_global_fleet
+from src.fleet_snapshot import merge_fleet
+
+
+def _fleet(n=200):
+    return generate_global_fleet(n, now=pd.Timestamp("2024-01-01"))
+
+
+def test_typed_fleet_keeps_dtypes_through_updates_adds_and_removals():
+    current = _fleet()
+    incoming = current.iloc[5:].copy()
+    incoming['length'] = incoming['length'].astype(np.int64)  # feeds arrive untyped
+    incoming.loc[incoming.index[:2], 'length'] = [10, 12]
+    incoming.loc[incoming.index[2], 'species'] = current['species'].iloc[0]
+    new = current.iloc[:1].assign(id=current['id'].max() + 1, species="Megalodon")
+    incoming = pd.concat([incoming, new], ignore_index=True)
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        df, changes = merge_fleet(current, incoming)
+    assert changes['added'] == 1 and changes['removed'] == 5 and changes['updated'] >= 2
+    assert df.dtypes.equals(current.dtypes.where(current.columns != 'species', df['species'].dtype))
+    assert isinstance(df['species'].dtype, pd.CategoricalDtype)
+    assert df['length'].dtype == current['length'].dtype
+
+    by_id = df.set_index('id')
+    assert by_id.loc[incoming['id'].iloc[:2], 'length'].tolist() == [10, 12]
+    assert by_id.loc[new['id'].iloc[0], 'species'] == "Megalodon"
+
+
+def test_missing_values_widen_int_columns():
+    current = _fleet(20)
+    incoming = current.copy()
+    incoming['length'] = incoming['length'].astype(float)
+    incoming.loc[3, 'length'] = np.nan
+    df, changes = merge_fleet(current, incoming)
+    assert changes['updated'] == 1
+    assert df['length'].isna().sum() == 1
+
+
+def test_unchanged_feed_returns_the_current_table():
+    current = _fleet(50)
+    df, changes = merge_fleet(current, current.sample(frac=1, random_state=0))
+    assert df is current and not any(changes.values())
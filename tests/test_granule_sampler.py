@@ -0,0 +1,47 @@
+import numpy as np
+import pandas as pd
+import xarray as xr
+
+from src.granule_sampler import GranuleTimeIndex, chlorophyll_time_range, sample_chlorophyll_matched
+
+LAT = np.linspace(20.0, 40.0, 21)
+LON = np.linspace(-80.0, -60.0, 21)
+
+
+def _grid(path, name, value, attrs=None):
+    data = np.full((LAT.size, LON.size), value)
+    xr.Dataset({name: (('lat', 'lon'), data)}, coords={'lat': LAT, 'lon': LON}, attrs=attrs or {}).to_netcdf(path)
+    return path
+
+
+def _granules(tmp_path):
+    monthly = _grid(tmp_path / "AQUA_MODIS.20231001_20231031.L3m.MO.CHL.chlor_a.4km.nc", 'chlor_a', 0.5)
+    # A short SSH pass right at the ping time: closer than the monthly file, but not chlorophyll
+    swot = _grid(tmp_path / "SWOT_L3_LR_SSH_Expert_005_012_20231015T115500_20231015T120500_v1.0.nc", 'ssha', 0.1,
+                 {'time_coverage_start': "2023-10-15T11:55:00Z", 'time_coverage_end': "2023-10-15T12:05:00Z"})
+    sst = _grid(tmp_path / "AQUA_MODIS.20231015.L3m.DAY.SST.sst.4km.nc", 'sst', 21.0)
+    return monthly, swot, sst
+
+
+def test_only_chlorophyll_granules_are_candidates(tmp_path):
+    monthly, swot, sst = _granules(tmp_path)
+    assert chlorophyll_time_range(monthly) is not None
+    assert chlorophyll_time_range(swot) is None
+    assert chlorophyll_time_range(sst) is None
+    assert GranuleTimeIndex.from_dir(tmp_path).files == [monthly]
+
+
+def test_unnamed_chlorophyll_file_uses_its_attributes(tmp_path):
+    path = _grid(tmp_path / "chlorophyll_subset.nc", 'chlor_a', 1.0,
+                 {'time_coverage_start': "2023-10-15T00:00:00Z", 'time_coverage_end': "2023-10-15T23:59:59Z"})
+    start, end = chlorophyll_time_range(path)
+    assert pd.Timestamp(start, unit='s') == pd.Timestamp("2023-10-15")
+    assert end - start == 86399
+
+
+def test_pings_near_a_swot_pass_sample_chlorophyll(tmp_path):
+    _granules(tmp_path)
+    tags = pd.DataFrame({'time': pd.to_datetime(["2023-10-15 12:00"]), 'lat': [30.0], 'lon': [-70.0]})
+    out = sample_chlorophyll_matched(tags, tmp_path)
+    assert out['chl_nearest'].iloc[0] == 0.5
+    assert not out['flag_outside'].iloc[0]
@@ -0,0 +1,68 @@
+import numpy as np
+from sklearn.tree import DecisionTreeClassifier
+
+from src.habitat import HabitatInference, habitat_features, predict_presence, sst_gradient
+
+SHAPE = (300, 40)
+
+
+def _grids(seed=0):
+    rng = np.random.default_rng(seed)
+    return rng.uniform(10, 30, SHAPE), rng.uniform(-5000, 0, SHAPE), rng.uniform(0, 3, SHAPE)
+
+
+def _model():
+    rng = np.random.default_rng(1)
+    X = np.column_stack((rng.uniform(0, 30, 500), rng.uniform(-6000, 0, 500), rng.uniform(0, 3, 500),
+                         rng.uniform(0, 0.1, 500)))
+    X = np.column_stack((X, X[:, 3]))
+    return DecisionTreeClassifier(max_depth=6, random_state=0).fit(X, (X[:, 0] > 18) & (X[:, 1] > -1000))
+
+
+def test_maps_match_the_model_and_are_float32():
+    model = _model()
+    sst, depth, chl = _grids()
+    probs = HabitatInference(model, tile_rows=64).predict_grid(sst, depth, chl, 1.0)
+    expected = predict_presence(model, None, habitat_features(sst + 1.0, depth, chl, sst_gradient(sst)))
+    assert probs.dtype == np.float32 and not probs.flags.writeable
+    np.testing.assert_allclose(probs.ravel(), expected, atol=1e-7)
+
+
+def test_map_cache_is_bounded_by_bytes():
+    sst, depth, chl = _grids()
+    engine = HabitatInference(_model(), max_bytes=2 * sst.size * 4)
+    for temp in (0.0, 0.5, 1.0, 1.5):
+        engine.predict_grid(sst, depth, chl, temp)
+    assert len(engine._maps) == 2 and engine._map_bytes <= engine.max_bytes
+    engine.predict_grid(sst, depth, chl, 1.5)
+    assert engine.stats['map_hits'] == 1
+
+
+def test_unchanged_tiles_are_reused_across_grid_versions():
+    sst, depth, chl = _grids()
+    engine = HabitatInference(_model(), tile_rows=64)
+    engine.predict_grid(sst, depth, chl, 0.5, grid_version=1)
+    chl = chl.copy()
+    chl[200:210] += 1.0
+    probs = engine.predict_grid(sst, depth, chl, 0.5, grid_version=2)
+    assert engine.stats['tile_misses'] == 5 + 1 and engine.stats['tile_hits'] == 4
+
+    fresh = HabitatInference(engine.model, tile_rows=64).predict_grid(sst, depth, chl, 0.5, grid_version=2)
+    np.testing.assert_array_equal(probs, fresh)
+
+
+def test_sessions_on_different_grid_versions_share_one_engine():
+    from concurrent.futures import ThreadPoolExecutor
+
+    engine = HabitatInference(_model(), tile_rows=64, max_bytes=0)
+    grids = {version: _grids(seed=version) for version in range(4)}
+
+    def predict(i):
+        version = i % 4
+        return version, engine.predict_grid(*grids[version], 0.0, grid_version=version)
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(pool.map(predict, range(32)))
+    for version, probs in results:
+        fresh = HabitatInference(engine.model, tile_rows=64).predict_grid(*grids[version], 0.0, grid_version=version)
+        np.testing.assert_array_equal(probs, fresh)
@@ -0,0 +1,49 @@
+import numpy as np
+
+from src.kalman import smooth_tracks
+from src.movement import time_order
+
+
+def _track(n=12, seed=0):
+    rng = np.random.default_rng(seed)
+    lat = 10 + np.cumsum(rng.normal(0, 0.3, n))
+    lon = -40 + np.cumsum(rng.normal(0, 0.3, n))
+    time_s = np.cumsum(rng.uniform(0.5, 3.0, n)) * 86400.0
+    return lat, lon, time_s
+
+
+def test_time_order_is_none_for_sorted_tracks():
+    assert time_order(np.array([0, 0, 1, 1]), np.array([1.0, 2.0, 0.0, 5.0])) is None
+
+
+def test_time_order_groups_tracks_and_puts_untimed_pings_last():
+    order = time_order(np.array([0, 1, 0, 0]), np.array([3.0, 1.0, np.nan, 2.0]))
+    assert order.tolist() == [3, 0, 2, 1]
+
+
+def test_newest_first_track_matches_oldest_first():
+    lat, lon, time_s = _track()
+    forward = smooth_tracks(lat, lon, time_s)
+    backward = smooth_tracks(lat[::-1], lon[::-1], time_s[::-1])
+    for key in ('lat', 'lon', 'v_lat', 'v_lon'):
+        np.testing.assert_allclose(backward[key][::-1], forward[key])
+
+
+def test_uneven_spacing_is_used_for_reversed_tracks():
+    lat, lon, time_s = _track()
+    constant = smooth_tracks(lat, lon, None)
+    backward = smooth_tracks(lat[::-1], lon[::-1], time_s[::-1])
+    assert not np.allclose(backward['v_lat'][::-1], constant['v_lat'])
+
+
+def test_interleaved_tracks_in_any_order():
+    lat_a, lon_a, t_a = _track(seed=1)
+    lat_b, lon_b, t_b = _track(seed=2)
+    ids = np.repeat(["a", "b"], len(lat_a))
+    lat, lon, time_s = np.concatenate([lat_a, lat_b]), np.concatenate([lon_a, lon_b]), np.concatenate([t_a, t_b])
+    expected = smooth_tracks(lat, lon, time_s, track_ids=ids)
+
+    shuffle = np.random.default_rng(3).permutation(len(lat))
+    got = smooth_tracks(lat[shuffle], lon[shuffle], time_s[shuffle], track_ids=ids[shuffle])
+    np.testing.assert_allclose(got['lat'], expected['lat'][shuffle])
+    np.testing.assert_allclose(got['v_lon'], expected['v_lon'][shuffle])
@@ -0,0 +1,79 @@
+import pytest
+import requests
+
+from src.path_fetcher import PathFetcher
+
+PATH = "/tracker/detail/42/json"
+
+
+def _ping(tz, lat=10.0, lon=-40.0):
+    return {'tz': str(tz), 'latitude': str(lat), 'longitude': str(lon), 'active': "1"}
+
+
+@pytest.fixture
+def fetcher(stub_server, tmp_path):
+    fetcher = PathFetcher(tmp_path / "paths.sqlite", url_template=stub_server.url + "/tracker/detail/{shark_id}/json",
+                          max_workers=4, retries=3, backoff=0.01, timeout=2)
+    yield fetcher
+    fetcher.cache.close()
+
+
+def test_retries_transient_errors_with_backoff(stub_server, fetcher):
+    responses = iter([(503, {}, b""), (500, {}, b""), (200, {}, {'pings': [_ping(100), _ping(200)]})])
+    stub_server.routes[PATH] = lambda headers: next(responses)
+    assert fetcher.refresh(42) == 2
+    assert stub_server.hits(PATH) == 3
+
+
+def test_gives_up_after_the_last_retry_and_keeps_the_cache(stub_server, fetcher):
+    stub_server.routes[PATH] = lambda headers: (200, {}, {'pings': [_ping(100)]})
+    fetcher.refresh(42)
+    stub_server.routes[PATH] = lambda headers: (503, {}, b"")
+    with pytest.raises(requests.HTTPError):
+        fetcher.refresh(42)
+    assert stub_server.hits(PATH) == 1 + fetcher.retries + 1
+    assert len(fetcher.fetch(42)) == 1
+
+
+def test_client_errors_are_not_retried(stub_server, fetcher):
+    stub_server.routes[PATH] = lambda headers: (404, {}, b"")
+    with pytest.raises(requests.HTTPError):
+        fetcher.refresh(42)
+    assert stub_server.hits(PATH) == 1
+
+
+def test_incremental_refresh_merges_only_new_pings(stub_server, fetcher):
+    feed = {'pings': [_ping(200), _ping(100)], 'etag': '"v1"'}
+
+    def history(headers):
+        if headers.get("If-None-Match") == feed['etag']:
+            return 304, {}, b""
+        return 200, {'ETag': feed['etag']}, {'pings': feed['pings']}
+
+    stub_server.routes[PATH] = history
+    assert fetcher.refresh(42) == 2
+    assert fetcher.refresh(42) == 0  # 304: conditional request on the cached ETag
+    assert stub_server.requests[-1][1].get("If-None-Match") == '"v1"'
+
+    feed.update(pings=[_ping(300, lat=11.0), _ping(200), _ping(100)], etag='"v2"')
+    assert fetcher.refresh(42) == 1
+    history_df = fetcher.fetch(42)
+    assert history_df['lat'].tolist() == [11.0, 10.0, 10.0]  # newest first
+
+
+def test_fetch_many_downloads_each_shark_once(stub_server, fetcher):
+    for shark_id in range(1, 6):
+        stub_server.routes[f"/tracker/detail/{shark_id}/json"] = lambda headers, s=shark_id: (
+            200, {}, {'pings': [_ping(100 * k) for k in range(1, s + 1)]})
+    frames = fetcher.fetch_many([1, 2, 3, 4, 5, 3, 1])
+    assert {k: len(v) for k, v in frames.items()} == {1: 1, 2: 2, 3: 3, 4: 4, 5: 5}
+    assert len(stub_server.requests) == 5
+
+
+def test_interactive_budget_overrides_the_background_policy(stub_server, fetcher):
+    stub_server.routes[PATH] = lambda headers: (503, {}, b"")
+    assert fetcher.fetch(42, retries=1, timeout=1).empty
+    assert stub_server.hits(PATH) == 2
+
+    fetcher.fetch_many([42])
+    assert stub_server.hits(PATH) == 2 + fetcher.retries + 1
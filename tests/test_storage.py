@@ -0,0 +1,54 @@
+import warnings
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src import storage
+
+
+def _tracks(tz):
+    times = pd.date_range("2024-01-30", periods=6, freq="D", tz=tz)
+    return pd.DataFrame({
+        'shark_id': np.repeat(["7", "9"], 3),
+        'time': np.concatenate([times[:3], times[3:]]),
+        'lat': np.linspace(10, 15, 6),
+        'lon': np.linspace(-40, -35, 6),
+        'speed_ms': np.linspace(0.1, 0.6, 6),
+    })
+
+
+@pytest.mark.parametrize("tz", [None, "UTC"])
+def test_round_trip(tmp_path, tz):
+    df = _tracks(tz)
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        storage.write_tracks(df, tmp_path / "store")
+    out = storage.read_tracks(tmp_path / "store")
+    assert sorted(p.name for p in (tmp_path / "store" / "shark_id=7").iterdir()) == ["month=2024-01", "month=2024-02"]
+    assert getattr(out['time'].dtype, "tz", None) is not None if tz else out['time'].dtype.kind == "M"
+    np.testing.assert_array_equal(out['time'].to_numpy(), pd.to_datetime(df['time']).to_numpy())
+    np.testing.assert_allclose(out['lat'], df['lat'])
+
+
+@pytest.mark.parametrize("start, end", [
+    ("2024-01-31", "2024-02-02"),                                        # naive bounds
+    (pd.Timestamp("2024-01-31", tz="UTC"), "2024-02-02T00:00:00+00:00"),  # aware bounds
+])
+def test_time_window_on_timezone_aware_tracks(tmp_path, start, end):
+    storage.write_tracks(_tracks("UTC"), tmp_path / "store")
+    out = storage.read_tracks(tmp_path / "store", start=start, end=end)
+    assert out['time'].dt.strftime("%m-%d").tolist() == ["01-31", "02-01", "02-02"]
+
+
+def test_aware_bounds_on_naive_tracks(tmp_path):
+    storage.write_tracks(_tracks(None), tmp_path / "store")
+    out = storage.read_tracks(tmp_path / "store", start=pd.Timestamp("2024-02-01 01:00", tz="Europe/Paris"))
+    assert out['time'].dt.strftime("%m-%d").tolist() == ["02-01", "02-02", "02-03", "02-04"]
+
+
+def test_csv_filters_on_timezone_aware_tracks(tmp_path):
+    path = tmp_path / "tracks.csv"
+    _tracks("UTC").to_csv(path, index=False)
+    out = storage.load_tracks(path, start="2024-02-01", shark_ids=[9])
+    assert len(out) == 3
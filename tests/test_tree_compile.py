@@ -0,0 +1,70 @@
+import joblib
+import numpy as np
+import pytest
+from sklearn.ensemble import GradientBoostingClassifier, RandomForestClassifier
+from sklearn.impute import SimpleImputer
+
+from src import tree_compile
+from src.habitat import habitat_features, predict_presence
+from src.tree_compile import CompiledForest, compile_model, load_or_compile
+
+BACKENDS = ["numpy", pytest.param("numba", marks=pytest.mark.skipif(not tree_compile.NUMBA_AVAILABLE,
+                                                                      reason="numba is not installed"))]
+
+
+def _training_rows(n=1200, seed=0):
+    """Habitat features like data/my_training_data.csv rows: chlorophyll is missing for ~15% of them."""
+    rng = np.random.default_rng(seed)
+    sst = rng.uniform(0, 30, n)
+    depth = rng.uniform(-6000, 0, n)
+    chlor = rng.lognormal(-1, 1, n)
+    gradient = rng.uniform(0, 0.1, n)
+    y = ((sst > 18) & (depth > -1500) | (chlor > 1.5)).astype(int)
+    chlor[rng.random(n) < 0.15] = np.nan
+    return habitat_features(sst, depth, chlor, gradient), y
+
+
+def _models():
+    X, y = _training_rows()
+    filled = np.nan_to_num(X)
+    imputer = SimpleImputer(keep_empty_features=True).fit(X)
+    return {
+        'rf_nan': (RandomForestClassifier(n_estimators=20, max_depth=8, random_state=0).fit(X, y), None),
+        'gbm': (GradientBoostingClassifier(n_estimators=30, max_depth=3, random_state=0).fit(filled, y), None),
+        'imputer_rf': (RandomForestClassifier(n_estimators=20, max_depth=8, random_state=1)
+                       .fit(imputer.transform(X), y), imputer),
+    }
+
+
+MODELS = _models()
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+@pytest.mark.parametrize("name", sorted(MODELS))
+def test_compiled_matches_predict_proba(name, backend):
+    model, imputer = MODELS[name]
+    X, _ = _training_rows(n=3000, seed=5)
+    if name == 'gbm':
+        X = np.nan_to_num(X)
+    compiled = compile_model(model, imputer)
+    expected = predict_presence(model, imputer, X)
+    np.testing.assert_allclose(compiled.predict_proba(X, backend)[:, 1], expected, atol=1e-6)
+
+
+def test_artifact_round_trip(tmp_path):
+    model, imputer = MODELS['imputer_rf']
+    joblib.dump(model, tmp_path / "model.pkl")
+    joblib.dump(imputer, tmp_path / "imputer.pkl")
+    compiled = load_or_compile(tmp_path / "model.pkl", tmp_path / "imputer.pkl")
+    assert (tmp_path / "model.npz").exists()
+
+    X, _ = _training_rows(n=500, seed=9)
+    loaded = CompiledForest.load(tmp_path / "model.npz")
+    np.testing.assert_array_equal(loaded.predict_proba(X, "numpy"), compiled.predict_proba(X, "numpy"))
+    np.testing.assert_allclose(loaded.predict_proba(X, "numpy")[:, 1], predict_presence(model, imputer, X), atol=1e-6)
+
+
+def test_rejects_wrong_feature_count():
+    compiled = compile_model(*MODELS['gbm'])
+    with pytest.raises(ValueError):
+        compiled.predict_proba(np.zeros((3, 4)))